@@ -0,0 +1,108 @@
+"""Bulk pet import and export through services.bulk_io on a SQLite file.
+
+Generates ``--rows`` pets as CSV and NDJSON, imports each into a fresh
+owner of a temporary database (migrated and tuned like production) and
+exports them back, reporting rows/s. ``--per-row`` also times the
+one-request-per-pet path (POST /pets/: one transaction per pet) for
+comparison.
+
+    python benchmarks/bench_bulk_import.py --rows 10000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+from tortoise import Tortoise  # noqa: E402
+from tortoise.transactions import in_transaction  # noqa: E402
+
+import migrations  # noqa: E402
+from database import tortoise_config  # noqa: E402
+from models import Pet, User  # noqa: E402
+from services import bulk_io, change_log  # noqa: E402
+from services.pet_pictures import set_pictures  # noqa: E402
+
+# Bytes per chunk, as a request body arrives
+CHUNK_SIZE = 64 * 1024
+
+
+def _pets(rows: int):
+    for i in range(rows):
+        yield {"name": f"Pet {i}", "pet_type": "Dog", "breed": "Mixed", "notes": "Friendly, brown",
+               "status": "lost" if i % 10 == 0 else "at_home",
+               "pictures": [f"https://example.com/pets/{i}-{n}.jpg" for n in range(2)]}
+
+
+def _files(rows: int):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(["name", "pet_type", "breed", "notes", "status", "pictures"])
+    for pet in _pets(rows):
+        writer.writerow([*list(pet.values())[:-1], "|".join(pet["pictures"])])
+    ndjson = "".join(json.dumps({**pet, "picture": ""}) + "\n" for pet in _pets(rows))
+    return {bulk_io.CSV: buffer.getvalue().encode(), bulk_io.NDJSON: ndjson.encode()}
+
+
+async def _chunks(data: bytes):
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield data[start:start + CHUNK_SIZE]
+
+
+async def _owner(name: str) -> User:
+    return await User.create(first_name="Bench", last_name=name, email=f"{name}@example.com",
+                             phone="1", full_address="x", password="x")
+
+
+async def _per_row(owner: User, rows: int) -> None:
+    for pet in _pets(rows):
+        pictures = pet.pop("pictures")
+        async with in_transaction("default"):
+            pet_obj = await Pet.create(owner_id=owner.id, **pet)
+            await set_pictures(pet_obj.id, pictures)
+            await change_log.record_change(owner.id, change_log.PET, pet_obj.id)
+
+
+async def main(rows: int, per_row: bool) -> None:
+    files = _files(rows)
+    with tempfile.TemporaryDirectory() as directory:
+        await Tortoise.init(config=tortoise_config(f"sqlite://{directory}/bench.db", 4))
+        try:
+            await migrations.upgrade()
+            for format, data in files.items():
+                owner = await _owner(format)
+                started = time.perf_counter()
+                report = await bulk_io.import_pets(owner.id, _chunks(data), format)
+                elapsed = time.perf_counter() - started
+                print(f"import {format:>6}: {report['created']} pets in {elapsed:5.2f}s "
+                      f"({report['created'] / elapsed:6.0f} rows/s, {len(data) / 1e6:.1f} MB)")
+                started = time.perf_counter()
+                size = 0
+                async for chunk in bulk_io.export_pets(owner.id, format):
+                    size += len(chunk)
+                elapsed = time.perf_counter() - started
+                print(f"export {format:>6}: {rows} pets in {elapsed:5.2f}s "
+                      f"({rows / elapsed:6.0f} rows/s, {size / 1e6:.1f} MB)")
+            if per_row:
+                owner = await _owner("per-row")
+                started = time.perf_counter()
+                await _per_row(owner, rows)
+                elapsed = time.perf_counter() - started
+                print(f"per-row POST path: {rows} pets in {elapsed:5.2f}s ({rows / elapsed:6.0f} rows/s)")
+        finally:
+            await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--per-row", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.per_row))
@@ -0,0 +1,74 @@
+"""Login throughput vs. latency of other requests while passwords are hashed.
+
+Simulates a burst of logins (bcrypt verifications) on one event loop while
+a probe task measures how late a trivial "non-login request" gets to run.
+Compares hashing inline on the loop with the dedicated hasher pool.
+
+    python benchmarks/bench_password_hashing.py --logins 40 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+from services.password_hasher import PasswordHasher, build_password_context  # noqa: E402
+
+PROBE_INTERVAL = 0.01  # seconds between simulated non-login requests
+
+
+async def _probe(stop: asyncio.Event, delays: list) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        delays.append(max(0.0, time.perf_counter() - expected))
+
+
+async def _run(mode: str, hasher: PasswordHasher, hashed: str, logins: int) -> None:
+    async def login() -> None:
+        if mode == "inline":
+            hasher.context.verify_and_update("secret", hashed)
+            await asyncio.sleep(0)
+        else:
+            await hasher.verify_and_update("secret", hashed)
+
+    stop = asyncio.Event()
+    delays: list = []
+    probe = asyncio.create_task(_probe(stop, delays))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    delays.sort()
+    p99 = delays[min(len(delays) - 1, int(len(delays) * 0.99))] if delays else 0.0
+    print(f"{mode:>8}: {logins / elapsed:6.1f} logins/s | probe delay "
+          f"p50 {statistics.median(delays) * 1000 if delays else 0:7.1f}ms "
+          f"p99 {p99 * 1000:7.1f}ms max {max(delays, default=0) * 1000:7.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(build_password_context(args.rounds),
+                            max_workers=args.workers, max_pending=args.logins)
+    hashed = hasher.context.hash("secret")
+    print(f"bcrypt rounds={args.rounds}, logins={args.logins}, workers={args.workers}")
+    for mode in ("inline", "executor"):
+        asyncio.run(_run(mode, hasher, hashed, args.logins))
+    print("executor stats:", hasher.stats())
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
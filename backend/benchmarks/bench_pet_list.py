@@ -0,0 +1,85 @@
+"""Throughput of GET /api/pets/ serialization on a 1k-pet list.
+
+Seeds an in-memory SQLite database and compares the previous path
+(full model instances, serialize_pet per pet, FastAPI's response_model
+re-validation + jsonable_encoder + stdlib json) with the current one
+(values() projection, one TypeAdapter validation pass, pydantic-core JSON).
+
+    python benchmarks/bench_pet_list.py --pets 1000 --rounds 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from tortoise import Tortoise  # noqa: E402
+
+from models import Pet, PetPicture, PetStatus, PetType, User  # noqa: E402
+from schemas.pets import (  # noqa: E402
+    PET_OUT_COLUMNS,
+    PetOut,
+    pet_list_adapter,
+    serialize_pet_list,
+    serialize_pet_rows_json,
+)
+from services.pet_pictures import attach_pictures  # noqa: E402
+
+
+async def _seed(count: int) -> int:
+    owner = await User.create(first_name="Bench", last_name="Owner", email="bench@example.com",
+                              phone="1", full_address="x", password="x")
+    await Pet.bulk_create([
+        Pet(owner_id=owner.id, name=f"Pet {i}", pet_type=PetType.DOG, breed="Mixed",
+            notes="Friendly, brown", status=PetStatus.LOST, distinctive1="Collar")
+        for i in range(count)
+    ])
+    pet_ids = await Pet.filter(owner_id=owner.id).order_by("id").values_list("id", flat=True)
+    await PetPicture.bulk_create([
+        PetPicture(pet_id=pet_id, url=f"static/uploads/{owner.id}/{i:064x}.jpg")
+        for i, pet_id in enumerate(pet_ids)
+    ])
+    return owner.id
+
+
+async def _before(owner_id: int) -> bytes:
+    pets = await Pet.filter(owner_id=owner_id).prefetch_related("pictures")
+    content = serialize_pet_list(pets)
+    # What FastAPI does with response_model=List[PetOut]
+    dumped: List[dict] = [pet.model_dump() for pet in content]
+    validated = pet_list_adapter.validate_python(dumped)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+async def _after(owner_id: int) -> bytes:
+    rows = await attach_pictures(await Pet.filter(owner_id=owner_id).values(*PET_OUT_COLUMNS))
+    return serialize_pet_rows_json(rows)
+
+
+async def main(pets: int, rounds: int) -> None:
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+    await Tortoise.generate_schemas()
+    owner_id = await _seed(pets)
+    assert json.loads(await _before(owner_id)) == json.loads(await _after(owner_id))
+    print(f"{pets} pets, {rounds} rounds")
+    for label, path in (("before", _before), ("after", _after)):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await path(owner_id)
+        per_request = (time.perf_counter() - started) / rounds
+        print(f"{label:>7}: {per_request * 1000:7.1f}ms/request, {1 / per_request:6.1f} requests/s")
+    await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pets", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.pets, args.rounds))
@@ -0,0 +1,84 @@
+"""Latency of pet search over 100k pets: FTS5 index vs LIKE scans.
+
+Seeds an in-memory SQLite database with pets whose breed, notes and
+distinctive marks are drawn from small vocabularies, then times the same
+queries through SQLiteSearchBackend and through the equivalent
+``LIKE '%word%'`` filter over every searchable column. LIKE returns the
+first 20 matches unranked, so it is quick for very common words and scans
+the whole table for rare ones; FTS5 ranks every match, so its cost follows
+the number of matching pets instead of the table size.
+
+    python benchmarks/bench_pet_search.py --pets 100000 --rounds 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+from tortoise import Tortoise  # noqa: E402
+from tortoise.expressions import Q  # noqa: E402
+
+import migrations  # noqa: E402
+from models import Pet, PetStatus, PetType, User  # noqa: E402
+from services.pet_search import SEARCH_COLUMNS, SQLiteSearchBackend, query_terms  # noqa: E402
+
+BREEDS = ["Labrador", "Beagle", "Poodle", "Siamese", "Persian", "Mixed", "Terrier", "Husky"]
+COLORS = ["brown", "black", "white", "grey", "golden", "spotted", "striped", "ginger"]
+MARKS = ["red collar", "blue collar", "limps", "one eye", "short tail", "chipped", "scar on nose"]
+QUERIES = ["brown", "golden labrador", "red collar", "park 17", "pet 4242", "zebra"]
+
+
+async def _seed(count: int) -> None:
+    rng = random.Random(42)
+    owner = await User.create(first_name="Bench", last_name="Owner", email="bench@example.com",
+                              phone="1", full_address="x", password="x")
+    batch = 5000
+    for start in range(0, count, batch):
+        await Pet.bulk_create([
+            Pet(owner_id=owner.id, name=f"Pet {i}", pet_type=rng.choice(list(PetType)),
+                breed=rng.choice(BREEDS),
+                notes=f"{rng.choice(COLORS)} and {rng.choice(COLORS)}, found near park {i % 300}",
+                distinctive1=rng.choice(MARKS), status=rng.choice(list(PetStatus)))
+            for i in range(start, min(start + batch, count))
+        ])
+
+
+async def _like(text: str) -> list:
+    query = Pet.filter(status="lost")
+    for term in query_terms(text):
+        query = query.filter(Q(*[Q(**{f"{col}__icontains": term}) for col in SEARCH_COLUMNS],
+                               join_type="OR"))
+    return await query.limit(20).values_list("id", flat=True)
+
+
+async def main(pets: int, rounds: int) -> None:
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+    await migrations.upgrade()
+    backend = SQLiteSearchBackend()
+    started = time.perf_counter()
+    await _seed(pets)
+    print(f"{pets} pets seeded and indexed in {time.perf_counter() - started:.1f}s, {rounds} rounds")
+    for text in QUERIES:
+        timings = {}
+        for label, search in (("LIKE", _like),
+                              ("FTS5", lambda t: backend.search(t, "lost", None, 20, 0))):
+            await search(text)
+            started = time.perf_counter()
+            for _ in range(rounds):
+                await search(text)
+            timings[label] = (time.perf_counter() - started) / rounds * 1000
+        print(f"{text!r:>18}: LIKE {timings['LIKE']:7.2f}ms, FTS5 {timings['FTS5']:6.2f}ms")
+    await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pets", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.pets, args.rounds))
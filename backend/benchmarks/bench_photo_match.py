@@ -0,0 +1,50 @@
+"""Latency of similar-photo lookups: multi-index hashing vs a linear scan.
+
+Indexes random 64-bit hashes (the worst case for pruning: real photo hashes
+cluster) and times radius searches around near-duplicates of indexed ones.
+
+    python benchmarks/bench_photo_match.py --hashes 100000 --queries 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+from services.photo_match import MAX_DISTANCE, MultiIndexHash, hamming  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hashes", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    hashes = [rng.getrandbits(64) for _ in range(args.hashes)]
+    index = MultiIndexHash()
+    started = time.perf_counter()
+    for member, value in enumerate(hashes):
+        index.add(value, member)
+    print(f"{args.hashes} hashes indexed in {time.perf_counter() - started:.2f}s")
+    queries = [value ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+               for value in rng.sample(hashes, args.queries)]
+
+    for radius in range(4, MAX_DISTANCE + 1, 2):
+        index.search(queries[0], radius)  # warm the probe masks
+        started = time.perf_counter()
+        for query in queries:
+            index.search(query, radius)
+        indexed = (time.perf_counter() - started) / len(queries) * 1000
+        started = time.perf_counter()
+        for query in queries[:20]:
+            [member for member, value in enumerate(hashes) if hamming(query, value) <= radius]
+        linear = (time.perf_counter() - started) / 20 * 1000
+        print(f"radius {radius:2d}: multi-index {indexed:6.2f}ms, linear scan {linear:6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
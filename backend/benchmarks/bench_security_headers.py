@@ -0,0 +1,84 @@
+"""Per-request overhead of the security headers middleware.
+
+Drives a minimal Starlette app directly through ASGI (no network) with no
+middleware, the pure ASGI SecurityHeadersMiddleware, and an equivalent
+BaseHTTPMiddleware implementation for comparison.
+
+    python benchmarks/bench_security_headers.py --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from middleware.security import SecurityHeadersMiddleware, build_security_headers  # noqa: E402
+
+
+class BaseHTTPSecurityHeaders(BaseHTTPMiddleware):
+    """The previous implementation style, for comparison."""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for name, value in build_security_headers("development"):
+            response.headers[name.decode()] = value.decode()
+        return response
+
+
+def _app(middleware=None) -> Starlette:
+    async def health(request):
+        return JSONResponse({"status": "ok"})
+
+    app = Starlette(routes=[Route("/", health)])
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def _drive(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/", "raw_path": b"/",
+        "root_path": "", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # warm up (builds the middleware stack)
+        await app(dict(scope), receive, send)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    baseline = None
+    for label, middleware in (("none", None),
+                              ("pure ASGI", SecurityHeadersMiddleware),
+                              ("BaseHTTPMiddleware", BaseHTTPSecurityHeaders)):
+        per_request = asyncio.run(_drive(_app(middleware), args.requests))
+        baseline = baseline if baseline is not None else per_request
+        print(f"{label:>18}: {per_request:7.1f}us/request "
+              f"(+{per_request - baseline:5.1f}us)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Pet list reads under concurrent writes on a SQLite file: one shared
+connection vs the tuned read/write split.
+
+Seeds a temporary database, then for a fixed time runs ``--readers`` tasks
+fetching an owner's pet page (the GET /api/pets/ queries) while a writer
+task ingests location scans, first with ``Tortoise.init(db_url=...)`` (one
+connection, Tortoise's default pragmas) and then with
+``database.tortoise_config()`` (tuned pragmas, read-only connections).
+Reports reads/s, read latency percentiles and writes/s.
+
+    python benchmarks/bench_sqlite_concurrency.py --pets 20000 --readers 8 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+from tortoise import Tortoise  # noqa: E402
+
+import migrations  # noqa: E402
+from database import tortoise_config  # noqa: E402
+from models import Location, Pet, PetPicture, PetStatus, PetType, User  # noqa: E402
+from schemas.pets import PET_OUT_COLUMNS  # noqa: E402
+from services.pet_pictures import attach_pictures  # noqa: E402
+
+OWNERS = 200
+
+
+async def _seed(pets: int) -> None:
+    await User.bulk_create([
+        User(first_name="Bench", last_name=str(i), email=f"bench{i}@example.com", phone="1",
+             full_address="x", password="x")
+        for i in range(OWNERS)
+    ])
+    owner_ids = await User.all().values_list("id", flat=True)
+    rng = random.Random(42)
+    await Pet.bulk_create([
+        Pet(owner_id=rng.choice(owner_ids), name=f"Pet {i}", pet_type=PetType.DOG,
+            breed="Mixed", notes="Friendly, brown", status=rng.choice(list(PetStatus)))
+        for i in range(pets)
+    ], batch_size=5000)
+    await PetPicture.bulk_create([
+        PetPicture(pet_id=pet_id, url=f"static/uploads/1/{pet_id:064x}.jpg")
+        for pet_id in await Pet.all().values_list("id", flat=True)
+    ], batch_size=5000)
+
+
+async def _reader(owner_ids, deadline: float, latencies: list) -> None:
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        rows = await Pet.filter(owner_id=rng.choice(owner_ids)).order_by("id").limit(50).values(
+            *PET_OUT_COLUMNS)
+        await attach_pictures(rows)
+        latencies.append(time.perf_counter() - started)
+
+
+async def _writer(pet_ids, deadline: float) -> int:
+    rng = random.Random()
+    writes = 0
+    while time.perf_counter() < deadline:
+        await Location.create(pet_id=rng.choice(pet_ids), latitude=rng.uniform(-60, 60),
+                              longitude=rng.uniform(-180, 180))
+        writes += 1
+    return writes
+
+
+async def _run(label: str, config: dict, readers: int, seconds: float) -> None:
+    await Tortoise.init(config=config)
+    try:
+        owner_ids = await User.all().values_list("id", flat=True)
+        pet_ids = await Pet.all().values_list("id", flat=True)
+        latencies: list = []
+        deadline = time.perf_counter() + seconds
+        results = await asyncio.gather(_writer(pet_ids, deadline),
+                                       *(_reader(owner_ids, deadline, latencies)
+                                         for _ in range(readers)))
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000
+        print(f"{label:>7}: {len(latencies) / seconds:7.0f} reads/s "
+              f"(p50 {statistics.median(latencies) * 1000:5.1f}ms, p95 {p95:5.1f}ms), "
+              f"{results[0] / seconds:6.0f} writes/s")
+    finally:
+        await Tortoise.close_connections()
+
+
+async def main(pets: int, readers: int, seconds: float, read_connections: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        db_url = f"sqlite://{directory}/bench.db"
+        await Tortoise.init(config=tortoise_config(db_url))
+        await migrations.upgrade()
+        await _seed(pets)
+        await Tortoise.close_connections()
+        print(f"{pets} pets, {readers} concurrent readers + 1 writer, {seconds:.0f}s each")
+        await _run("before", {"connections": {"default": db_url},
+                              "apps": {"models": {"models": ["models"]}}}, readers, seconds)
+        await _run("after", tortoise_config(db_url, read_connections), readers, seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pets", type=int, default=20000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--read-connections", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.pets, args.readers, args.seconds, args.read_connections))
@@ -17,10 +17,64 @@ class Settings(BaseSettings):
 
     # Database Settings
     database_url: str = "sqlite://db.sqlite3"
+    # Apply pending schema migrations at startup instead of only checking the
+    # schema version (single-process and development setups)
+    migrate_on_startup: bool = False
+    # SQLite only: read-only connections ORM reads are spread over next to
+    # the single writer (0 = one connection for everything), and the
+    # synchronous / busy_timeout / mmap_size / cache_size pragmas of every
+    # connection (cache is per connection)
+    sqlite_read_connections: int = 4
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 16 * 1024
+    # Read replicas (comma-separated URLs, e.g. postgres://user:pw@replica1/petto):
+    # reads go to them and writes to database_url; a client's reads stay on
+    # the primary for this long after its own writes (replication lag bound)
+    database_replica_urls: str = ""
+    replica_read_your_writes_seconds: float = 5
 
     # Token Settings
     access_token_expire_minutes: int = 15
     refresh_token_expire_days: int = 3
+    # How long an authenticated user may be served from the in-process cache
+    auth_user_cache_ttl_seconds: int = 30
+
+    # Password hashing: bcrypt cost factor (existing hashes are upgraded on
+    # login when it changes), dedicated hashing threads and queue bound
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
+
+    # Bearer token for the internal GET /_metrics route (disabled when empty);
+    # queue stats tell when logins are saturated, so they are never public
+    metrics_token: str = ""
+
+    # Rate limiting: off switch, and an optional Redis URL
+    # (redis://host:6379/0) to share limits across workers
+    rate_limit_enabled: bool = True
+    rate_limit_storage_url: str = ""
+
+    # Delta sync: change log entries (and tokens) older than this are pruned
+    # (0 keeps them forever)
+    sync_log_retention_days: int = 30
+
+    # Public lost pets feed: how often it follows changes made by other
+    # workers, and how often (and where) its projection is saved
+    lost_feed_refresh_seconds: float = 5
+    lost_feed_persist_seconds: int = 5 * 60
+    lost_feed_snapshot_path: str = ".lost_feed.json"
+
+    # How often the photo match index picks up pictures hashed by other workers
+    photo_index_refresh_seconds: float = 10
+
+    # Upload image processing
+    image_workers: int = 2
+    # How often unreferenced uploads are garbage collected (0 disables)
+    upload_gc_interval_seconds: int = 6 * 60 * 60
+    # Memory budget for hot uploaded images served from RAM
+    upload_cache_bytes: int = 64 * 1024 * 1024
 
     @property
     def cors_origins(self) -> str:
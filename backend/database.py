@@ -1,12 +1,167 @@
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
 from tortoise import Tortoise
+from tortoise.backends.base.client import BaseDBAsyncClient, TransactionalDBClient
+from tortoise.backends.base.config_generator import expand_db_url
+from tortoise.connection import connections
+from tortoise.router import router
+
+import migrations
+from config import settings
+
+SQLITE_ENGINE = "tortoise.backends.sqlite"
+# Read-only SQLite connections are named read0, read1, ...
+READ_CONNECTION_PREFIX = "read"
+# Read replicas are named replica0, replica1, ...
+REPLICA_CONNECTION_PREFIX = "replica"
+# Models always read from the primary: a login right after registering, or
+# a revoked token, must not be checked against a lagging replica
+PRIMARY_READ_MODELS = {"User"}
+
+# Cookie in which a client carries the time (epoch seconds) until which its
+# reads stay on the primary after a write, so whichever worker serves its
+# next request honours it
+READ_PRIMARY_COOKIE = "read_primary_until"
+# Reader the current request (task) is pinned to, so its reads see one replica's
+# monotonic view instead of mixing replicas with different lag
+_pinned_reader: ContextVar[Optional[str]] = ContextVar("pinned_reader", default=None)
+
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """Pragmas applied to every SQLite connection.
+
+    WAL lets readers run while a write commits; ``synchronous=NORMAL`` only
+    syncs at checkpoints in WAL mode (a power loss may drop the last commits,
+    an application crash cannot); ``busy_timeout`` makes a connection wait for
+    another process' write lock instead of failing with "database is locked".
+    """
+    return {
+        "journal_mode": "WAL",
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": -settings.sqlite_cache_size_kib,  # negative: KiB instead of pages
+        "foreign_keys": "ON",
+    }
+
+
+def _connection_config(db_url: str, read_only: bool = False) -> Dict[str, Any]:
+    config = expand_db_url(db_url)
+    if config["engine"] == SQLITE_ENGINE:
+        config["credentials"] = {**sqlite_pragmas(), **config["credentials"]}
+        if read_only:
+            config["credentials"]["query_only"] = "ON"
+    return config
+
+
+def tortoise_config(db_url: str, read_connections: int = 0,
+                    replica_urls: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Tortoise config for ``db_url`` (the primary, which takes every write).
+
+    With ``replica_urls``, ReadWriteRouter sends ORM reads to those read
+    replicas. Otherwise, on a SQLite file, ``read_connections`` read-only
+    connections are added next to the single writer and serve the reads:
+    SQLite serializes writers anyway, and the split stops pet lists and
+    lookups from queuing behind a write on the one shared connection.
+    SQLite connections get ``sqlite_pragmas()`` (query parameters of the URL
+    take precedence).
+    """
+    default = _connection_config(db_url)
+    config: Dict[str, Any] = {
+        "connections": {"default": default},
+        "apps": {"models": {"models": ["models"], "default_connection": "default"}},
+        "routers": [],
+    }
+    if replica_urls:
+        for index, url in enumerate(replica_urls):
+            config["connections"][f"{REPLICA_CONNECTION_PREFIX}{index}"] = _connection_config(
+                url, read_only=True)
+        config["routers"] = [ReadWriteRouter]
+        return config
+    if default["engine"] != SQLITE_ENGINE:
+        return config
+    # An in-memory database is private to its connection
+    if read_connections > 0 and default["credentials"]["file_path"] != ":memory:":
+        for index in range(read_connections):
+            config["connections"][f"{READ_CONNECTION_PREFIX}{index}"] = {
+                "engine": SQLITE_ENGINE,
+                "credentials": {**default["credentials"], "query_only": "ON"},
+            }
+        config["routers"] = [ReadWriteRouter]
+    return config
+
+
+def replica_urls() -> List[str]:
+    return [url.strip() for url in settings.database_replica_urls.split(",") if url.strip()]
 
 
 async def init_db():
-    await Tortoise.init(
-        db_url='sqlite://db.sqlite3',
-        modules={'models': ['models']}
-    )
-    await Tortoise.generate_schemas()
+    await Tortoise.init(config=tortoise_config(settings.database_url))
+    await migrations.upgrade()
+
+
+class ReadYourWrites:
+    """Read-your-writes state of one request: its reads stay on the primary
+    until ``primary_until`` (from the client's READ_PRIMARY_COOKIE), and
+    ``wrote`` is set once it writes so the cookie is renewed."""
+
+    def __init__(self, primary_until: float = 0.0):
+        self.primary_until = primary_until
+        self.wrote = False
+
+    def on_primary(self) -> bool:
+        return time.time() < self.primary_until
+
+
+# Read-your-writes state of the current request (set by ReadYourWritesMiddleware)
+request_read_your_writes: ContextVar[Optional[ReadYourWrites]] = ContextVar(
+    "request_read_your_writes", default=None)
+
+
+class ReadWriteRouter:
+    """Tortoise router: writes go to ``default`` (the primary); reads go to
+    the replicas, or else to the read-only SQLite connections.
+
+    Reads stay on the primary inside a transaction (they must see its
+    uncommitted writes) and, with replicas, for PRIMARY_READ_MODELS and for
+    a client that wrote within the read-your-writes window. A request picks one
+    reader (round-robin) and keeps it for all its reads.
+    """
+
+    def __init__(self):
+        names = list(connections.db_config)
+        replicas = [name for name in names if name.startswith(REPLICA_CONNECTION_PREFIX)]
+        readers = replicas or [name for name in names if name.startswith(READ_CONNECTION_PREFIX)]
+        self._replicas = bool(replicas)
+        self._readers = itertools.cycle(readers) if readers else None
+
+    def db_for_read(self, model) -> Optional[str]:
+        if self._readers is None or isinstance(connections.get("default"), TransactionalDBClient):
+            return None
+        if self._replicas:
+            state = request_read_your_writes.get()
+            if (getattr(model, "__name__", None) in PRIMARY_READ_MODELS
+                    or (state is not None and state.on_primary())):
+                return None
+        reader = _pinned_reader.get()
+        if reader is None:
+            reader = next(self._readers)
+            _pinned_reader.set(reader)
+        return reader
+
+    def db_for_write(self, model) -> Optional[str]:
+        state = request_read_your_writes.get()
+        if self._replicas and state is not None:
+            state.wrote = True
+        return None
+
+
+def read_connection(connection_name: str = "default") -> BaseDBAsyncClient:
+    """Connection for a raw read query, routed like ORM reads."""
+    return router.db_for_read(None) or Tortoise.get_connection(connection_name)
 
 # if __name__ == "__main__":
 #     import asyncio
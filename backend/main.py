@@ -1,28 +1,87 @@
 
+import hmac
 import os
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from tortoise.contrib.fastapi import register_tortoise
-from routers import users, pets, qrcode, banners, pet_location, upload, flyers
+from routers import users, bulk, pets, qrcode, banners, pet_location, upload, flyers, sync, search, feed
 from config import settings
+import migrations
+from database import replica_urls, tortoise_config
 from middleware.security import SecurityHeadersMiddleware
-from middleware.rate_limit import limiter, rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
-from slowapi import Limiter
+from middleware.rate_limit import RateLimitMiddleware, get_limiter
+from middleware.read_your_writes import ReadYourWritesMiddleware
 from logging_config import app_logger
+from services.banner_renderer import get_banner_renderer
+from services.image_pipeline import get_image_pipeline
+from services import change_log
+from services.password_hasher import get_password_hasher
+from services.photo_match import get_photo_index
+from services.lost_feed import get_lost_feed
+from services.upload_storage import UPLOAD_DIR, run_garbage_collector
+from services.upload_serving import UploadStaticFiles, get_upload_cache
+from services.static_assets import FingerprintedStaticFiles, get_static_assets
+from utils.responses import FastJSONResponse
 from pathlib import Path
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes ship as migrations (python -m migrations); unless told to
+    # apply them, startup only checks that the database is up to date
+    if settings.migrate_on_startup:
+        await migrations.upgrade()
+    else:
+        await migrations.check_schema_version()
+    # Variants of stored uploads, so serializing pets never reads manifests
+    await get_image_pipeline().load()
+    # Perceptual hashes of uploaded pictures for photo matching
+    await get_photo_index().load()
+    # Public lost pets feed: restored from its snapshot (or built) and kept current
+    await get_lost_feed().start()
+    # Load banner fonts and static layers once instead of on every request
+    get_banner_renderer().preload()
+    # Fingerprint static assets and pre-build their gzip/brotli variants
+    await run_in_threadpool(get_static_assets().build)
+    background_tasks = [asyncio.create_task(get_photo_index().backfill()),
+                        asyncio.create_task(get_photo_index().run(
+                            settings.photo_index_refresh_seconds))]
+    if settings.upload_gc_interval_seconds > 0:
+        background_tasks.append(asyncio.create_task(
+            run_garbage_collector(settings.upload_gc_interval_seconds)))
+    if settings.sync_log_retention_days > 0:
+        background_tasks.append(asyncio.create_task(change_log.run_pruner()))
+    background_tasks.append(asyncio.create_task(get_lost_feed().run(
+        settings.lost_feed_refresh_seconds, settings.lost_feed_persist_seconds)))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await get_lost_feed().save()
+    get_image_pipeline().shutdown()
+    get_password_hasher().shutdown()
+    if get_limiter().shared is not None:
+        await get_limiter().shared.close()
+
+
 app = FastAPI(
     title="Petto API",
     description="API for Petto - Lost Pet Reunification App",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
-# Add rate limiting state to app
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+# Per-route limits from middleware.rate_limit.ROUTE_RATE_LIMITS
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware)
+
+# Keeps a client's reads on the primary after its writes (read replicas only)
+if replica_urls():
+    app.add_middleware(ReadYourWritesMiddleware)
 
 DEFAULT_ORIGINS = [
     "http://localhost:5173",
@@ -46,7 +105,7 @@ elif "null" not in allowed_origins:
     allowed_origins.append("null")
 
 # Security headers middleware
-# app.add_middleware(SecurityHeadersMiddleware)
+app.add_middleware(SecurityHeadersMiddleware)
 
 # Restrictive CORS configuration for security
 app.add_middleware(
@@ -59,13 +118,18 @@ app.add_middleware(
         "Authorization",
         "X-Requested-With",
         "Accept",
-        "Origin"
-    ]
+        "Origin",
+        # Resumable uploads (PATCH /api/upload/resumable/{id})
+        "Upload-Offset",
+    ],
+    expose_headers=["X-Next-Cursor", "ETag", "Upload-Offset", "Upload-Length", "Location"],
 )
 
 # Serve backend static assets (including flyer templates, fonts and svg files)
+# precompressed and with content-hash ETags; ?v=<hash> URLs are cached immutably.
 static_dir = Path(__file__).resolve().parent / "static"
-static_files_app = StaticFiles(directory=str(static_dir))
+static_files_app = FingerprintedStaticFiles(
+    directory=str(static_dir), manifest=get_static_assets())
 static_files_with_cors = CORSMiddleware(
     static_files_app,
     # Static assets are public; wildcard CORS avoids iframe/srcdoc font edge cases in dev.
@@ -74,16 +138,29 @@ static_files_with_cors = CORSMiddleware(
     allow_methods=["GET", "OPTIONS"],
     allow_headers=["*"],
 )
+# Uploaded pictures: strong ETags, byte ranges and an in-memory cache of hot files
+uploads_app = CORSMiddleware(
+    UploadStaticFiles(directory=UPLOAD_DIR, cache=get_upload_cache()),
+    allow_origins=["*"],
+    allow_credentials=False,
+    allow_methods=["GET", "OPTIONS"],
+    allow_headers=["*"],
+)
+app.mount("/static/uploads", uploads_app, name="uploads")
 app.mount("/static", static_files_with_cors, name="static")
 
 # app.include_router(static.router)
 app.include_router(users.router)
+app.include_router(bulk.router)
 app.include_router(pets.router)
 app.include_router(qrcode.router)
 app.include_router(banners.router)
 app.include_router(pet_location.router)
 app.include_router(upload.router)
 app.include_router(flyers.router)
+app.include_router(sync.router)
+app.include_router(search.router)
+app.include_router(feed.router)
 
 
 @app.get("/_health")
@@ -91,10 +168,20 @@ def read_root():
     return {"status": "ok"}
 
 
+@app.get("/_metrics", include_in_schema=False)
+def read_metrics(authorization: Optional[str] = Header(None)):
+    """Internal service stats (password hashing queue and pool), for operators
+    only: requires ``Authorization: Bearer $METRICS_TOKEN``; 404 otherwise."""
+    expected = f"Bearer {settings.metrics_token}"
+    if not settings.metrics_token or not hmac.compare_digest(authorization or "", expected):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"password_hashing": get_password_hasher().stats()}
+
+
 register_tortoise(
     app,
-    db_url=settings.database_url,
-    modules={"models": ["models"]},
-    generate_schemas=True,
+    config=tortoise_config(settings.database_url, settings.sqlite_read_connections,
+                           replica_urls()),
+    generate_schemas=False,
     add_exception_handlers=True,
 )
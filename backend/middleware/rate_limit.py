@@ -1,56 +1,18 @@
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from fastapi import Request, Response
-from config import settings
+import asyncio
 import logging
+import math
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config import settings
 
 # Get security logger
 security_logger = logging.getLogger("security")
 
-# Initialize rate limiter
-# In production, you'd want to use Redis for distributed rate limiting
-try:
-    import redis
-    redis_client = redis.Redis(
-        host='localhost', 
-        port=6379, 
-        db=0, 
-        decode_responses=True,
-        socket_connect_timeout=5,
-        socket_timeout=5,
-        retry_on_timeout=True
-    )
-    # Test Redis connection
-    redis_client.ping()
-    limiter = Limiter(
-        key_func=get_remote_address,
-        storage_uri="redis://localhost:6379"
-    )
-    security_logger.info("Rate limiting initialized with Redis storage")
-except Exception as e:
-    # Fallback to memory storage for development
-    limiter = Limiter(key_func=get_remote_address)
-    security_logger.warning(f"Rate limiting using memory storage (Redis unavailable): {e}")
-
-
-async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> Response:
-    """Custom handler for rate limit exceeded errors"""
-    security_logger.warning(
-        f"Rate limit exceeded for IP: {request.client.host}, "
-        f"Path: {request.url.path}, "
-        f"Limit: {exc.detail}"
-    )
-    
-    return Response(
-        status_code=429,
-        content={
-            "detail": "Rate limit exceeded. Please try again later.",
-            "retry_after": str(exc.detail).split()[-1].replace("'", "")
-        },
-        headers={"Retry-After": "60"}
-    )
-
 
 # Rate limit configurations for different endpoints
 RATE_LIMITS = {
@@ -67,6 +29,36 @@ RATE_LIMITS = {
     "strict": "10/minute"         # For sensitive operations
 }
 
+# (method, path, category, endpoint); a trailing "*" matches any path with
+# that prefix. Routes sharing a limit share a bucket (e.g. both logins).
+# Other /api requests fall under RATE_LIMITS["api"]["default"].
+ROUTE_RATE_LIMITS: List[Tuple[str, str, str, Optional[str]]] = [
+    ("POST", "/api/login", "auth", "login"),
+    ("POST", "/api/login/OAuth2", "auth", "login"),
+    ("POST", "/api/register", "auth", "register"),
+    ("POST", "/api/password-recovery", "auth", "password_reset"),
+    ("POST", "/api/password-reset", "auth", "password_reset"),
+    ("POST", "/api/upload", "api", "upload"),
+    ("POST", "/api/upload/batch", "api", "upload"),
+    ("POST", "/api/upload/resumable", "api", "upload"),
+    ("POST", "/api/search/pets/similar", "api", "upload"),
+    ("POST", "/api/pets/import", "api", "upload"),
+    ("GET", "/api/qrcode/*", "api", "qrcode"),
+]
+DEFAULT_RATE_LIMITED_PREFIX = "/api/"
+
+PERIODS = {"second": 1, "minute": 60, "hour": 60 * 60, "day": 24 * 60 * 60}
+
+# In-process store sizing: keys are spread over shards, each with its own lock
+MEMORY_STORE_SHARDS = 16
+MEMORY_STORE_MAX_KEYS = 100_000
+SWEEP_INTERVAL_SECONDS = 60
+
+# Shared backend: per-command timeout, and how long to use the in-process
+# store after the backend failed before trying it again
+SHARED_BACKEND_TIMEOUT = 0.25
+SHARED_BACKEND_RETRY_SECONDS = 30
+
 
 def get_rate_limit(category: str, endpoint: str = None) -> str:
     """Get rate limit for a specific category/endpoint"""
@@ -76,5 +68,245 @@ def get_rate_limit(category: str, endpoint: str = None) -> str:
                 return RATE_LIMITS[category][endpoint]
         else:
             return RATE_LIMITS[category]
-    
-    return RATE_LIMITS["api"]["default"]
\ No newline at end of file
+
+    return RATE_LIMITS["api"]["default"]
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """``"5/minute"`` -> ``(5, 60)``: allowed requests and period in seconds."""
+    count, _, period = rate.partition("/")
+    return int(count), PERIODS[period.strip().lower()]
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    retry_after: float = 0.0
+
+
+class StoreUnavailable(Exception):
+    """The shared backend could not be reached; use the in-process store."""
+
+
+class _Shard:
+    __slots__ = ("lock", "tats", "last_sweep")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> theoretical arrival time, insertion ordered for eviction
+        self.tats: Dict[str, float] = {}
+        self.last_sweep = time.monotonic()
+
+
+class MemoryRateLimitStore:
+    """In-process GCRA (generic cell rate algorithm) limiter.
+
+    Each key holds a single float, its theoretical arrival time, which gives
+    sliding-window behaviour without keeping per-request timestamps. Keys
+    whose TAT has passed carry no state and are swept every
+    SWEEP_INTERVAL_SECONDS; a full shard evicts its oldest keys, which can
+    only make the limit more lenient for them.
+    """
+
+    def __init__(self, shards: int = MEMORY_STORE_SHARDS, max_keys: int = MEMORY_STORE_MAX_KEYS):
+        self._shards = [_Shard() for _ in range(shards)]
+        self._max_keys_per_shard = max(1, max_keys // shards)
+
+    def _sweep(self, shard: _Shard, now: float) -> None:
+        shard.tats = {key: tat for key, tat in shard.tats.items() if tat > now}
+        shard.last_sweep = now
+
+    def hit(self, key: str, limit: int, period: int, now: Optional[float] = None) -> RateLimitResult:
+        now = time.monotonic() if now is None else now
+        interval = period / limit
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            if now - shard.last_sweep >= SWEEP_INTERVAL_SECONDS:
+                self._sweep(shard, now)
+            tat = max(shard.tats.get(key, now), now)
+            new_tat = tat + interval
+            allow_at = new_tat - period
+            if now < allow_at:
+                return RateLimitResult(False, allow_at - now)
+            if key not in shard.tats and len(shard.tats) >= self._max_keys_per_shard:
+                self._sweep(shard, now)
+                while len(shard.tats) >= self._max_keys_per_shard:
+                    del shard.tats[next(iter(shard.tats))]
+            shard.tats[key] = new_tat
+        return RateLimitResult(True)
+
+    def __len__(self) -> int:
+        return sum(len(shard.tats) for shard in self._shards)
+
+
+class RedisRateLimitStore:
+    """Sliding-window counter shared by every worker through Redis.
+
+    Works with any Redis-compatible server (plain INCR/EXPIRE/GET, no
+    scripting). The client is created on first use; a failing or slow
+    backend raises StoreUnavailable and is skipped for
+    SHARED_BACKEND_RETRY_SECONDS so requests never wait on it.
+    """
+
+    def __init__(self, url: str, timeout: float = SHARED_BACKEND_TIMEOUT,
+                 retry_seconds: float = SHARED_BACKEND_RETRY_SECONDS, prefix: str = "ratelimit"):
+        self.url = url
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self.prefix = prefix
+        self._client = None
+        self._down_until = 0.0
+
+    def _get_client(self):
+        if self._client is None:
+            import redis.asyncio as aioredis
+
+            self._client = aioredis.from_url(
+                self.url,
+                socket_connect_timeout=self.timeout,
+                socket_timeout=self.timeout,
+            )
+        return self._client
+
+    async def hit(self, key: str, limit: int, period: int) -> RateLimitResult:
+        if time.monotonic() < self._down_until:
+            raise StoreUnavailable(self.url)
+        now = time.time()
+        window = int(now // period)
+        elapsed = now - window * period
+        current_key = f"{self.prefix}:{key}:{window}"
+        previous_key = f"{self.prefix}:{key}:{window - 1}"
+        try:
+            client = self._get_client()
+            pipe = client.pipeline(transaction=False)
+            pipe.incr(current_key)
+            pipe.expire(current_key, period * 2)
+            pipe.get(previous_key)
+            count, _, previous = await asyncio.wait_for(pipe.execute(), self.timeout)
+            previous = int(previous or 0)
+            # Weight the previous window by how much of it still overlaps
+            estimate = previous * (period - elapsed) / period + count
+            if estimate <= limit:
+                return RateLimitResult(True)
+            # Rejected requests do not consume quota
+            await asyncio.wait_for(client.decr(current_key), self.timeout)
+        except Exception as e:
+            self._down_until = time.monotonic() + self.retry_seconds
+            security_logger.warning(
+                "Rate limit backend %s unavailable, using in-process limits for %ss: %s",
+                self.url, self.retry_seconds, e)
+            raise StoreUnavailable(self.url) from e
+        retry_after = period - elapsed
+        if previous and count - 1 < limit:
+            retry_after -= (limit - (count - 1)) * period / previous
+        return RateLimitResult(False, max(retry_after, 0.0))
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class RateLimiter:
+    """Checks request keys against a rate, preferring the shared backend."""
+
+    def __init__(self, memory: Optional[MemoryRateLimitStore] = None,
+                 shared: Optional[RedisRateLimitStore] = None):
+        self.memory = memory or MemoryRateLimitStore()
+        self.shared = shared
+
+    async def hit(self, key: str, rate: str) -> RateLimitResult:
+        limit, period = parse_rate(rate)
+        if self.shared is not None:
+            try:
+                return await self.shared.hit(key, limit, period)
+            except StoreUnavailable:
+                pass
+        return self.memory.hit(key, limit, period)
+
+
+def _compile_routes():
+    exact: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    prefixes: List[Tuple[str, str, Tuple[str, str]]] = []
+    for method, path, category, endpoint in ROUTE_RATE_LIMITS:
+        rule = (f"{category}.{endpoint}" if endpoint else category,
+                get_rate_limit(category, endpoint))
+        if path.endswith("*"):
+            prefixes.append((method, path[:-1], rule))
+        else:
+            exact[(method, path.rstrip("/"))] = rule
+    return exact, prefixes
+
+
+_EXACT_ROUTES, _PREFIX_ROUTES = _compile_routes()
+_DEFAULT_RULE = ("api.default", get_rate_limit("api", "default"))
+
+
+def rule_for(method: str, path: str) -> Optional[Tuple[str, str]]:
+    """``(bucket name, rate)`` limiting a request, or None when unlimited."""
+    rule = _EXACT_ROUTES.get((method, path.rstrip("/")))
+    if rule is not None:
+        return rule
+    for route_method, prefix, rule in _PREFIX_ROUTES:
+        if method == route_method and path.startswith(prefix):
+            return rule
+    if path.startswith(DEFAULT_RATE_LIMITED_PREFIX):
+        return _DEFAULT_RULE
+    return None
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware applying ROUTE_RATE_LIMITS per client address."""
+
+    def __init__(self, app: ASGIApp, limiter: Optional["RateLimiter"] = None):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        rule = rule_for(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+        name, rate = rule
+        client = scope.get("client")
+        address = client[0] if client else "unknown"
+        limiter = self.limiter or get_limiter()
+        result = await limiter.hit(f"{name}:{address}", rate)
+        if result.allowed:
+            await self.app(scope, receive, send)
+            return
+        retry_after = max(1, math.ceil(result.retry_after))
+        security_logger.warning(
+            f"Rate limit exceeded for IP: {address}, "
+            f"Path: {scope['path']}, "
+            f"Limit: {rate}"
+        )
+        response = JSONResponse(
+            status_code=429,
+            content={
+                "detail": "Rate limit exceeded. Please try again later.",
+                "retry_after": retry_after,
+            },
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
+
+
+# Singleton instance
+_limiter: Optional[RateLimiter] = None
+
+
+def get_limiter() -> RateLimiter:
+    """Get or create rate limiter singleton"""
+    global _limiter
+
+    if not _limiter:
+        shared = None
+        if settings.rate_limit_storage_url:
+            shared = RedisRateLimitStore(settings.rate_limit_storage_url)
+            security_logger.info("Rate limiting shared through %s", settings.rate_limit_storage_url)
+        _limiter = RateLimiter(shared=shared)
+
+    return _limiter
@@ -0,0 +1,60 @@
+import math
+import time
+from typing import Optional
+
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from database import READ_PRIMARY_COOKIE, ReadYourWrites, request_read_your_writes
+from utils.auth import COOKIE_PATH, COOKIE_SAMESITE, COOKIE_SECURE
+
+
+def _primary_until(scope: Scope) -> float:
+    for name, value in scope.get("headers", ()):
+        if name == b"cookie":
+            try:
+                return float(cookie_parser(value.decode("latin-1")).get(READ_PRIMARY_COOKIE, 0))
+            except ValueError:
+                return 0.0
+    return 0.0
+
+
+class ReadYourWritesMiddleware:
+    """Keep a client's reads on the primary for a while after it writes.
+
+    The state lives with the client, not in a worker: a request that writes
+    gets a READ_PRIMARY_COOKIE holding the time until which its reads stay
+    on the primary, and the next requests bring it back to whichever worker
+    serves them. Pure ASGI, like SecurityHeadersMiddleware.
+    """
+
+    def __init__(self, app: ASGIApp, seconds: Optional[float] = None):
+        self.app = app
+        self.seconds = settings.replica_read_your_writes_seconds if seconds is None else seconds
+
+    def _cookie(self) -> bytes:
+        cookie = (f"{READ_PRIMARY_COOKIE}={time.time() + self.seconds:.3f}; "
+                  f"Max-Age={math.ceil(self.seconds)}; Path={COOKIE_PATH}; HttpOnly; "
+                  f"SameSite={COOKIE_SAMESITE}")
+        if COOKIE_SECURE:
+            cookie += "; Secure"
+        return cookie.encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        state = ReadYourWrites(_primary_until(scope))
+        token = request_read_your_writes.set(state)
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and state.wrote:
+                message["headers"] = [*message.get("headers", ()), (b"set-cookie", self._cookie())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            request_read_your_writes.reset(token)
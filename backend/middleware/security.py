@@ -1,74 +1,88 @@
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from config import settings
+from typing import List, Optional, Tuple
 
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Middleware to add security headers to all responses"""
+from config import settings
 
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
 
+def build_security_headers(environment: str) -> List[Tuple[bytes, bytes]]:
+    """Security headers for an environment, encoded once for the ASGI layer."""
+    headers = {
         # Prevent clickjacking attacks
-        response.headers["X-Frame-Options"] = "DENY"
-
+        "X-Frame-Options": "DENY",
         # Prevent MIME type sniffing
-        response.headers["X-Content-Type-Options"] = "nosniff"
-
+        "X-Content-Type-Options": "nosniff",
         # Enable XSS protection in older browsers
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-
+        "X-XSS-Protection": "1; mode=block",
         # Control referrer information leakage
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        "Referrer-Policy": "strict-origin-when-cross-origin",
+    }
 
-        # Content Security Policy for XSS protection
-        if settings.environment == "production":
-            csp = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline'; "
-                "style-src 'self' 'unsafe-inline'; "
-                "img-src 'self' data: https:; "
-                "font-src 'self'; "
-                "connect-src 'self'; "
-                "frame-ancestors 'none'; "
-                "base-uri 'self'; "
-                "form-action 'self'"
-            )
-            response.headers["Content-Security-Policy"] = csp
-        else:
-            # More permissive CSP for development
-            csp = (
-                "default-src 'self' 'unsafe-eval' 'unsafe-inline'; "
-                "script-src 'self' 'unsafe-eval' 'unsafe-inline'; "
-                "style-src 'self' 'unsafe-inline'; "
-                "img-src 'self' data: https: http:; "
-                "font-src 'self'; "
-                "connect-src 'self' ws: wss:; "
-                "frame-ancestors 'self'; "
-                "base-uri 'self'; "
-                "form-action 'self'"
-            )
-            response.headers["Content-Security-Policy"] = csp
+    # Content Security Policy for XSS protection
+    if environment == "production":
+        headers["Content-Security-Policy"] = (
+            "default-src 'self'; "
+            "script-src 'self' 'unsafe-inline'; "
+            "style-src 'self' 'unsafe-inline'; "
+            "img-src 'self' data: https:; "
+            "font-src 'self'; "
+            "connect-src 'self'; "
+            "frame-ancestors 'none'; "
+            "base-uri 'self'; "
+            "form-action 'self'"
+        )
+        # HSTS for 1 year including subdomains
+        headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
+    else:
+        # More permissive CSP for development
+        headers["Content-Security-Policy"] = (
+            "default-src 'self' 'unsafe-eval' 'unsafe-inline'; "
+            "script-src 'self' 'unsafe-eval' 'unsafe-inline'; "
+            "style-src 'self' 'unsafe-inline'; "
+            "img-src 'self' data: https: http:; "
+            "font-src 'self'; "
+            "connect-src 'self' ws: wss:; "
+            "frame-ancestors 'self'; "
+            "base-uri 'self'; "
+            "form-action 'self'"
+        )
 
-        # HTTP Strict Transport Security (HSTS) for HTTPS sites
-        if settings.environment == "production":
-            # HSTS for 1 year including subdomains
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
+    # Permissions Policy to control feature access
+    headers["Permissions-Policy"] = (
+        "geolocation=(), "
+        "microphone=(), "
+        "camera=(), "
+        "payment=(), "
+        "usb=(), "
+        "magnetometer=(), "
+        "gyroscope=(), "
+        "accelerometer=()"
+    )
 
-        # Permissions Policy to control feature access
-        permissions_policy = (
-            "geolocation=(), "
-            "microphone=(), "
-            "camera=(), "
-            "payment=(), "
-            "usb=(), "
-            "magnetometer=(), "
-            "gyroscope=(), "
-            "accelerometer=()"
-        )
-        response.headers["Permissions-Policy"] = permissions_policy
+    return [(name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers.items()]
+
+
+class SecurityHeadersMiddleware:
+    """Add security headers to all HTTP responses.
+
+    Pure ASGI: the header block is built once and appended to each
+    ``http.response.start`` message, so streaming responses pass through
+    untouched. CORS headers are left to CORSMiddleware.
+    """
+
+    def __init__(self, app: ASGIApp, environment: Optional[str] = None):
+        self.app = app
+        self.headers = build_security_headers(environment or settings.environment)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        response.headers["Access-Control-Allow-Origin"] = ", ".join(
-            settings.cors_origins.split(","))
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *self.headers]
+            await send(message)
 
-        return response
+        await self.app(scope, receive, send_with_headers)
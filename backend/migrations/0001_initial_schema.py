@@ -0,0 +1,73 @@
+"""The baseline schema, frozen as DDL: tables are created unless they exist.
+
+``pet`` has its original shape, with the ``picture*`` columns and without
+``updated_at``; 0002 and 0003 bring it up to date, and later changes go in
+later migrations, never here. Databases created before migrations existed
+already have these tables and pick up those changes the same way.
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from migrations import column_types
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS "user" (
+    "id" {serial},
+    "first_name" VARCHAR(255) NOT NULL,
+    "last_name" VARCHAR(255) NOT NULL,
+    "email" VARCHAR(255) NOT NULL UNIQUE,
+    "phone" VARCHAR(255) NOT NULL,
+    "full_address" VARCHAR(1024) NOT NULL,
+    "recovery_bounty" {decimal},
+    "password" VARCHAR(128) NOT NULL,
+    "hash" VARCHAR(64) NOT NULL UNIQUE
+);
+CREATE INDEX IF NOT EXISTS "idx_user_hash_559886" ON "user" ("hash");
+CREATE TABLE IF NOT EXISTS "pet" (
+    "id" {serial},
+    "name" VARCHAR(255) NOT NULL,
+    "pet_type" VARCHAR(16) NOT NULL,
+    "breed" VARCHAR(100),
+    "last_seen_date" DATE,
+    "last_seen_geo" VARCHAR(255),
+    "gender" VARCHAR(32),
+    "distinctive1" VARCHAR(100),
+    "distinctive2" VARCHAR(100),
+    "distinctive3" VARCHAR(100),
+    "distinctive4" VARCHAR(100),
+    "picture" VARCHAR(1024) NOT NULL,
+    "picture2" VARCHAR(1024),
+    "picture3" VARCHAR(1024),
+    "picture4" VARCHAR(1024),
+    "picture5" VARCHAR(1024),
+    "notes" TEXT NOT NULL,
+    "status" VARCHAR(16) NOT NULL DEFAULT 'at_home',
+    "owner_id" INT NOT NULL REFERENCES "user" ("id") ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS "location" (
+    "id" {serial},
+    "latitude" {float} NOT NULL,
+    "longitude" {float} NOT NULL,
+    "timestamp" {timestamp} NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "pet_id" INT NOT NULL REFERENCES "pet" ("id") ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS "changelog" (
+    "id" {serial},
+    "owner_id" INT NOT NULL,
+    "entity" VARCHAR(16) NOT NULL,
+    "entity_id" INT NOT NULL,
+    "op" VARCHAR(8) NOT NULL,
+    "data" {json},
+    "created_at" {timestamp} NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS "idx_changelog_owner_i_49d740" ON "changelog" ("owner_id", "id");
+CREATE TABLE IF NOT EXISTS "photohash" (
+    "id" {serial},
+    "picture" VARCHAR(1024) NOT NULL UNIQUE,
+    "dhash" VARCHAR(16) NOT NULL,
+    "created_at" {timestamp} NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+async def upgrade(connection: BaseDBAsyncClient) -> None:
+    await connection.execute_script(SCHEMA.format(**column_types(connection)))
@@ -0,0 +1,8 @@
+"""Add ``pet.updated_at`` (the row version behind pet ETags)."""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from migrations import add_column, column_types
+
+
+async def upgrade(connection: BaseDBAsyncClient) -> None:
+    await add_column(connection, "pet", "updated_at", column_types(connection)["timestamp"])
@@ -0,0 +1,51 @@
+"""Create ``petpicture`` and move pictures from the ``pet.picture*`` columns
+into its rows.
+
+Non-empty columns become pictures at their position (``picture`` is the
+cover); their dimensions stay unknown. The columns are then dropped.
+"""
+import logging
+
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.transactions import in_transaction
+
+from migrations import column_types, table_columns
+
+logger = logging.getLogger(__name__)
+
+# Pet columns that held picture URLs, in display order
+LEGACY_PICTURE_COLUMNS = ["picture", "picture2", "picture3", "picture4", "picture5"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS "petpicture" (
+    "id" {serial},
+    "url" VARCHAR(1024) NOT NULL,
+    "position" SMALLINT NOT NULL DEFAULT 0,
+    "width" INT,
+    "height" INT,
+    "created_at" {timestamp} NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "pet_id" INT NOT NULL REFERENCES "pet" ("id") ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS "idx_petpicture_url_e06c6c" ON "petpicture" ("url");
+CREATE INDEX IF NOT EXISTS "idx_petpicture_pet_id_942726" ON "petpicture" ("pet_id", "position");
+"""
+
+
+async def upgrade(connection: BaseDBAsyncClient) -> None:
+    await connection.execute_script(SCHEMA.format(**column_types(connection)))
+    existing = await table_columns(connection, "pet")
+    if not existing.intersection(LEGACY_PICTURE_COLUMNS):
+        return
+    moved = 0
+    async with in_transaction(connection.connection_name) as conn:
+        for position, column in enumerate(LEGACY_PICTURE_COLUMNS):
+            if column not in existing:
+                continue
+            moved += (await conn.execute_query(
+                f'INSERT INTO "petpicture" ("pet_id", "url", "position", "created_at") '
+                f'SELECT "id", "{column}", {position}, CURRENT_TIMESTAMP FROM "pet" '
+                f'WHERE "{column}" IS NOT NULL AND "{column}" != \'\''))[0]
+        for column in LEGACY_PICTURE_COLUMNS:
+            if column in existing:
+                await conn.execute_query(f'ALTER TABLE "pet" DROP COLUMN "{column}"')
+    logger.info("Moved %d pet pictures into petpicture", moved)
@@ -0,0 +1,10 @@
+"""Indexes for the hot lookups: an owner's pets by status and a pet's latest
+locations. ``user.email`` needs none: its UNIQUE constraint is indexed."""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from migrations import create_index
+
+
+async def upgrade(connection: BaseDBAsyncClient) -> None:
+    await create_index(connection, "idx_pet_owner_status", "pet", ["owner_id", "status"])
+    await create_index(connection, "idx_location_pet_timestamp", "location", ["pet_id", "timestamp"])
@@ -0,0 +1,59 @@
+"""Full-text index over pets for ``services.pet_search``.
+
+SQLite: ``pet_fts``, an FTS5 external-content table kept in sync by
+triggers on ``pet``, filled from the existing pets when it is created.
+Postgres: a weighted ``search_vector`` generated column (name A, breed B,
+distinctive1..4 C, notes D) with a GIN index.
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+# Indexed pet columns; FTS5 column order matches the bm25() weights in
+# services.pet_search.SEARCH_COLUMNS
+COLUMNS = "name, breed, distinctive1, distinctive2, distinctive3, distinctive4, notes"
+NEW = ", ".join(f"new.{column}" for column in COLUMNS.split(", "))
+OLD = ", ".join(f"old.{column}" for column in COLUMNS.split(", "))
+
+SQLITE_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS pet_fts USING fts5(
+    {COLUMNS}, content='pet', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS pet_fts_insert AFTER INSERT ON pet BEGIN
+    INSERT INTO pet_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW});
+END;
+CREATE TRIGGER IF NOT EXISTS pet_fts_delete AFTER DELETE ON pet BEGIN
+    INSERT INTO pet_fts(pet_fts, rowid, {COLUMNS}) VALUES ('delete', old.id, {OLD});
+END;
+CREATE TRIGGER IF NOT EXISTS pet_fts_update AFTER UPDATE OF {COLUMNS} ON pet BEGIN
+    INSERT INTO pet_fts(pet_fts, rowid, {COLUMNS}) VALUES ('delete', old.id, {OLD});
+    INSERT INTO pet_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW});
+END;
+"""
+
+POSTGRES_SCHEMA = """
+ALTER TABLE pet ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', coalesce(name, '')), 'A')
+    || setweight(to_tsvector('simple', coalesce(breed, '')), 'B')
+    || setweight(to_tsvector('simple', coalesce(distinctive1, '')), 'C')
+    || setweight(to_tsvector('simple', coalesce(distinctive2, '')), 'C')
+    || setweight(to_tsvector('simple', coalesce(distinctive3, '')), 'C')
+    || setweight(to_tsvector('simple', coalesce(distinctive4, '')), 'C')
+    || setweight(to_tsvector('simple', coalesce(notes, '')), 'D')
+) STORED;
+CREATE INDEX IF NOT EXISTS pet_search_vector_idx ON pet USING GIN (search_vector);
+"""
+
+
+async def upgrade(connection: BaseDBAsyncClient) -> None:
+    dialect = connection.capabilities.dialect
+    if dialect == "postgres":
+        await connection.execute_script(POSTGRES_SCHEMA)
+        return
+    if dialect != "sqlite":
+        raise RuntimeError(f"Pet search is not supported on {dialect}")
+    existing = await connection.execute_query_dict(
+        "SELECT name FROM sqlite_master WHERE name = 'pet_fts'")
+    await connection.execute_script(SQLITE_SCHEMA)
+    if not existing:
+        # Index the pets created before the search table
+        await connection.execute_script("INSERT INTO pet_fts(pet_fts) VALUES ('rebuild')")
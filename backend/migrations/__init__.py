@@ -0,0 +1,159 @@
+"""Versioned schema migrations.
+
+Each ``NNNN_description.py`` module in this package is one migration with an
+``async def upgrade(connection)``; they run in version order and every
+applied version is recorded in the ``schema_version`` table. Apply them with
+``python -m migrations`` before starting new code: the app itself only checks
+that the database is up to date.
+
+Migrations must be idempotent (use the helpers below): a database that
+predates this package starts at version 0 and replays them all, and a
+migration interrupted before its version is recorded runs again.
+"""
+import importlib
+import logging
+import pkgutil
+import re
+from types import ModuleType
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set
+
+from tortoise import Tortoise
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.exceptions import OperationalError
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = "schema_version"
+MODULE_RE = re.compile(r"^(\d{4})_(\w+)$")
+
+
+class SchemaVersionError(RuntimeError):
+    """The database schema is behind the migrations shipped with the code."""
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    module: ModuleType
+
+    async def upgrade(self, connection: BaseDBAsyncClient) -> None:
+        await self.module.upgrade(connection)
+
+
+def discover() -> List[Migration]:
+    """Every migration of this package, in version order."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        match = MODULE_RE.match(info.name)
+        if match:
+            module = importlib.import_module(f"{__name__}.{info.name}")
+            found.append(Migration(int(match.group(1)), match.group(2), module))
+    found.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in found]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return found
+
+
+# Helpers for migrations (all idempotent)
+
+# Column types that differ between dialects, as Tortoise maps the fields
+COLUMN_TYPES = {
+    "sqlite": {
+        "serial": "INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL",
+        "timestamp": "TIMESTAMP",
+        "float": "REAL",
+        "decimal": "VARCHAR(40)",  # Tortoise stores decimals as text on SQLite
+        "json": "JSON",
+    },
+    "postgres": {
+        "serial": "SERIAL NOT NULL PRIMARY KEY",
+        "timestamp": "TIMESTAMPTZ",
+        "float": "DOUBLE PRECISION",
+        "decimal": "DECIMAL(10,2)",
+        "json": "JSONB",
+    },
+}
+
+
+def column_types(connection: BaseDBAsyncClient) -> Dict[str, str]:
+    """COLUMN_TYPES of the connection's dialect, for ``str.format`` on DDL."""
+    return COLUMN_TYPES[connection.capabilities.dialect]
+
+
+async def table_columns(connection: BaseDBAsyncClient, table: str) -> Set[str]:
+    if connection.capabilities.dialect == "sqlite":
+        rows = await connection.execute_query_dict(f'PRAGMA table_info("{table}")')
+        return {row["name"] for row in rows}
+    rows = await connection.execute_query_dict(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = $1", [table])
+    return {row["column_name"] for row in rows}
+
+
+async def add_column(connection: BaseDBAsyncClient, table: str, column: str, sql_type: str) -> None:
+    """Add a nullable column unless the table already has it."""
+    if column not in await table_columns(connection, table):
+        await connection.execute_query(
+            f'ALTER TABLE "{table}" ADD COLUMN "{column}" {sql_type} NULL')
+
+
+async def create_index(connection: BaseDBAsyncClient, name: str, table: str,
+                       columns: Sequence[str]) -> None:
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    await connection.execute_query(
+        f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({column_list})')
+
+
+# Runner
+
+async def applied_versions(connection: BaseDBAsyncClient) -> Dict[int, str]:
+    """Version -> name of the migrations recorded in the database."""
+    try:
+        rows = await connection.execute_query_dict(
+            f'SELECT "version", "name" FROM "{VERSION_TABLE}"')
+    except OperationalError:
+        return {}  # no version table yet
+    return {row["version"]: row["name"] for row in rows}
+
+
+async def pending(connection_name: str = "default") -> List[Migration]:
+    applied = await applied_versions(Tortoise.get_connection(connection_name))
+    return [migration for migration in discover() if migration.version not in applied]
+
+
+async def upgrade(connection_name: str = "default", target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations (up to ``target``) in order; returns those applied."""
+    connection = Tortoise.get_connection(connection_name)
+    await connection.execute_query(
+        f'CREATE TABLE IF NOT EXISTS "{VERSION_TABLE}" ('
+        '"version" INT NOT NULL PRIMARY KEY, "name" VARCHAR(255) NOT NULL, '
+        '"applied_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)')
+    applied = []
+    for migration in await pending(connection_name):
+        if target is not None and migration.version > target:
+            break
+        logger.info("Applying migration %04d_%s", migration.version, migration.name)
+        await migration.upgrade(connection)
+        await connection.execute_query(
+            f'INSERT INTO "{VERSION_TABLE}" ("version", "name") '
+            f"VALUES ({migration.version}, '{migration.name}')")
+        applied.append(migration)
+    return applied
+
+
+async def check_schema_version(connection_name: str = "default") -> int:
+    """Raise SchemaVersionError unless every migration has been applied;
+    returns the schema version."""
+    connection = Tortoise.get_connection(connection_name)
+    applied = await applied_versions(connection)
+    missing = [f"{m.version:04d}_{m.name}" for m in discover() if m.version not in applied]
+    if missing:
+        raise SchemaVersionError(
+            f"Database schema is missing migrations {', '.join(missing)}; "
+            "run `python -m migrations` first")
+    version = max(applied, default=0)
+    known = discover()
+    if known and version > known[-1].version:
+        logger.warning("Database schema version %d is newer than this code (%d)",
+                       version, known[-1].version)
+    return version
@@ -0,0 +1,40 @@
+"""Apply or inspect schema migrations.
+
+    python -m migrations                 # apply every pending migration
+    python -m migrations upgrade --to 3  # apply pending migrations up to 0003
+    python -m migrations status          # list applied and pending migrations
+"""
+import argparse
+import asyncio
+import logging
+
+from tortoise import Tortoise
+
+from config import settings
+from database import tortoise_config
+from migrations import applied_versions, discover, upgrade
+
+
+async def main(command: str, db_url: str, target) -> None:
+    await Tortoise.init(config=tortoise_config(db_url))
+    try:
+        if command == "status":
+            applied = await applied_versions(Tortoise.get_connection("default"))
+            for migration in discover():
+                state = "applied" if migration.version in applied else "pending"
+                print(f"{migration.version:04d}_{migration.name}: {state}")
+            return
+        done = await upgrade(target=target)
+        print(f"Applied {len(done)} migration(s)" if done else "Schema is up to date")
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", nargs="?", choices=["upgrade", "status"], default="upgrade")
+    parser.add_argument("--to", type=int, dest="target", help="last version to apply")
+    parser.add_argument("--db-url", default=settings.database_url)
+    args = parser.parse_args()
+    asyncio.run(main(args.command, args.db_url, args.target))
@@ -10,6 +10,7 @@ def default_hash():
 
 class Location(models.Model):
     id = fields.IntField(pk=True)
+    # Indexed with timestamp (migrations/0004_lookup_indexes.py)
     pet = fields.ForeignKeyField("models.Pet", related_name="locations")
     latitude = fields.FloatField()
     longitude = fields.FloatField()
@@ -53,6 +54,7 @@ class PetStatus(str, Enum):
 
 class Pet(models.Model):
     id = fields.IntField(pk=True)
+    # Indexed with status (migrations/0004_lookup_indexes.py)
     owner = fields.ForeignKeyField("models.User", related_name="pets")
     name = fields.CharField(max_length=255)
     pet_type = fields.CharEnumField(PetType, max_length=16)
@@ -64,19 +66,26 @@ class Pet(models.Model):
     distinctive2 = fields.CharField(max_length=100, null=True, default=None)
     distinctive3 = fields.CharField(max_length=100, null=True, default=None)
     distinctive4 = fields.CharField(max_length=100, null=True, default=None)
-    picture = fields.CharField(max_length=1024)
-    # Optional extra pictures (up to 5 total including primary)
-    picture2 = fields.CharField(max_length=1024, null=True, default=None)
-    picture3 = fields.CharField(max_length=1024, null=True, default=None)
-    picture4 = fields.CharField(max_length=1024, null=True, default=None)
-    picture5 = fields.CharField(max_length=1024, null=True, default=None)
+    # Pictures live in PetPicture (related name "pictures")
     notes = fields.TextField()
     status = fields.CharEnumField(
         PetStatus, max_length=16, default=PetStatus.AT_HOME)
+    # Row version for ETags; queryset .update() calls must set it explicitly
+    updated_at = fields.DatetimeField(null=True, auto_now=True)
 
     def __str__(self):
         return self.name
 
+    def picture_urls(self) -> list:
+        """Picture URLs in display order; ``pictures`` must be prefetched."""
+        return [picture.url for picture in sorted(self.pictures, key=lambda p: p.position)]
+
+    @property
+    def cover_picture(self) -> str:
+        """The first picture (shown on banners and cards); needs ``pictures`` prefetched."""
+        urls = self.picture_urls()
+        return urls[0] if urls else ""
+
     def generate_qr_code(self, base_url: str = "http://localhost:5173"):
         import qrcode
         import io
@@ -87,3 +96,52 @@ class Pet(models.Model):
         img.save(buf, "PNG")
         buf.seek(0)
         return buf
+
+
+class PetPicture(models.Model):
+    """One picture of a pet. ``position`` orders them; 0 is the cover.
+
+    Dimensions are read from the upload when the picture is attached
+    (None for remote URLs).
+    """
+    id = fields.IntField(pk=True)
+    pet = fields.ForeignKeyField("models.Pet", related_name="pictures")
+    url = fields.CharField(max_length=1024, index=True)
+    position = fields.SmallIntField(default=0)
+    width = fields.IntField(null=True, default=None)
+    height = fields.IntField(null=True, default=None)
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = (("pet_id", "position"),)
+
+
+class ChangeLog(models.Model):
+    """Append-only feed of mutations for delta sync.
+
+    Entries are per owner; the auto-increment id orders them and is what
+    sync tokens point at. ``data`` carries the payload of entities that have
+    no table of their own (scan events).
+    """
+    id = fields.IntField(pk=True)
+    owner_id = fields.IntField()
+    entity = fields.CharField(max_length=16)
+    entity_id = fields.IntField()
+    op = fields.CharField(max_length=8)
+    data = fields.JSONField(null=True, default=None)
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = (("owner_id", "id"),)
+
+
+class PhotoHash(models.Model):
+    """Perceptual hash of an uploaded picture, for finding similar photos.
+
+    Uploads are content-addressed, so one row per picture URL covers every
+    pet showing it. ``dhash`` is the 64-bit difference hash in hex.
+    """
+    id = fields.IntField(pk=True)
+    picture = fields.CharField(max_length=1024, unique=True)
+    dhash = fields.CharField(max_length=16)
+    created_at = fields.DatetimeField(auto_now_add=True)
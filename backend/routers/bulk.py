@@ -0,0 +1,47 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Request
+from starlette.responses import StreamingResponse
+
+from models import User
+from services.bulk_io import MEDIA_TYPES, export_pets, format_for, import_pets
+from utils.auth import get_current_user
+
+# Included before the pets router: /pets/{pet_id} would capture these paths
+router = APIRouter(prefix="/api", tags=["Pets"])
+
+
+@router.post("/pets/import")
+async def import_pets_file(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Import pets for the current user from a CSV or NDJSON body (format from
+    ``format`` or the Content-Type), read as it is uploaded.
+
+    Rows are validated like POST /pets/ and inserted 500 per transaction;
+    invalid rows are skipped. Response: ``{"created", "failed", "errors":
+    [{"row", "errors"}], "truncated"}``. CSV ``pictures`` cells are
+    ``|``-separated.
+    http POST :8000/pets/import format==csv < pets.csv
+    http POST :8000/pets/import Content-Type:application/x-ndjson < pets.ndjson
+    """
+    fmt = format_for(format, request.headers.get("content-type"))
+    return await import_pets(current_user.id, request.stream(), fmt)
+
+
+@router.get("/pets/export")
+async def export_pets_file(
+    format: Literal["csv", "ndjson"] = "ndjson",
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Stream the current user's pets as CSV or NDJSON, in a form POST
+    /pets/import accepts.
+    http --stream GET :8000/pets/export format==csv
+    """
+    return StreamingResponse(
+        export_pets(current_user.id, format), media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="pets.{format}"'})
@@ -0,0 +1,49 @@
+import hashlib
+from typing import List, Optional
+
+from fastapi import APIRouter, Query, Request
+
+from schemas.pets import LostPetOut
+from services.image_pipeline import get_image_pipeline
+from services.lost_feed import get_lost_feed
+from utils.http_cache import cache_headers, etag_matches, not_modified, weak_etag
+from utils.pagination import NEXT_CURSOR_HEADER
+from utils.responses import RawJSONResponse
+
+router = APIRouter(prefix="/api", tags=["Feed"])
+
+# Page size bounds for ?limit=
+MAX_FEED_LIMIT = 100
+# Shared caches may serve a feed page this long without revalidating
+FEED_CACHE_CONTROL = "public, max-age=15"
+
+# Feed entries list picture variants, which appear after the upload
+get_image_pipeline().add_listener(get_lost_feed().refresh_pictures)
+
+
+@router.get("/feed/lost", response_model=List[LostPetOut])
+async def lost_pets_feed(
+    request: Request,
+    limit: int = Query(20, ge=1, le=MAX_FEED_LIMIT),
+    cursor: Optional[str] = None,
+):
+    """
+    Public feed of the pets currently lost, most recently active first
+    (reported, updated or sighted), with their latest sighting.
+
+    Served from an in-memory projection, never from the database. When more
+    pets follow, the ``X-Next-Cursor`` response header holds the ``cursor``
+    for the next page. Responses carry a weak ETag for If-None-Match.
+    http GET :8000/feed/lost
+    http GET :8000/feed/lost limit==50 cursor==WzE3MDAwMDAwMDAuMCwxMl0
+    """
+    feed = get_lost_feed()
+    body, next_cursor = feed.page(limit, cursor)
+    # From the page itself, not the in-process version counter: every worker
+    # (and a restarted one) gives the same content the same ETag
+    etag = weak_etag("lost-feed", hashlib.sha256(body).hexdigest(), next_cursor)
+    if etag_matches(request.headers, etag):
+        return not_modified(etag, FEED_CACHE_CONTROL)
+    headers = cache_headers(etag, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None,
+                            FEED_CACHE_CONTROL)
+    return RawJSONResponse(body, headers=headers)
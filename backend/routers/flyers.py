@@ -1,9 +1,14 @@
+import base64
+
 from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from models import Pet, User
 from utils.auth import get_current_user
 from services.pdf_generator import get_pdf_generator
+from services.image_pipeline import get_image_pipeline
+from services.pet_pictures import MAX_PICTURES
+from services.static_assets import asset_url
 from pathlib import Path
 from io import BytesIO
 
@@ -13,6 +18,13 @@ templates_dir = Path(__file__).resolve().parent.parent / \
     "static" / "flyers_templates"
 
 
+def qr_code_data_uri(pet: Pet) -> str:
+    """The pet's QR code (owner loaded) inlined as a data URI, so rendering the
+    flyer needs no authenticated request back to /api/qrcode."""
+    encoded = base64.b64encode(pet.generate_qr_code().getvalue()).decode()
+    return f"data:image/png;base64,{encoded}"
+
+
 def list_available_templates() -> list[str]:
     return sorted(
         template_file.stem
@@ -23,6 +35,7 @@ def list_available_templates() -> list[str]:
 
 # Initialize templates
 templates = Jinja2Templates(directory=str(templates_dir))
+templates.env.globals["asset_url"] = asset_url
 
 
 @router.get("/flyers/templates")
@@ -44,7 +57,7 @@ async def generate_flyer_html(
     """
     Generate an HTML flyer for a lost pet that can be printed or saved as PDF.
     """
-    pet = await Pet.get_or_none(id=pet_id).prefetch_related("owner")
+    pet = await Pet.get_or_none(id=pet_id).select_related("owner").prefetch_related("pictures")
     if not pet:
         raise HTTPException(status_code=404, detail="Pet not found")
 
@@ -63,12 +76,18 @@ async def generate_flyer_html(
 
     # Function to resolve image URLs
     def resolve_image_url(url: str) -> str:
+        # Print-sized variant keeps the flyer sharp without full-size originals
+        url = get_image_pipeline().best_url(url, "print")
         if url.startswith('http'):
             return url
         # Remove leading slashes and construct absolute URL
         cleaned = url.lstrip('/')
         return f"{base_url}/{cleaned}"
 
+    # Templates have a slot per picture; empty slots are left out
+    pictures = [resolve_image_url(url) for url in pet.picture_urls()]
+    pictures += [""] * (MAX_PICTURES - len(pictures))
+
     # Prepare template data
     template_data = {
         "pet_name": pet.name,
@@ -83,12 +102,12 @@ async def generate_flyer_html(
         "pet_distinctive3": pet.distinctive3 or "",
         "pet_distinctive4": pet.distinctive4 or "",
         "pet_description": pet.notes or "",
-        "pet_picture": resolve_image_url(pet.picture) if pet.picture else "",
-        "pet_picture2": resolve_image_url(pet.picture2) if pet.picture2 else "",
-        "pet_picture3": resolve_image_url(pet.picture3) if pet.picture3 else "",
-        "pet_picture4": resolve_image_url(pet.picture4) if pet.picture4 else "",
-        "pet_picture5": resolve_image_url(pet.picture5) if pet.picture5 else "",
-        "qr_code_url": f"{base_url}/api/qrcode/{pet.id}",
+        "pet_picture": pictures[0],
+        "pet_picture2": pictures[1],
+        "pet_picture3": pictures[2],
+        "pet_picture4": pictures[3],
+        "pet_picture5": pictures[4],
+        "qr_code_url": qr_code_data_uri(pet),
         "owner_name": f"{pet.owner.first_name} {pet.owner.last_name}",
         "owner_phone": pet.owner.phone,
         "owner_email": pet.owner.email,
@@ -118,7 +137,7 @@ async def generate_flyer_pdf(
     """
     Generate a PDF flyer for a lost pet using Chrome engine.
     """
-    pet = await Pet.get_or_none(id=pet_id).prefetch_related("owner")
+    pet = await Pet.get_or_none(id=pet_id).select_related("owner").prefetch_related("pictures")
     if not pet:
         raise HTTPException(status_code=404, detail="Pet not found")
 
@@ -134,12 +153,18 @@ async def generate_flyer_pdf(
 
     # Function to resolve image URLs
     def resolve_image_url(url: str) -> str:
+        # Print-sized variant keeps the flyer sharp without full-size originals
+        url = get_image_pipeline().best_url(url, "print")
         if url.startswith('http'):
             return url
         # Remove leading slashes and construct absolute URL
         cleaned = url.lstrip('/')
         return f"{base_url}/{cleaned}"
 
+    # Templates have a slot per picture; empty slots are left out
+    pictures = [resolve_image_url(url) for url in pet.picture_urls()]
+    pictures += [""] * (MAX_PICTURES - len(pictures))
+
     # Prepare template data
     template_data = {
         "pet_name": pet.name,
@@ -154,12 +179,12 @@ async def generate_flyer_pdf(
         "pet_distinctive3": pet.distinctive3 or "",
         "pet_distinctive4": pet.distinctive4 or "",
         "pet_description": pet.notes or "",
-        "pet_picture": resolve_image_url(pet.picture) if pet.picture else "",
-        "pet_picture2": resolve_image_url(pet.picture2) if pet.picture2 else "",
-        "pet_picture3": resolve_image_url(pet.picture3) if pet.picture3 else "",
-        "pet_picture4": resolve_image_url(pet.picture4) if pet.picture4 else "",
-        "pet_picture5": resolve_image_url(pet.picture5) if pet.picture5 else "",
-        "qr_code_url": f"{base_url}/api/qrcode/{pet.id}",
+        "pet_picture": pictures[0],
+        "pet_picture2": pictures[1],
+        "pet_picture3": pictures[2],
+        "pet_picture4": pictures[3],
+        "pet_picture5": pictures[4],
+        "qr_code_url": qr_code_data_uri(pet),
         "owner_name": f"{pet.owner.first_name} {pet.owner.last_name}",
         "owner_phone": pet.owner.phone,
         "owner_email": pet.owner.email,
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, Request, Depends
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime, timezone
 
-from models import User
+from models import Pet, User
+from services import change_log
+from services.lost_feed import get_lost_feed
 from utils.auth import get_current_user
 router = APIRouter(prefix="/api/pet-location", tags=["Pet Location & QR"])
 
@@ -15,12 +17,12 @@ class PetScanEvent(BaseModel):
     pet_id: int
     user_id: int
     scan_location: Optional[str] = None
-    scan_time: datetime = datetime.now(timezone.utc)
+    scan_time: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     qr_link: str
 
 
 @router.post("/scan")
-def record_pet_scan(event: PetScanEvent, request: Request, current_user: User = Depends(get_current_user)):
+async def record_pet_scan(event: PetScanEvent, request: Request, current_user: User = Depends(get_current_user)):
     """
     Record a pet scan event.
     Sample JSON for httpie:
@@ -34,6 +36,12 @@ def record_pet_scan(event: PetScanEvent, request: Request, current_user: User =
     """
     # Save scan event (replace with DB logic)
     pet_scan_events.append(event.model_dump())
+    # Surface the scan in the owner's sync feed
+    pet = await Pet.filter(id=event.pet_id).first().values("owner_id")
+    if pet:
+        await change_log.record_change(pet["owner_id"], change_log.SCAN, event.pet_id,
+                                       data=event.model_dump(mode="json"))
+        get_lost_feed().schedule_catch_up()
     # TODO: Notify owner by email (integrate email service)
     return {"message": "Scan recorded", "event": event}
 
@@ -44,15 +52,12 @@ async def get_qr_link(pet_id: int, current_user: User = Depends(get_current_user
     Get the QR link for a pet by pet ID.
     http GET :8000/pet-location/pet/1/qr-link
     """
-    # Fetch pet and owner's hash from DB
-    from models import Pet, User
-    pet = await Pet.get_or_none(id=pet_id).prefetch_related('owner')
+    # Owner's hash joined in the pet lookup
+    from models import Pet
+    pet = await Pet.filter(id=pet_id).first().values("owner__hash")
     if not pet:
         raise HTTPException(status_code=404, detail="Pet not found")
-    owner = await User.get_or_none(id=pet.owner_id)
-    if not owner:
-        raise HTTPException(status_code=404, detail="Owner not found")
-    qr_link = f"https://Petto.app/user-profile?hash={owner.hash}"
+    qr_link = f"https://Petto.app/user-profile?hash={pet['owner__hash']}"
     return {"pet_id": pet_id, "qr_link": qr_link}
 
 
@@ -1,18 +1,84 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+import asyncio
+import logging
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from typing import List, Literal, Optional
+from tortoise.transactions import in_transaction
+from tortoise.functions import Count, Max
 from models import Pet, User
 from utils.auth import get_current_user
+from services import change_log
+from services.banner_renderer import get_banner_renderer
+from services.image_pipeline import get_image_pipeline
+from services.lost_feed import get_lost_feed
+from services.pet_pictures import (add_pictures, attach_pictures, pets_with_picture, picture_list,
+                                   set_pictures)
+from utils.pagination import MAX_PAGE_LIMIT, NEXT_CURSOR_HEADER, fetch_page, ndjson_response
+from utils.http_cache import cache_headers, etag_matches, not_modified, weak_etag
+from utils.responses import RawJSONResponse
 from schemas.pets import (
+    PET_FIELD_COLUMNS,
     PetCreate,
     PetOut,
     PetUpdate,
     PetIn,  # backward compatibility
+    needs_pictures,
+    pet_columns,
     serialize_pet,
-    serialize_pet_list,
+    serialize_pet_row_json,
+    serialize_pet_rows_json,
+    serialize_pet_rows_ndjson,
+    serialize_sparse_pets_json,
+    serialize_sparse_pets_ndjson,
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api", tags=["Pets"])
 
+# Keeps background row-version bumps alive until they finish
+_touch_tasks: set = set()
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """``?fields=name,status`` -> ``["id", "name", "status"]`` (id is always included)."""
+    if fields is None:
+        return None
+    names = ["id"]
+    for name in (part.strip() for part in fields.split(",")):
+        if not name or name in names:
+            continue
+        if name not in PET_FIELD_COLUMNS:
+            raise HTTPException(status_code=400, detail=f"Unknown field: {name}")
+        names.append(name)
+    return names
+
+
+def _touch_pets_with_picture(url: str) -> None:
+    """Bump the row version of pets showing a picture whose variants just became
+    available, since ``picture_variants`` is part of their representation."""
+
+    async def touch() -> None:
+        try:
+            pet_ids = await pets_with_picture(url)
+            if pet_ids:
+                await Pet.filter(id__in=pet_ids).update(updated_at=datetime.now(timezone.utc))
+        except Exception as e:
+            logger.debug("Could not bump pets using %s: %s", url, e)
+
+    task = asyncio.get_running_loop().create_task(touch())
+    _touch_tasks.add(task)
+    task.add_done_callback(_touch_tasks.discard)
+
+
+get_image_pipeline().add_listener(_touch_pets_with_picture)
+
+def _queue_missing_variants(urls: List[str]) -> None:
+    """Generate variants for pictures uploaded before the image pipeline existed."""
+    pipeline = get_image_pipeline()
+    for url in urls:
+        pipeline.backfill(url)
+
 
 @router.post("/pets/", response_model=PetOut)
 async def create_pet(pet: PetCreate, current_user: User = Depends(get_current_user)):
@@ -33,39 +99,88 @@ async def create_pet(pet: PetCreate, current_user: User = Depends(get_current_us
     owner_id = current_user.id
     pet_data = pet.model_dump()
     pet_data["owner_id"] = owner_id
-    pictures = pet_data.pop("pictures", None)
-    if pictures:
-        # Map array to columns
-        pet_data["picture"] = pictures[0]
-        extras = pictures[1:]
-        column_names = ["picture2", "picture3", "picture4", "picture5"]
-        for col, val in zip(column_names, extras):
-            pet_data[col] = val
-    pet_obj = await Pet.create(**pet_data)
-    return serialize_pet(pet_obj)
+    picture = pet_data.pop("picture")
+    pictures = picture_list(pet_data.pop("pictures", None) or [picture])
+    async with in_transaction("default"):
+        pet_obj = await Pet.create(**pet_data)
+        await add_pictures({pet_obj.id: pictures})
+        await change_log.record_change(owner_id, change_log.PET, pet_obj.id)
+    get_lost_feed().schedule_catch_up()
+    _queue_missing_variants(pictures)
+    return serialize_pet(pet_obj, pictures)
 
 
 @router.get("/pets/", response_model=List[PetOut])
-async def get_pets(current_user: User = Depends(get_current_user)):
+async def get_pets(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+):
     """
-    Get a list of all pets.
+    Get a list of all pets, ordered by id.
+
+    With ``limit`` the list is paginated: when more pets follow, the
+    ``X-Next-Cursor`` response header holds the ``cursor`` for the next page.
+    ``format=ndjson`` streams every pet (after ``cursor``) as one JSON object per line.
+    ``fields=name,status`` returns only those fields (plus ``id``).
+    JSON responses carry a weak ETag; send it back in If-None-Match to get a 304.
     http GET :8000/pets/
+    http GET :8000/pets/ limit==50 cursor==eyJpZCI6NTB9
+    http GET :8000/pets/ fields==name,status,picture_variants
+    http --stream GET :8000/pets/ format==ndjson
     """
-    # Fetch all pets for the current user and serialize explicitly
-    pets = await Pet.filter(owner_id=current_user.id).all()
-    return serialize_pet_list(pets)
+    field_list = _parse_fields(fields)
+    columns = pet_columns(field_list)
+    query = Pet.filter(owner_id=current_user.id)
+    if format == "ndjson":
+        load = attach_pictures if needs_pictures(field_list) else None
+        if field_list is None:
+            return ndjson_response(query, columns, serialize_pet_rows_ndjson, cursor, load)
+        return ndjson_response(
+            query, columns, lambda rows: serialize_sparse_pets_ndjson(rows, field_list), cursor, load)
+
+    # Any insert, delete or update changes the count, highest id or latest
+    # update time, so the list version is known without reading the rows
+    version = await query.annotate(
+        count=Count("id"), last_id=Max("id"), last_update=Max("updated_at"),
+    ).values("count", "last_id", "last_update")
+    etag = weak_etag("pets", current_user.id, *version[0].values(), limit, cursor, fields)
+    if etag_matches(request.headers, etag):
+        return not_modified(etag)
+
+    # Fetch only the output columns (pictures for the whole page in one more
+    # query) and encode the list in one pass
+    rows, next_cursor = await fetch_page(query, columns, limit, cursor)
+    if needs_pictures(field_list):
+        await attach_pictures(rows)
+    headers = cache_headers(etag, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+    if field_list is None:
+        return RawJSONResponse(serialize_pet_rows_json(rows), headers=headers)
+    return RawJSONResponse(serialize_sparse_pets_json(rows, field_list), headers=headers)
 
 
 @router.get("/pets/{pet_id}", response_model=PetOut)
-async def get_pet(pet_id: int, current_user: User = Depends(get_current_user)):
+async def get_pet(pet_id: int, request: Request, fields: Optional[str] = None,
+                  current_user: User = Depends(get_current_user)):
     """
-    Get a pet by ID.
+    Get a pet by ID. Supports ``fields=`` and If-None-Match like the list.
     http GET :8000/pets/1
+    http GET :8000/pets/1 fields==name,status
     """
-    pet = await Pet.get_or_none(id=pet_id, owner_id=current_user.id)
-    if not pet:
+    field_list = _parse_fields(fields)
+    row = await Pet.filter(id=pet_id, owner_id=current_user.id).first().values(
+        *pet_columns(field_list), "updated_at")
+    if not row:
         raise HTTPException(status_code=404, detail="Pet not found")
-    return serialize_pet(pet)
+    etag = weak_etag("pet", pet_id, row["updated_at"], fields)
+    if etag_matches(request.headers, etag):
+        return not_modified(etag)
+    if needs_pictures(field_list):
+        await attach_pictures([row])
+    return RawJSONResponse(serialize_pet_row_json(row, field_list), headers=cache_headers(etag))
 
 
 @router.put("/pets/{pet_id}", response_model=PetOut)
@@ -82,32 +197,39 @@ async def update_pet(pet_id: int, pet: PetUpdate, current_user: User = Depends(g
         }
         http PUT :8000/pets/1 owner_id:=1 name=Max pet_type=Cat picture="https://example.com/max.jpg" notes="Black cat, shy"
     """
-    pet_obj = await Pet.get_or_none(id=pet_id, owner_id=current_user.id)
+    pet_obj = await Pet.get_or_none(id=pet_id, owner_id=current_user.id).prefetch_related("pictures")
     if not pet_obj:
         raise HTTPException(status_code=404, detail="Pet not found")
-    
+    current = pet_obj.picture_urls()
+
     update_data = pet.model_dump(exclude_unset=True)
     pictures = update_data.pop("pictures", None)
-
+    picture = update_data.pop("picture", None)
     if pictures is not None:
-        # Reset all columns then assign
-        update_data["picture"] = pictures[0] if pictures else pet_obj.picture
-        column_names = ["picture2", "picture3", "picture4", "picture5"]
-
-        for col in column_names:
-            update_data[col] = None
-        extras = pictures[1:]
-        for col, val in zip(column_names, extras):
-            update_data[col] = val
-            
+        # The list replaces every picture; an empty list keeps only the cover
+        pictures = pictures or current[:1]
+    elif picture:
+        # A single picture replaces the cover
+        pictures = [picture] + current[1:]
+
     # Enforce ownership
     if "owner_id" in update_data:
         update_data["owner_id"] = current_user.id
-    # Use queryset update to avoid partial instance save issues
-    if update_data:
-        await Pet.filter(id=pet_id, owner_id=current_user.id).update(**update_data)
-    pet_obj = await Pet.get(id=pet_id)
-    return serialize_pet(pet_obj)
+    if update_data or pictures is not None:
+        # The loaded pet is updated in place (only the changed columns are
+        # written, updated_at by auto_now), so it needs no re-read for the response
+        pet_obj.update_from_dict(update_data)
+        async with in_transaction("default"):
+            await pet_obj.save(update_fields=[*update_data, "updated_at"])
+            if pictures is not None:
+                pictures = await set_pictures(pet_id, pictures)
+            await change_log.record_change(current_user.id, change_log.PET, pet_id)
+        get_lost_feed().schedule_catch_up()
+        get_banner_renderer().invalidate_pet(pet_id)
+    if pictures is None:
+        pictures = current
+    _queue_missing_variants(pictures)
+    return serialize_pet(pet_obj, pictures)
 
 
 @router.delete("/pets/{pet_id}", response_model=dict)
@@ -116,8 +238,10 @@ async def delete_pet(pet_id: int, current_user: User = Depends(get_current_user)
     Delete a pet by ID.
     http DELETE :8000/pets/1
     """
-    pet_obj = await Pet.get_or_none(id=pet_id, owner_id=current_user.id)
-    if not pet_obj:
-        raise HTTPException(status_code=404, detail="Pet not found")
-    await pet_obj.delete()
+    async with in_transaction("default"):
+        if not await Pet.filter(id=pet_id, owner_id=current_user.id).delete():
+            raise HTTPException(status_code=404, detail="Pet not found")
+        await change_log.record_change(current_user.id, change_log.PET, pet_id, change_log.DELETE)
+    get_lost_feed().schedule_catch_up()
+    get_banner_renderer().invalidate_pet(pet_id)
     return {"message": "Pet deleted successfully"}
@@ -2,7 +2,10 @@ from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 import qrcode
 import io
+from datetime import datetime, timezone
 from models import Pet, User
+from services import change_log
+from services.lost_feed import get_lost_feed
 from utils.auth import get_current_user
 
 router = APIRouter(prefix="/api", tags=["QR Code"])
@@ -15,7 +18,7 @@ async def generate_qr_code(pet_id: int, current_user: User = Depends(get_current
     Returns a PNG image.
     http GET :8000/qrcode/1
     """
-    pet = await Pet.get_or_none(id=pet_id).prefetch_related("owner")
+    pet = await Pet.get_or_none(id=pet_id).select_related("owner")
     if not pet:
         raise HTTPException(status_code=404, detail="Pet not found")
     buf = pet.generate_qr_code()
@@ -45,5 +48,11 @@ async def scan_qr_code(scan_id: str, current_user: User = Depends(get_current_us
 
     # In a real application, you would send an email notification here.
     print(f"QR code for pet {pet.name} (owner: {owner.email}) was scanned.")
+    await change_log.record_change(owner.id, change_log.SCAN, pet.id, data={
+        "pet_id": pet.id,
+        "user_id": current_user.id,
+        "scan_time": datetime.now(timezone.utc).isoformat(),
+    })
+    get_lost_feed().schedule_catch_up()
 
     return {"message": "Scan recorded successfully"}
@@ -0,0 +1,93 @@
+from typing import List, Literal, Optional
+
+import anyio
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+
+from models import Pet, PetStatus, PetType
+from schemas.pets import (
+    PET_OUT_COLUMNS,
+    PetOut,
+    SimilarPetOut,
+    serialize_pet_rows_json,
+    serialize_similar_pets_json,
+)
+from services.image_pipeline import get_image_pipeline
+from services.pet_pictures import attach_pictures
+from services.pet_search import get_pet_search
+from services.photo_match import DEFAULT_MAX_DISTANCE, MAX_DISTANCE, dhash_bytes, get_photo_index
+from services.upload_storage import MAX_FILE_SIZE_BYTES, sniff_image_type
+from utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from utils.responses import RawJSONResponse
+
+router = APIRouter(prefix="/api", tags=["Search"])
+
+# Page size bounds for ?limit=
+MAX_SEARCH_LIMIT = 100
+
+# Hash new uploads for photo matching once their variants are ready
+get_image_pipeline().add_listener(get_photo_index().on_picture_ready)
+
+
+@router.get("/search/pets", response_model=List[PetOut])
+async def search_pets(
+    q: str = Query(..., min_length=1, max_length=200),
+    pet_type: Optional[PetType] = None,
+    status: Literal["lost", "found"] = PetStatus.LOST.value,
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_LIMIT),
+    cursor: Optional[str] = None,
+):
+    """
+    Search lost (or found) pets by name, breed, distinctive marks and notes.
+
+    Every word must appear; the last one may be a prefix. Results are ranked
+    best match first. When more results follow, the ``X-Next-Cursor``
+    response header holds the ``cursor`` for the next page.
+    Public: pets at home are never returned.
+    http GET :8000/search/pets q=="brown collar"
+    http GET :8000/search/pets q==labrador pet_type==Dog status==found limit==10
+    """
+    # Ranked results are paged by position; the cursor holds the offset
+    offset = decode_cursor(cursor) if cursor else 0
+    ids = await get_pet_search().search(
+        q, status, pet_type.value if pet_type else None, limit + 1, offset)
+    headers = None
+    if len(ids) > limit:
+        ids = ids[:limit]
+        headers = {NEXT_CURSOR_HEADER: encode_cursor(offset + limit)}
+    rows = await attach_pictures(await Pet.filter(id__in=ids).values(*PET_OUT_COLUMNS)) if ids else []
+    rank = {pet_id: position for position, pet_id in enumerate(ids)}
+    rows.sort(key=lambda row: rank[row["id"]])
+    return RawJSONResponse(serialize_pet_rows_json(rows), headers=headers)
+
+
+@router.post("/search/pets/similar", response_model=List[SimilarPetOut])
+async def similar_pets(
+    image: UploadFile = File(...),
+    pet_type: Optional[PetType] = None,
+    status: Literal["lost", "found"] = PetStatus.LOST.value,
+    days: Optional[int] = Query(None, ge=1, le=3650),
+    max_distance: int = Query(DEFAULT_MAX_DISTANCE, ge=0, le=MAX_DISTANCE),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_LIMIT),
+):
+    """
+    Lost (or found) pets whose pictures look like the uploaded photo.
+
+    Photos are compared by perceptual hash; ``distance`` is the number of
+    differing bits (0 = same picture, up to ``max_distance``), closest first.
+    ``days`` keeps pets last seen within that many days.
+    Public: pets at home are never returned.
+    http -f POST :8000/search/pets/similar image@found.jpg pet_type==Dog days==30
+    """
+    data = await image.read(MAX_FILE_SIZE_BYTES + 1)
+    if len(data) > MAX_FILE_SIZE_BYTES:
+        raise HTTPException(status_code=400, detail="File too large (max 5MB)")
+    if sniff_image_type(data[:16]) is None:
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    try:
+        value = await anyio.to_thread.run_sync(dhash_bytes, data)
+    except (OSError, ValueError):
+        raise HTTPException(status_code=400, detail="Could not read image")
+    matches = await get_photo_index().similar_pets(
+        value, max_distance, status, pet_type.value if pet_type else None, days, limit,
+        PET_OUT_COLUMNS)
+    return RawJSONResponse(serialize_similar_pets_json(matches))
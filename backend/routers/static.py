@@ -2,8 +2,9 @@
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.templating import Jinja2Templates
-import mimetypes
 from pathlib import Path
+from services.static_assets import asset_url
+from services.upload_serving import get_upload_cache, resolve_upload_path, upload_response
 
 router = APIRouter()
 
@@ -15,6 +16,7 @@ static_dir = base_dir
 # Set up Jinja2 templates (e.g., /templates/index.html)
 templates_dir = base_dir / 'templates'
 templates = Jinja2Templates(directory=str(templates_dir))
+templates.env.globals["asset_url"] = asset_url
 
 
 @router.get('/', response_class=HTMLResponse)
@@ -38,21 +40,19 @@ async def favicon():
 
 
 @router.get('/static/uploads/{user_id}/{filename}')
-async def get_uploaded_image(user_id: str, filename: str):
+async def get_uploaded_image(request: Request, user_id: str, filename: str):
     """Serve an uploaded image from the uploads directory.
 
     Security:
     - Prevent path traversal by resolving and ensuring the path stays within uploads_dir.
-    - Only serve existing regular files.
-    - Derive content-type via mimetypes (fallback to application/octet-stream).
+    - Only serve existing regular files (never internal dot-files such as resumable sessions).
+    Performance: strong ETag / If-None-Match (304 without disk access), single
+    byte ranges, hot files from memory and cold files via sendfile when available.
     """
-    requested_path = (uploads_dir / user_id / filename).resolve()
-    if not str(requested_path).startswith(str(uploads_dir.resolve())):
+    requested_path = resolve_upload_path(f"{user_id}/{filename}")
+    if requested_path is None:
         raise HTTPException(status_code=400, detail="Invalid path")
-    if not requested_path.is_file():
-        raise HTTPException(status_code=404, detail="File not found")
-    media_type, _ = mimetypes.guess_type(str(requested_path))
-    return FileResponse(str(requested_path), media_type=media_type or 'application/octet-stream')
+    return await upload_response(requested_path, request.headers, get_upload_cache())
 
 
 @router.get('/{page_name}', response_class=HTMLResponse)
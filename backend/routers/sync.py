@@ -0,0 +1,31 @@
+from typing import Optional
+
+import pydantic_core
+from fastapi import APIRouter, Depends
+
+from models import User
+from schemas.sync import SyncOut
+from services import change_log
+from utils.auth import get_current_user
+from utils.responses import RawJSONResponse
+
+router = APIRouter(prefix="/api", tags=["Sync"])
+
+
+@router.get("/sync", response_model=SyncOut)
+async def sync(since: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """
+    Changes to the current user's pets, profile and scans since a sync token.
+
+    Without ``since`` a full snapshot is returned. Each response carries a
+    ``token`` to pass as ``since`` next time; keep calling while ``has_more``.
+    A ``410`` means the token predates the retained change log: drop local
+    state and sync again without ``since``.
+    http GET :8000/sync
+    http GET :8000/sync since==eyJpZCI6MTIsInRzIjoxNzAwMDAwMDAwfQ
+    """
+    if since is None:
+        result = await change_log.snapshot(current_user.id)
+    else:
+        result = await change_log.changes_since(current_user.id, change_log.decode_token(since))
+    return RawJSONResponse(pydantic_core.to_json(result))
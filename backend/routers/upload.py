@@ -1,23 +1,21 @@
 import os
-import uuid
-from typing import Literal
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+import asyncio
+from typing import List
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Header, Request, Response, status
 from fastapi.responses import JSONResponse
 from models import User
 from utils.auth import get_current_user
+from services.upload_storage import find_upload, save_upload
+from services.image_pipeline import get_image_pipeline
+from services import resumable_uploads
+from schemas.uploads import ResumableUploadCreate, ResumableUploadOut
 
 router = APIRouter(prefix="/api", tags=["Upload"])
 
-BASE_STATIC_SUBDIR = "uploads"
-
-# Resolve absolute path relative to this file: ../static/uploads
-STATIC_ROOT = os.path.join(os.path.dirname(__file__), "../static")
-UPLOAD_DIR = os.path.normpath(os.path.join(STATIC_ROOT, BASE_STATIC_SUBDIR))
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-MAX_FILE_SIZE_BYTES = 5 * 1024 * 1024  # 5MB
 ALLOWED_CONTENT_TYPES: set[str] = {"image/jpeg", "image/png", "image/webp", "image/gif"}
 ALLOWED_EXTENSIONS: set[str] = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+# Matches the maximum number of pictures accepted by PetCreate
+MAX_BATCH_FILES = 5
 
 
 def _validate_image_file(upload: UploadFile):
@@ -35,28 +33,150 @@ async def upload_image(
 ):
     """Upload a single image file and return a relative static URL.
 
+    The file is streamed to disk in chunks (never fully held in memory), its
+    type is checked against the magic bytes and oversize uploads are rejected
+    as soon as they cross the 5MB cap. Files are stored by content hash, so
+    uploading the same photo again returns the existing URL. Resized WebP variants are generated in
+    the background and exposed later through ``PetOut.picture_variants``.
+
     Security: requires authentication; future enhancement could add per-user quota.
     Response shape matches frontend expectation: { "url": "/static/uploads/<file>" }
     """
     _validate_image_file(image)
-    # Read file content and validate size
-    content = await image.read()
-    if len(content) > MAX_FILE_SIZE_BYTES:
-        raise HTTPException(status_code=400, detail="File too large (max 5MB)")
-
-    ext = os.path.splitext(image.filename or "")[-1].lower() or ".jpg"
-    filename = f"{uuid.uuid4().hex}{ext}"
-    dest_path = os.path.join(UPLOAD_DIR, str(current_user.id))
-    if not os.path.exists(dest_path):
-        os.makedirs(dest_path, exist_ok=True)
-    dest_file = os.path.join(dest_path, f"{filename}")
-    with open(dest_file, "wb") as f:
-        f.write(content)
-
-    base = f"static/{BASE_STATIC_SUBDIR}/"
-    # if base not exits, create the directory
-
-    url = f"{base}{current_user.id}/{filename}"
-    
+    url, created = await save_upload(image, current_user.id)
+    if created:
+        # Resized variants (thumb/card/print) are produced in the background
+        get_image_pipeline().submit(url)
+
     # Return path relative to static mount
     return JSONResponse({"url": url})
+
+
+async def _store_batch_item(index: int, upload: UploadFile, user_id: int) -> dict:
+    result = {"index": index, "filename": upload.filename, "url": None, "error": None}
+    try:
+        _validate_image_file(upload)
+        url, created = await save_upload(upload, user_id)
+    except HTTPException as e:
+        result["error"] = e.detail
+        return result
+    if created:
+        get_image_pipeline().submit(url)
+    result["url"] = url
+    return result
+
+
+@router.post("/upload/batch")
+async def upload_images(
+    images: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+):
+    """Upload up to five images in one multipart request.
+
+    Files are validated and streamed to disk concurrently. Per-file failures
+    do not fail the request; ``urls`` keeps the order of the successful files
+    so it can be sent as-is in ``PetCreate.pictures``.
+    http -f POST :8000/api/upload/batch images@rex1.jpg images@rex2.jpg
+    Response: { "urls": [...], "results": [{ "index", "filename", "url", "error" }] }
+    """
+    if len(images) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=400, detail=f"Maximum {MAX_BATCH_FILES} images per request")
+    results = await asyncio.gather(*(
+        _store_batch_item(index, upload, current_user.id)
+        for index, upload in enumerate(images)
+    ))
+    return {
+        "urls": [result["url"] for result in results if result["url"]],
+        "results": results,
+    }
+
+
+@router.get("/upload/{sha256}")
+async def find_uploaded_image(
+    sha256: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Look up a previous upload by the SHA-256 of its content.
+
+    Lets clients skip re-sending a photo they already uploaded:
+    http GET :8000/api/upload/<sha256> -> { "url": "static/uploads/<user>/<sha256>.jpg" }
+    """
+    url = await find_upload(current_user.id, sha256.lower())
+    if not url:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return {"url": url}
+
+
+def _offset_headers(session: dict) -> dict:
+    return {
+        "Upload-Offset": str(session["offset"]),
+        "Upload-Length": str(session["length"]),
+        "Cache-Control": "no-store",
+    }
+
+
+@router.post("/upload/resumable", response_model=ResumableUploadOut, status_code=status.HTTP_201_CREATED)
+async def create_resumable_upload(
+    body: ResumableUploadCreate,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+):
+    """Start a resumable upload for flaky connections.
+
+    Protocol (tus-style):
+    1. POST {length, sha256?} -> {id, offset: 0, ...}
+    2. PATCH /upload/resumable/{id} with header Upload-Offset and a raw chunk
+       body; repeat until offset == length. The final PATCH returns the url.
+    3. After a failure, HEAD/GET /upload/resumable/{id} returns the stored
+       offset (Upload-Offset header) to resume from, and the url once the
+       upload is complete.
+    Sessions, completed or not, expire after 24h.
+    """
+    session = await resumable_uploads.create_session(
+        current_user.id, body.length, body.sha256.lower() if body.sha256 else None)
+    response.headers.update(_offset_headers(session))
+    response.headers["Location"] = f"/api/upload/resumable/{session['id']}"
+    return session
+
+
+@router.api_route("/upload/resumable/{session_id}", methods=["GET", "HEAD"], response_model=ResumableUploadOut)
+async def get_resumable_upload(
+    session_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+):
+    """Current offset of a resumable upload."""
+    session = await resumable_uploads.get_session(session_id, current_user.id)
+    response.headers.update(_offset_headers(session))
+    return session
+
+
+@router.patch("/upload/resumable/{session_id}", response_model=ResumableUploadOut)
+async def patch_resumable_upload(
+    session_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    current_user: User = Depends(get_current_user),
+):
+    """Append a chunk at ``Upload-Offset``; the body is streamed to disk.
+
+    Re-sending an already stored range is accepted (idempotent retries); an
+    offset past the stored data is rejected with 409.
+    """
+    session = await resumable_uploads.get_session(session_id, current_user.id)
+    session = await resumable_uploads.write_chunk(session, upload_offset, request.stream())
+    response.headers.update(_offset_headers(session))
+    return session
+
+
+@router.delete("/upload/resumable/{session_id}", response_model=dict)
+async def delete_resumable_upload(
+    session_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Abort a resumable upload and discard the received bytes."""
+    session = await resumable_uploads.get_session(session_id, current_user.id)
+    await resumable_uploads.abort_session(session)
+    return {"message": "Upload aborted"}
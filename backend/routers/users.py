@@ -1,8 +1,8 @@
-from schemas.users import UserCreate, UserOut, UserRegister, PasswordRecoveryRequest, PasswordResetRequest, LoginRequest
+from schemas.users import UserCreate, UserOut, UserRegister, PasswordRecoveryRequest, PasswordResetRequest, LoginRequest, USER_OUT_COLUMNS, serialize_user_rows_json, serialize_user_rows_ndjson
 from utils.auth import (
     REFRESH_TOKEN_COOKIE_NAME,
-    get_password_hash,
-    verify_password,
+    hash_password,
+    verify_and_update_password,
     create_access_token,
     get_current_user,
     create_refresh_token,
@@ -10,15 +10,20 @@ from utils.auth import (
     set_auth_cookies,
     clear_auth_cookies,
     verify_refresh_token,
+    invalidate_user,
 )
-from models import User
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends, Request, Response, status
+from models import ChangeLog, Pet, User
+from services import change_log
+from services.banner_renderer import get_banner_renderer
+from services.lost_feed import get_lost_feed
+from tortoise.transactions import in_transaction
+from utils.pagination import MAX_PAGE_LIMIT, NEXT_CURSOR_HEADER, fetch_page, ndjson_response
+from utils.responses import RawJSONResponse
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 from json import JSONDecodeError
-from slowapi import Limiter
-from middleware.rate_limit import limiter, get_rate_limit
 # Refresh token endpoint
 
 
@@ -61,7 +66,6 @@ async def refresh_token(request: Request, response: Response):
 
 
 @router.post("/register", response_model=UserOut)
-@limiter.limit(get_rate_limit("auth", "register"))
 async def register(request: Request, user: UserRegister):
     """
     Register a new user.
@@ -71,7 +75,7 @@ async def register(request: Request, user: UserRegister):
     existing_user = await User.get_or_none(email=user.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     user_data = user.dict()
     user_data["password"] = hashed_password
     user_obj = await User.create(**user_data)
@@ -116,8 +120,9 @@ async def password_reset(request: PasswordResetRequest):
     user = await User.get_or_none(id=user.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    user.password = get_password_hash(request.new_password)
+    user.password = await hash_password(request.new_password)
     await user.save(update_fields=["password"])
+    invalidate_user(user.id)
     return {"message": "Password reset successful"}
 
 
@@ -142,26 +147,40 @@ async def create_user(user: UserCreate):
     }
     http POST :8000/users/ first_name=John last_name=Doe email=john@example.com phone=1234567890 full_address="123 Main St, City" recovery_bounty:=50.0
     """
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     user_data = user.model_dump()
     user_data["password"] = hashed_password
     user_obj = await User.create(**user_data)
     return user_obj
+
+
+async def authenticate_user(email: str, password: str) -> User:
+    """Check credentials, upgrading the stored hash if its bcrypt cost changed."""
+    user = await User.get_or_none(email=email)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
+    valid, new_hash = await verify_and_update_password(password, user.password)
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
+    if new_hash:
+        user.password = new_hash
+        await user.save(update_fields=["password"])
+        invalidate_user(user.id)
+    return user
+
 # Login route
 
 
 @router.post("/login")
-@limiter.limit(get_rate_limit("auth", "login"))
 async def loginJson(request: Request, login_request: LoginRequest, response: Response):
     """
     Authenticate user and return JWT token.
     Request body: {email, password}
     Response: {access_token, token_type}
     """
-    user = await User.get_or_none(email=login_request.email)
-    if not user or not verify_password(login_request.password, user.password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
+    user = await authenticate_user(login_request.email, login_request.password)
     user_data = {
         "id": user.id,
         "first_name": user.first_name,
@@ -195,10 +214,7 @@ async def loginForm(form_data: OAuth2PasswordRequestForm = Depends()):
     Request body: form-data with username and password.
     Response: {access_token, token_type}
     """
-    user = await User.get_or_none(email=form_data.username)
-    if not user or not verify_password(form_data.password, user.password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
+    user = await authenticate_user(form_data.username, form_data.password)
     access_token = create_access_token(data={"sub": str(user.id)})
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -212,15 +228,28 @@ async def get_me(current_user: User = Depends(get_current_user)):
 
 
 @router.get("/users/", response_model=List[UserOut])
-async def get_users(current_user: User = Depends(get_current_user)):
+async def get_users(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    current_user: User = Depends(get_current_user),
+):
     """
-    Get a list of all users (requires authentication).
+    Get a list of all users (requires authentication), ordered by id.
+    Supports ``limit``/``cursor`` pagination (next cursor in the
+    ``X-Next-Cursor`` header) and ``format=ndjson`` streaming.
     """
     """
     Get a list of all users.
     http GET :8000/users/
+    http GET :8000/users/ limit==100
     """
-    return await User.all()
+    query = User.all()
+    if format == "ndjson":
+        return ndjson_response(query, USER_OUT_COLUMNS, serialize_user_rows_ndjson, cursor)
+    rows, next_cursor = await fetch_page(query, USER_OUT_COLUMNS, limit, cursor)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return RawJSONResponse(serialize_user_rows_json(rows), headers=headers)
 
 
 @router.get("/users/{user_id}", response_model=UserOut)
@@ -260,7 +289,13 @@ async def update_user(user_id: int, user: UserCreate, current_user: User = Depen
     user_obj = await User.get_or_none(id=user_id)
     if not user_obj:
         raise HTTPException(status_code=404, detail="User not found")
-    await user_obj.update_from_dict(user.dict()).save()
+    user_data = user.dict()
+    user_data["password"] = await hash_password(user.password)
+    async with in_transaction("default"):
+        await user_obj.update_from_dict(user_data).save()
+        await change_log.record_change(user_id, change_log.USER, user_id)
+    invalidate_user(user_id)
+    get_banner_renderer().invalidate_owner(user_id)
     return user_obj
 
 
@@ -276,5 +311,15 @@ async def delete_user(user_id: int, current_user: User = Depends(get_current_use
     user_obj = await User.get_or_none(id=user_id)
     if not user_obj:
         raise HTTPException(status_code=404, detail="User not found")
-    await user_obj.delete()
+    async with in_transaction("default"):
+        pet_ids = await Pet.filter(owner_id=user_id).values_list("id", flat=True)
+        await user_obj.delete()
+        # The user's feed goes with them; nobody else syncs it. Tombstones for
+        # their pets stay (until pruned) for projections such as the lost pets feed.
+        await ChangeLog.filter(owner_id=user_id).delete()
+        for pet_id in pet_ids:
+            await change_log.record_change(user_id, change_log.PET, pet_id, change_log.DELETE)
+    get_lost_feed().schedule_catch_up()
+    invalidate_user(user_id)
+    get_banner_renderer().invalidate_owner(user_id)
     return {"message": "User deleted successfully"}
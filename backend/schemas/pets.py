@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field, model_validator
-from typing import Optional, List
-from datetime import date
+import pydantic_core
+from pydantic import BaseModel, Field, TypeAdapter, model_validator
+from typing import Any, Iterable, Mapping, Optional, List, Dict, Tuple
+from datetime import date, datetime
 from models import PetType, PetStatus
+from services.image_pipeline import get_image_pipeline
 
 
 class PetBase(BaseModel):
@@ -73,54 +75,162 @@ class PetUpdate(BaseModel):
 class PetOut(PetBase):
     id: int
     owner_id: int
+    # Resized variants per picture URL: {"<url>": {"thumb": ..., "card": ..., "print": ...}}
+    picture_variants: Optional[Dict[str, Dict[str, str]]] = None
 
     class Config:
         from_attributes = True  # Pydantic v2: allow ORM object attr reading
 
 
+class SimilarPetOut(PetOut):
+    # Hamming distance (0-64) between the query photo and the pet's closest picture
+    distance: int
+
+
+class PetSighting(BaseModel):
+    # Where the pet's QR code was scanned (free text), if given
+    location: Optional[str] = None
+    seen_at: datetime
+
+
+class LostPetOut(PetOut):
+    last_sighting: Optional[PetSighting] = None
+
+
 # Backwards compatibility exports (old names)
 PetIn = PetCreate
 
 
+# Columns read to build a PetOut; list endpoints fetch only these via values()
+# and add the pictures with services.pet_pictures.attach_pictures()
+PET_OUT_COLUMNS = [
+    "id", "owner_id", "name", "pet_type", "breed", "last_seen_date",
+    "last_seen_geo", "gender", "distinctive1", "distinctive2", "distinctive3",
+    "distinctive4", "notes", "status",
+]
+
+# PetOut fields built from the pet's PetPicture rows
+PICTURE_FIELDS = {"picture", "pictures", "picture_variants"}
+# PetOut field -> columns needed to build it, for ?fields= projections
+PET_FIELD_COLUMNS: Dict[str, List[str]] = {
+    **{name: [name] for name in PetOut.model_fields},
+    **{name: [] for name in PICTURE_FIELDS},
+}
+
+pet_list_adapter = TypeAdapter(List[PetOut])
+pet_out_adapter = TypeAdapter(PetOut)
+similar_pet_list_adapter = TypeAdapter(List[SimilarPetOut])
+lost_pet_out_adapter = TypeAdapter(LostPetOut)
+
+
 # Serializer helpers
-def serialize_pet(p) -> PetOut:
-    """Convert a Pet ORM instance to PetOut.
+def pet_payload(row: Mapping[str, Any]) -> Dict[str, Any]:
+    """Build the PetOut fields from a row of PET_OUT_COLUMNS plus ``pictures``.
+
+    Pictures are returned in order as ``pictures`` (the first one also as
+    ``picture``) plus their resized variants; internal columns never reach
+    the output.
+    """
+    pictures_ordered: List[str] = [url for url in row.get("pictures") or () if url]
+    primary = pictures_ordered[0] if pictures_ordered else ""
+    pipeline = get_image_pipeline()
+    picture_variants = {
+        url: variants for url in pictures_ordered
+        if (variants := pipeline.variants_for(url))
+    }
+    return {
+        "id": row.get("id"),
+        "owner_id": row.get("owner_id"),
+        "name": row.get("name"),
+        "pet_type": row.get("pet_type"),
+        "breed": row.get("breed"),
+        "last_seen_date": row.get("last_seen_date"),
+        "last_seen_geo": row.get("last_seen_geo"),
+        "gender": row.get("gender"),
+        "distinctive1": row.get("distinctive1"),
+        "distinctive2": row.get("distinctive2"),
+        "distinctive3": row.get("distinctive3"),
+        "distinctive4": row.get("distinctive4"),
+        "picture": primary,
+        "notes": row.get("notes"),
+        "status": row.get("status"),
+        "pictures": pictures_ordered or None,
+        "picture_variants": picture_variants or None,
+    }
+
+
+def needs_pictures(fields: Optional[List[str]]) -> bool:
+    """Whether a (sparse) fieldset includes picture fields."""
+    return fields is None or not PICTURE_FIELDS.isdisjoint(fields)
+
+
+def pet_columns(fields: Optional[List[str]]) -> List[str]:
+    """Columns to select for a sparse fieldset (all output columns when None)."""
+    if fields is None:
+        return list(PET_OUT_COLUMNS)
+    columns = ["id"]
+    for name in fields:
+        columns += [col for col in PET_FIELD_COLUMNS[name] if col not in columns]
+    return columns
+
+
+def serialize_pet(p, pictures: Optional[List[str]] = None) -> PetOut:
+    """Convert a Pet ORM instance (with ``pictures`` prefetched) to PetOut.
 
     Accepts a Tortoise Pet model (duck-typed) and constructs a PetOut using explicit fields
-    to avoid accidental leakage of internal attributes.
+    to avoid accidental leakage of internal attributes. Callers that just
+    stored the pictures pass their URLs as ``pictures`` instead of prefetching.
     """
-    pictures_ordered: List[str] = [
-        val for val in [
-            getattr(p, "picture", None),
-            getattr(p, "picture2", None),
-            getattr(p, "picture3", None),
-            getattr(p, "picture4", None),
-            getattr(p, "picture5", None),
-        ] if val
-    ]
-    primary = pictures_ordered[0] if pictures_ordered else getattr(
-        p, "picture", "")
-    return PetOut.model_validate(
-        {
-            "id": p.id,
-            "owner_id": p.owner_id,
-            "name": p.name,
-            "pet_type": p.pet_type,
-            "breed": getattr(p, "breed", None),
-            "last_seen_date": getattr(p, "last_seen_date", None),
-            "last_seen_geo": getattr(p, "last_seen_geo", None),
-            "gender": getattr(p, "gender", None),
-            "distinctive1": getattr(p, "distinctive1", None),
-            "distinctive2": getattr(p, "distinctive2", None),
-            "distinctive3": getattr(p, "distinctive3", None),
-            "distinctive4": getattr(p, "distinctive4", None),
-            "picture": primary,
-            "notes": p.notes,
-            "status": p.status,
-            "pictures": pictures_ordered or None,
-        }
-    )
+    row = {col: getattr(p, col, None) for col in PET_OUT_COLUMNS}
+    row["pictures"] = p.picture_urls() if pictures is None else pictures
+    return PetOut.model_validate(pet_payload(row))
 
 
 def serialize_pet_list(pets) -> list[PetOut]:
     return [serialize_pet(p) for p in pets]
+
+
+def serialize_pet_rows_json(rows: Iterable[Mapping[str, Any]]) -> bytes:
+    """Encode ``values(*PET_OUT_COLUMNS)`` rows (with pictures) as a JSON list of PetOut.
+
+    Validates once for the whole list and serializes in pydantic-core,
+    skipping FastAPI's response_model re-validation and jsonable_encoder.
+    """
+    pets = pet_list_adapter.validate_python([pet_payload(row) for row in rows])
+    return pet_list_adapter.dump_json(pets)
+
+
+def sparse_pet(row: Mapping[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Only the requested PetOut fields of a row selected with pet_columns()."""
+    payload = pet_payload(row)
+    return {name: payload[name] for name in fields}
+
+
+def serialize_sparse_pets_json(rows: Iterable[Mapping[str, Any]], fields: List[str]) -> bytes:
+    """Encode a sparse fieldset; rows come straight from typed DB columns,
+    so they are encoded without building PetOut models."""
+    return pydantic_core.to_json([sparse_pet(row, fields) for row in rows])
+
+
+def serialize_pet_row_json(row: Mapping[str, Any], fields: Optional[List[str]] = None) -> bytes:
+    """Encode one row as a PetOut, or as a sparse fieldset when ``fields`` is given."""
+    if fields is None:
+        return pet_out_adapter.dump_json(pet_out_adapter.validate_python(pet_payload(row)))
+    return pydantic_core.to_json(sparse_pet(row, fields))
+
+
+def serialize_sparse_pets_ndjson(rows: Iterable[Mapping[str, Any]], fields: List[str]) -> bytes:
+    return b"".join(pydantic_core.to_json(sparse_pet(row, fields)) + b"\n" for row in rows)
+
+
+def serialize_pet_rows_ndjson(rows: Iterable[Mapping[str, Any]]) -> bytes:
+    """Encode ``values(*PET_OUT_COLUMNS)`` rows (with pictures) as NDJSON lines of PetOut."""
+    pets = pet_list_adapter.validate_python([pet_payload(row) for row in rows])
+    return b"".join(pet_out_adapter.dump_json(pet) + b"\n" for pet in pets)
+
+
+def serialize_similar_pets_json(matches: Iterable[Tuple[int, Mapping[str, Any]]]) -> bytes:
+    """Encode ``(distance, row)`` matches as a JSON list of SimilarPetOut."""
+    pets = similar_pet_list_adapter.validate_python(
+        [{**pet_payload(row), "distance": distance} for distance, row in matches])
+    return similar_pet_list_adapter.dump_json(pets)
@@ -0,0 +1,28 @@
+from typing import Any, Dict, List
+
+from pydantic import BaseModel
+
+from schemas.pets import PetOut
+from schemas.users import UserOut
+
+
+class SyncUpserts(BaseModel):
+    pets: List[PetOut] = []
+    users: List[UserOut] = []
+    # Scan events as recorded ({"pet_id", "scan_time", ...})
+    scans: List[Dict[str, Any]] = []
+
+
+class SyncDeletes(BaseModel):
+    pets: List[int] = []
+
+
+class SyncOut(BaseModel):
+    # Pass back as ?since= on the next call
+    token: str
+    # More changes are pending; call again right away with the new token
+    has_more: bool
+    # True when this is a full snapshot (no or unusable token): replace local state
+    full: bool
+    upserts: SyncUpserts
+    deletes: SyncDeletes
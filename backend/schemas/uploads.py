@@ -0,0 +1,18 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class ResumableUploadCreate(BaseModel):
+    # Total size of the file in bytes
+    length: int = Field(..., gt=0)
+    # Optional hex SHA-256 of the whole file, verified on completion
+    sha256: Optional[str] = Field(None, min_length=64, max_length=64)
+    filename: Optional[str] = Field(None, max_length=255)
+
+
+class ResumableUploadOut(BaseModel):
+    id: str
+    offset: int
+    length: int
+    expires_at: float
+    url: Optional[str] = None
@@ -1,5 +1,5 @@
-from typing import Optional
-from pydantic import BaseModel
+from typing import Any, Iterable, List, Mapping, Optional
+from pydantic import BaseModel, TypeAdapter
 
 
 class UserRegister(BaseModel):
@@ -45,3 +45,21 @@ class UserOut(BaseModel):
     full_address: Optional[str] = None
     recovery_bounty: Optional[float] = None
     hash: Optional[str] = None
+
+
+# Columns read for UserOut; the list endpoint fetches only these via values()
+USER_OUT_COLUMNS = list(UserOut.model_fields)
+
+user_list_adapter = TypeAdapter(List[UserOut])
+user_out_adapter = TypeAdapter(UserOut)
+
+
+def serialize_user_rows_json(rows: Iterable[Mapping[str, Any]]) -> bytes:
+    """Validate ``values(*USER_OUT_COLUMNS)`` rows once and encode them as JSON."""
+    return user_list_adapter.dump_json(user_list_adapter.validate_python(list(rows)))
+
+
+def serialize_user_rows_ndjson(rows: Iterable[Mapping[str, Any]]) -> bytes:
+    """Encode ``values(*USER_OUT_COLUMNS)`` rows as NDJSON lines of UserOut."""
+    users = user_list_adapter.validate_python(list(rows))
+    return b"".join(user_out_adapter.dump_json(user) + b"\n" for user in users)
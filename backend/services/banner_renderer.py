@@ -0,0 +1,189 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from PIL import Image, ImageDraw, ImageFont
+
+from services.image_pipeline import get_image_pipeline
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+STATIC_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "static"))
+FONTS_DIR = os.path.join(STATIC_ROOT, "flyers_templates", "fonts")
+
+# Bundled fonts used for each text block of the banner
+TITLE_FONT = os.path.join(FONTS_DIR, "Gravitas_One", "GravitasOne-Regular.ttf")
+BODY_FONT = os.path.join(FONTS_DIR, "Alatsi", "Alatsi-Regular.ttf")
+
+# Layout is designed on an 800x600 canvas and scaled for the other presets
+BASE_WIDTH = 800
+BANNER_PRESETS: Dict[str, Tuple[int, int]] = {
+    "small": (400, 300),
+    "medium": (800, 600),
+    "large": (1600, 1200),
+}
+DEFAULT_PRESET = "medium"
+# Smallest picture variant that still fills the photo box of each preset
+PRESET_PICTURE_VARIANTS: Dict[str, str] = {
+    "small": "card",
+    "medium": "card",
+    "large": "print",
+}
+
+# format name -> (Pillow encoder, media type, encoder options)
+BANNER_FORMATS: Dict[str, Tuple[str, str, Dict[str, Any]]] = {
+    "png": ("PNG", "image/png", {"optimize": True}),
+    "webp": ("WEBP", "image/webp", {"quality": 85, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 85, "optimize": True, "progressive": True}),
+}
+DEFAULT_FORMAT = "png"
+
+REMOTE_PICTURE_TIMEOUT = 5  # seconds
+
+
+class BannerRenderer:
+    """Render lost-pet banners with fonts and static layers loaded once.
+
+    Finished banners are cached by a digest of the pet/owner fields they show,
+    so an edit naturally produces a new key; ``invalidate_pet`` and
+    ``invalidate_owner`` drop the stale entries eagerly.
+    """
+
+    def __init__(self, cache_size: int = 256):
+        self._fonts: Dict[Tuple[str, int], ImageFont.ImageFont] = {}
+        self._layers: Dict[str, Image.Image] = {}
+        self._lock = threading.Lock()
+        # key: (pet_id, owner_id, digest) -> (bytes, media_type)
+        self._cache = LRUCache(maxsize=cache_size)
+
+    def preload(self) -> None:
+        """Load fonts and build the static layer of every preset."""
+        for preset in BANNER_PRESETS:
+            self._base_layer(preset)
+        logger.info("Banner renderer ready (%d presets)", len(self._layers))
+
+    def _font(self, path: str, size: int) -> ImageFont.ImageFont:
+        key = (path, size)
+        font = self._fonts.get(key)
+        if font is None:
+            try:
+                font = ImageFont.truetype(path, size)
+            except OSError:
+                logger.warning("Banner font %s unavailable, using default", path)
+                font = ImageFont.load_default()
+            self._fonts[key] = font
+        return font
+
+    def _base_layer(self, preset: str) -> Image.Image:
+        """White canvas with the "LOST PET" title, shared by every banner."""
+        layer = self._layers.get(preset)
+        if layer is not None:
+            return layer
+        with self._lock:
+            layer = self._layers.get(preset)
+            if layer is None:
+                width, height = BANNER_PRESETS[preset]
+                scale = width / BASE_WIDTH
+                layer = Image.new("RGB", (width, height), color="white")
+                draw = ImageDraw.Draw(layer)
+                draw.text((width // 2, int(50 * scale)), "LOST PET",
+                          font=self._font(TITLE_FONT, int(60 * scale)),
+                          fill=(0, 0, 0), anchor="ms")
+                self._layers[preset] = layer
+        return layer
+
+    def _load_picture(self, picture: str) -> Optional[Image.Image]:
+        """Open an uploaded picture from disk, or fetch it when it is remote."""
+        if not picture:
+            return None
+        try:
+            if picture.startswith(("http://", "https://")):
+                response = requests.get(picture, timeout=REMOTE_PICTURE_TIMEOUT)
+                response.raise_for_status()
+                return Image.open(io.BytesIO(response.content))
+            relative = picture.lstrip("/")
+            if relative.startswith("static/"):
+                relative = relative[len("static/"):]
+            path = os.path.normpath(os.path.join(STATIC_ROOT, relative))
+            if not path.startswith(STATIC_ROOT + os.sep):
+                return None
+            return Image.open(path)
+        except (OSError, requests.exceptions.RequestException) as e:
+            logger.warning("Banner picture %s could not be loaded: %s", picture, e)
+            return None
+
+    @staticmethod
+    def cache_key(pet, preset: str, fmt: str) -> Tuple[int, int, str]:
+        owner = pet.owner
+        content = "\x1f".join(str(v) for v in (
+            preset, fmt, pet.name, pet.cover_picture,
+            owner.first_name, owner.last_name, owner.phone, owner.email,
+        ))
+        return pet.id, owner.id, hashlib.sha256(content.encode()).hexdigest()
+
+    def render(self, pet, preset: str = DEFAULT_PRESET, fmt: str = DEFAULT_FORMAT) -> Tuple[bytes, str]:
+        """Return ``(image bytes, media type)`` for the pet's banner.
+
+        Blocking (Pillow + disk/network I/O); call it from a worker thread.
+        """
+        key = self.cache_key(pet, preset, fmt)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        width, height = BANNER_PRESETS[preset]
+        scale = width / BASE_WIDTH
+        img = self._base_layer(preset).copy()
+        draw = ImageDraw.Draw(img)
+
+        draw.text((width // 2, int(120 * scale)), pet.name,
+                  font=self._font(BODY_FONT, int(40 * scale)),
+                  fill=(0, 0, 0), anchor="ms")
+
+        picture = self._load_picture(
+            get_image_pipeline().best_url(pet.cover_picture, PRESET_PICTURE_VARIANTS[preset]))
+        if picture is not None:
+            with picture:
+                picture.draft("RGB", (int(400 * scale), int(300 * scale)))
+                picture = picture.convert("RGB")
+                picture.thumbnail((int(400 * scale), int(300 * scale)))
+                left = (width - picture.width) // 2
+                img.paste(picture, (left, int(150 * scale)))
+
+        owner = pet.owner
+        contact_info = f"Owner: {owner.first_name} {owner.last_name}\nPhone: {owner.phone}\nEmail: {owner.email}"
+        draw.multiline_text((width // 2, int(470 * scale)), contact_info,
+                            font=self._font(BODY_FONT, int(30 * scale)),
+                            fill=(0, 0, 0), anchor="ma", align="center")
+
+        encoder, media_type, options = BANNER_FORMATS[fmt]
+        buf = io.BytesIO()
+        img.save(buf, encoder, **options)
+        result = (buf.getvalue(), media_type)
+        self._cache.set(key, result)
+        return result
+
+    def invalidate_pet(self, pet_id: int) -> None:
+        self._cache.discard_where(lambda key: key[0] == pet_id)
+
+    def invalidate_owner(self, owner_id: int) -> None:
+        self._cache.discard_where(lambda key: key[1] == owner_id)
+
+
+# Singleton instance
+_banner_renderer: Optional[BannerRenderer] = None
+
+
+def get_banner_renderer() -> BannerRenderer:
+    """Get or create banner renderer singleton"""
+    global _banner_renderer
+
+    if not _banner_renderer:
+        _banner_renderer = BannerRenderer()
+
+    return _banner_renderer
@@ -0,0 +1,402 @@
+"""Bulk import and export of pets and users as CSV or NDJSON.
+
+Imports are parsed as the bytes arrive, each row is validated like the
+single-item API (PetCreate / UserCreate), and valid rows are inserted
+IMPORT_BATCH_SIZE at a time, one transaction per batch; invalid rows are
+skipped and reported by row number. Exports stream keyset chunks. Neither
+direction holds the whole file in memory.
+
+    python -m services.bulk_io import pets pets.csv --owner ana@example.com
+    python -m services.bulk_io export pets pets.ndjson --owner ana@example.com
+    python -m services.bulk_io import users users.csv
+    python -m services.bulk_io export users users.csv
+"""
+import asyncio
+import codecs
+import csv
+import io
+import json
+import logging
+from typing import (Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, List, Optional,
+                    Sequence, Tuple, Type)
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from tortoise.exceptions import IntegrityError
+from tortoise.transactions import in_transaction
+
+from models import Pet, User
+from schemas.pets import PET_OUT_COLUMNS, PetCreate, serialize_pet_rows_ndjson
+from schemas.users import USER_OUT_COLUMNS, UserCreate, serialize_user_rows_ndjson
+from services import change_log
+from services.image_pipeline import get_image_pipeline
+from services.lost_feed import get_lost_feed
+from services.password_hasher import get_password_hasher
+from services.pet_pictures import add_pictures, attach_pictures
+from utils.pagination import NDJSON_MEDIA_TYPE, iter_chunks
+
+logger = logging.getLogger(__name__)
+
+CSV = "csv"
+NDJSON = "ndjson"
+FORMATS = (CSV, NDJSON)
+MEDIA_TYPES = {CSV: "text/csv; charset=utf-8", NDJSON: NDJSON_MEDIA_TYPE}
+
+# Valid rows inserted per transaction
+IMPORT_BATCH_SIZE = 500
+# Rows read from one import; the rest of the file is ignored
+MAX_IMPORT_ROWS = 100_000
+# Longest accepted row (characters), so a file without newlines cannot fill memory
+MAX_ROW_LENGTH = 64 * 1024
+# Per-row errors included in the report (all of them are counted)
+MAX_REPORTED_ERRORS = 100
+# Separates the picture URLs of the CSV ``pictures`` column
+CSV_LIST_SEPARATOR = "|"
+# Import/export file extension -> format (CLI)
+EXTENSION_FORMATS = {".csv": CSV, ".ndjson": NDJSON, ".jsonl": NDJSON}
+
+# Columns of a pet CSV (PetCreate fields; ``id`` and ``owner_id`` are ignored on import)
+PET_CSV_COLUMNS = ["id"] + [name for name in PetCreate.model_fields if name != "owner_id"]
+# Empty CSV cells are missing values, except for these required text fields,
+# which are "" when empty or when the file has no such column
+PET_REQUIRED_TEXT = {"picture", "notes"}
+
+ImportRows = Sequence[Tuple[int, BaseModel]]
+# Inserts a batch of validated rows; returns (row, error) for rows it rejected
+BatchInserter = Callable[[ImportRows], Awaitable[List[Tuple[int, str]]]]
+
+
+class RowTooLongError(ValueError):
+    """A row exceeds MAX_ROW_LENGTH; the rest of the file cannot be read."""
+
+
+def format_for(format: Optional[str], content_type: Optional[str] = None) -> str:
+    """Import/export format from an explicit ``format`` or a Content-Type header."""
+    if format is None and content_type:
+        media_type = content_type.split(";")[0].strip().lower()
+        format = CSV if media_type in ("text/csv", "application/csv") else (
+            NDJSON if media_type in (NDJSON_MEDIA_TYPE, "application/jsonl") else None)
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail="Format must be csv or ndjson")
+    return format
+
+
+# Parsing
+
+async def _iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Decode UTF-8 (BOM tolerated) and split into lines as chunks arrive."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+        if len(pending) > MAX_ROW_LENGTH:
+            raise RowTooLongError(f"Row longer than {MAX_ROW_LENGTH} characters")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _csv_record(header: List[str], values: List[str],
+                list_fields: Sequence[str], required_text: Sequence[str]) -> Dict[str, Any]:
+    record: Dict[str, Any] = {name: "" for name in required_text}
+    for name, value in zip(header, values):
+        if value == "" and name not in required_text:
+            continue
+        if name in list_fields:
+            record[name] = [item for item in value.split(CSV_LIST_SEPARATOR) if item]
+        else:
+            record[name] = value
+    return record
+
+
+async def iter_records(chunks: AsyncIterable[bytes], format: str,
+                       list_fields: Sequence[str] = (),
+                       required_text: Sequence[str] = ()) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield ``(row, record)`` pairs (rows numbered from 1, CSV header and
+    blank lines excluded). ``record`` is a dict, or the error message of a
+    row that could not be parsed.
+
+    A CSV row may span several lines inside quotes; ``list_fields`` cells
+    hold ``|``-separated lists.
+    """
+    row = 0
+    header: Optional[List[str]] = None
+    buffered = ""
+    async for line in _iter_lines(chunks):
+        if format == NDJSON:
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row, f"Invalid JSON: {e}"
+                continue
+            yield row, record if isinstance(record, dict) else "Expected a JSON object"
+            continue
+        # CSV: a record is complete once its quotes are balanced
+        buffered += line + "\n"
+        if buffered.count('"') % 2:
+            if len(buffered) > MAX_ROW_LENGTH:
+                raise RowTooLongError(f"Row longer than {MAX_ROW_LENGTH} characters")
+            continue
+        text, buffered = buffered, ""
+        if not text.strip():
+            continue
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as e:
+            row += 1
+            yield row, f"Invalid CSV: {e}"
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        yield row, _csv_record(header, values, list_fields, required_text)
+    if buffered.strip():
+        yield row + 1, "Invalid CSV: unterminated quoted field"
+
+
+def _validation_errors(error: ValidationError) -> List[str]:
+    messages = []
+    for item in error.errors():
+        location = ".".join(str(part) for part in item["loc"])
+        messages.append(f"{location}: {item['msg']}" if location else item["msg"])
+    return messages
+
+
+async def import_rows(chunks: AsyncIterable[bytes], format: str, schema: Type[BaseModel],
+                      insert: BatchInserter, list_fields: Sequence[str] = (),
+                      required_text: Sequence[str] = ()) -> Dict[str, Any]:
+    """Validate streamed rows with ``schema`` and insert them in batches.
+
+    Batches are committed as the import goes, so rows before a failure stay
+    imported. Returns ``{"created", "failed", "errors", "truncated"}`` where
+    ``errors`` lists the first MAX_REPORTED_ERRORS ``{"row", "errors"}``.
+    """
+    report: Dict[str, Any] = {"created": 0, "failed": 0, "errors": [], "truncated": False}
+
+    def fail(row: int, messages: List[str]) -> None:
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row, "errors": messages})
+
+    async def flush(batch: List[Tuple[int, BaseModel]]) -> None:
+        rejected = await insert(batch)
+        for row, message in rejected:
+            fail(row, [message])
+        report["created"] += len(batch) - len(rejected)
+        batch.clear()
+
+    batch: List[Tuple[int, BaseModel]] = []
+    row = 0
+    try:
+        async for row, record in iter_records(chunks, format, list_fields, required_text):
+            if row > MAX_IMPORT_ROWS:
+                report["truncated"] = True
+                break
+            if isinstance(record, str):
+                fail(row, [record])
+                continue
+            try:
+                batch.append((row, schema.model_validate(record)))
+            except ValidationError as e:
+                fail(row, _validation_errors(e))
+                continue
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush(batch)
+    except RowTooLongError as e:
+        # Unreadable rest of the file: keep what was read so far
+        report["truncated"] = True
+        fail(row + 1, [str(e)])
+    if batch:
+        await flush(batch)
+    return report
+
+
+# Pets
+
+def pet_importer(owner_id: int) -> BatchInserter:
+    """Insert validated PetCreate rows for ``owner_id`` (as POST /pets/ does)."""
+
+    async def insert(batch: ImportRows) -> List[Tuple[int, str]]:
+        urls_by_pet: Dict[int, List[str]] = {}
+        async with in_transaction("default"):
+            for _, pet in batch:
+                data = pet.model_dump(exclude={"owner_id", "picture", "pictures"})
+                pet_obj = await Pet.create(owner_id=owner_id, **data)
+                urls_by_pet[pet_obj.id] = pet.pictures or [pet.picture]
+            await add_pictures(urls_by_pet)
+            await change_log.record_changes(owner_id, change_log.PET, list(urls_by_pet))
+        pipeline = get_image_pipeline()
+        for urls in urls_by_pet.values():
+            for url in urls:
+                pipeline.backfill(url)
+        return []
+
+    return insert
+
+
+async def import_pets(owner_id: int, chunks: AsyncIterable[bytes], format: str) -> Dict[str, Any]:
+    """Import pets for ``owner_id`` from CSV or NDJSON chunks."""
+    report = await import_rows(chunks, format, PetCreate, pet_importer(owner_id),
+                               list_fields=("pictures",), required_text=PET_REQUIRED_TEXT)
+    if report["created"]:
+        get_lost_feed().schedule_catch_up()
+    logger.info("Imported %d pets for user %s (%d rows failed)",
+                report["created"], owner_id, report["failed"])
+    return report
+
+
+def _pet_csv_row(row: Dict[str, Any]) -> List[Any]:
+    pictures = row.get("pictures") or []
+    values = {**row, "picture": pictures[0] if pictures else "",
+              "pictures": CSV_LIST_SEPARATOR.join(pictures)}
+    return [values.get(name) for name in PET_CSV_COLUMNS]
+
+
+def _csv_chunk(rows: Sequence[Sequence[Any]]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows([["" if value is None else value for value in row] for row in rows])
+    return buffer.getvalue().encode()
+
+
+async def export_pets(owner_id: int, format: str) -> AsyncIterator[bytes]:
+    """Stream an owner's pets (ordered by id) as CSV or NDJSON.
+
+    NDJSON lines are PetOut objects, as in ``GET /pets/?format=ndjson``;
+    both formats can be imported again.
+    """
+    if format == CSV:
+        yield _csv_chunk([PET_CSV_COLUMNS])
+    async for rows in iter_chunks(Pet.filter(owner_id=owner_id), PET_OUT_COLUMNS):
+        await attach_pictures(rows)
+        if format == CSV:
+            yield _csv_chunk([_pet_csv_row(row) for row in rows])
+        else:
+            yield serialize_pet_rows_ndjson(rows)
+
+
+# Users
+
+async def _insert_users(batch: ImportRows) -> List[Tuple[int, str]]:
+    """Insert validated UserCreate rows; rows whose email is taken are rejected."""
+    emails = [user.email for _, user in batch]
+    taken = set(await User.filter(email__in=emails).values_list("email", flat=True))
+    rejected, accepted = [], []
+    for row, user in batch:
+        if user.email in taken:
+            rejected.append((row, "email: Email already registered"))
+            continue
+        taken.add(user.email)
+        accepted.append((row, user))
+
+    # bcrypt at BCRYPT_ROUNDS dominates the import time: keep every hasher
+    # worker busy, without queueing past its max_pending limit
+    hasher = get_password_hasher()
+    slots = asyncio.Semaphore(hasher.max_workers)
+
+    async def _hash(password: str) -> str:
+        async with slots:
+            return await hasher.hash(password)
+
+    passwords = await asyncio.gather(*(_hash(user.password) for _, user in accepted))
+    fields = [(row, {**user.model_dump(exclude={"password"}), "password": password})
+              for (row, user), password in zip(accepted, passwords)]
+    try:
+        async with in_transaction("default"):
+            await User.bulk_create([User(**values) for _, values in fields])
+    except IntegrityError:
+        # An email was registered after the check above; insert row by row
+        # so only the conflicting rows are rejected
+        for row, values in fields:
+            try:
+                await User.create(**values)
+            except IntegrityError:
+                rejected.append((row, "email: Email already registered"))
+        rejected.sort()
+    return rejected
+
+
+async def import_users(chunks: AsyncIterable[bytes], format: str) -> Dict[str, Any]:
+    """Import users (with plain-text passwords, hashed here) from CSV or NDJSON chunks."""
+    report = await import_rows(chunks, format, UserCreate, _insert_users)
+    logger.info("Imported %d users (%d rows failed)", report["created"], report["failed"])
+    return report
+
+
+async def export_users(format: str) -> AsyncIterator[bytes]:
+    """Stream every user (UserOut fields, no passwords) as CSV or NDJSON."""
+    if format == CSV:
+        yield _csv_chunk([USER_OUT_COLUMNS])
+    async for rows in iter_chunks(User.all(), USER_OUT_COLUMNS):
+        if format == CSV:
+            yield _csv_chunk([[row[name] for name in USER_OUT_COLUMNS] for row in rows])
+        else:
+            yield serialize_user_rows_ndjson(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    from pathlib import Path
+
+    from tortoise import Tortoise
+
+    import migrations
+    from config import settings
+    from database import tortoise_config
+
+    # Bytes read from the import file at a time
+    FILE_CHUNK_SIZE = 64 * 1024
+
+    async def read_file(path: Path) -> AsyncIterator[bytes]:
+        with path.open("rb") as f:
+            while chunk := f.read(FILE_CHUNK_SIZE):
+                yield chunk
+
+    async def main(args) -> None:
+        path = Path(args.file)
+        format = args.format or EXTENSION_FORMATS.get(path.suffix.lower())
+        if format is None:
+            raise SystemExit("Use a .csv or .ndjson file, or pass --format")
+        await Tortoise.init(config=tortoise_config(args.db_url))
+        try:
+            await migrations.check_schema_version()
+            owner_id = None
+            if args.entity == "pets":
+                if not args.owner:
+                    raise SystemExit("--owner is required for pets")
+                owner = await User.get_or_none(email=args.owner)
+                if owner is None:
+                    raise SystemExit(f"No user with email {args.owner}")
+                owner_id = owner.id
+            if args.command == "import":
+                chunks = read_file(path)
+                report = await (import_pets(owner_id, chunks, format) if owner_id is not None
+                                else import_users(chunks, format))
+                print(json.dumps(report, indent=2))
+                return
+            stream = export_pets(owner_id, format) if owner_id is not None else export_users(format)
+            with path.open("wb") as f:
+                async for chunk in stream:
+                    f.write(chunk)
+            print(f"Exported {args.entity} to {path}")
+        finally:
+            await get_image_pipeline().drain()
+            await Tortoise.close_connections()
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("entity", choices=["pets", "users"])
+    parser.add_argument("file", help=".csv or .ndjson file (the extension picks the format)")
+    parser.add_argument("--owner", help="email of the user owning the pets")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--db-url", default=settings.database_url)
+    asyncio.run(main(parser.parse_args()))
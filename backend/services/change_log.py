@@ -0,0 +1,212 @@
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from tortoise.expressions import Q
+
+from config import settings
+from models import ChangeLog, Pet, User
+from schemas.pets import PET_OUT_COLUMNS, pet_payload
+from schemas.users import USER_OUT_COLUMNS
+from services.pet_pictures import attach_pictures
+
+logger = logging.getLogger(__name__)
+
+# Entities recorded in the change log
+PET = "pet"
+USER = "user"
+SCAN = "scan"
+# Operations
+UPSERT = "upsert"
+DELETE = "delete"
+
+# Log entries returned per sync call; clients keep calling while has_more
+SYNC_BATCH_SIZE = 1000
+RETENTION_SECONDS = settings.sync_log_retention_days * 24 * 60 * 60
+PRUNE_INTERVAL_SECONDS = 24 * 60 * 60
+# Ids are handed out at insert time, not commit time, so a change can become
+# visible after a later one was already synced. Tokens list the changes of
+# the last SETTLE_SECONDS they cover, and the next sync re-reads that window
+# for the ones it missed (transactions are assumed to commit within it).
+SETTLE_SECONDS = 60
+# Changes listed in a token at most; beyond that its window is narrowed
+MAX_SETTLE_CHANGES = 100
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class SyncToken(NamedTuple):
+    """A decoded sync token: the last change covered and its settle window,
+    the changes created after ``window_start`` of which ``seen`` were
+    returned (no window for tokens that predate it)."""
+    last_id: int
+    window_start: Optional[datetime] = None
+    seen: Tuple[int, ...] = ()
+
+
+async def record_change(owner_id: int, entity: str, entity_id: int, op: str = UPSERT,
+                        data: Optional[Dict[str, Any]] = None) -> None:
+    """Append a mutation to the owner's change feed.
+
+    Call it inside the transaction of the mutation so the feed never misses
+    (or invents) a change.
+    """
+    await ChangeLog.create(owner_id=owner_id, entity=entity, entity_id=entity_id,
+                           op=op, data=data)
+
+
+async def record_changes(owner_id: int, entity: str, entity_ids: Iterable[int],
+                         op: str = UPSERT) -> None:
+    """``record_change`` for many entities of one owner, with a single insert."""
+    await ChangeLog.bulk_create([
+        ChangeLog(owner_id=owner_id, entity=entity, entity_id=entity_id, op=op)
+        for entity_id in entity_ids
+    ])
+
+
+def encode_token(token: SyncToken, changes_from: Optional[datetime] = None) -> str:
+    """Opaque sync token, stamped with the oldest time the changes after it
+    may date from.
+
+    That time is now once the client has caught up, but while more changes
+    are pending it is the last returned entry's ``created_at``: the next
+    ones are no newer and are pruned with it, so a token kept around
+    mid-sync expires (410) before its changes can go missing.
+    """
+    ts = changes_from.timestamp() if changes_from is not None else time.time()
+    fields: Dict[str, Any] = {"id": token.last_id, "ts": int(ts)}
+    if token.window_start is not None:
+        # Exact microseconds: the window bound is compared with created_at
+        fields["w"] = (token.window_start - _EPOCH) // _MICROSECOND
+        fields["seen"] = list(token.seen)
+    raw = json.dumps(fields, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_token(token: str) -> SyncToken:
+    """Decode a sync token; 410 when it predates the retained log."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        last_id, issued_at = int(raw["id"]), int(raw["ts"])
+        window_start = _EPOCH + int(raw["w"]) * _MICROSECOND if "w" in raw else None
+        seen = tuple(int(change_id) for change_id in raw.get("seen", ()))
+    except (binascii.Error, ValueError, TypeError, KeyError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    if RETENTION_SECONDS and issued_at < time.time() - RETENTION_SECONDS:
+        raise HTTPException(status_code=410, detail="Sync token expired, full sync required")
+    return SyncToken(last_id, window_start, seen)
+
+
+async def _settled_token(owner_id: int, last_id: int) -> SyncToken:
+    """Token after change ``last_id`` with the owner's recent changes up to it."""
+    window_start = datetime.now(timezone.utc) - timedelta(seconds=SETTLE_SECONDS)
+    recent = await ChangeLog.filter(
+        owner_id=owner_id, id__lte=last_id, created_at__gt=window_start,
+    ).order_by("-created_at").limit(MAX_SETTLE_CHANGES + 1).values_list("id", "created_at")
+    if len(recent) > MAX_SETTLE_CHANGES:
+        # Keep the newest changes; the window starts after the next one
+        window_start = recent[-1][1]
+        recent = [row for row in recent if row[1] > window_start]
+    return SyncToken(last_id, window_start, tuple(sorted(change_id for change_id, _ in recent)))
+
+
+async def _pets(owner_id: int, ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    query = Pet.filter(owner_id=owner_id)
+    if ids is not None:
+        query = query.filter(id__in=ids)
+    rows = await attach_pictures(await query.order_by("id").values(*PET_OUT_COLUMNS))
+    return [pet_payload(row) for row in rows]
+
+
+async def _user(owner_id: int) -> List[Dict[str, Any]]:
+    return await User.filter(id=owner_id).values(*USER_OUT_COLUMNS)
+
+
+async def snapshot(owner_id: int) -> Dict[str, Any]:
+    """Everything the owner can sync, with a token to continue from."""
+    last = await ChangeLog.filter(owner_id=owner_id).order_by("-id").first().values("id")
+    return {
+        "token": encode_token(await _settled_token(owner_id, last["id"] if last else 0)),
+        "has_more": False,
+        "full": True,
+        "upserts": {"pets": await _pets(owner_id), "users": await _user(owner_id), "scans": []},
+        "deletes": {"pets": []},
+    }
+
+
+async def changes_since(owner_id: int, since: SyncToken,
+                        limit: int = SYNC_BATCH_SIZE) -> Dict[str, Any]:
+    """Compacted changes after the token ``since``, including those in its
+    settle window that it has not seen.
+
+    Several changes to the same pet or user collapse into the latest one:
+    an upsert returns the current row, a delete only its id. Scan events
+    are returned as recorded.
+    """
+    condition = Q(id__gt=since.last_id)
+    if since.window_start is not None:
+        missed = Q(id__lte=since.last_id, created_at__gt=since.window_start)
+        if since.seen:
+            missed &= Q(id__not_in=since.seen)
+        condition |= missed
+    entries = await ChangeLog.filter(condition, owner_id=owner_id).order_by("id").limit(
+        limit + 1).values("id", "entity", "entity_id", "op", "data", "created_at")
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest: Dict[tuple, str] = {}
+    scans: List[Dict[str, Any]] = []
+    for entry in entries:
+        if entry["entity"] == SCAN:
+            scans.append(entry["data"] or {})
+        else:
+            latest[(entry["entity"], entry["entity_id"])] = entry["op"]
+
+    def ids(entity: str, op: str) -> List[int]:
+        return sorted(key[1] for key, value in latest.items() if key[0] == entity and value == op)
+
+    # A pet deleted after this batch is missing here and shows up as a
+    # delete in a later batch
+    upserted_pets = ids(PET, UPSERT)
+    pets = await _pets(owner_id, upserted_pets) if upserted_pets else []
+    users = await _user(owner_id) if ids(USER, UPSERT) else []
+    changes_from = entries[-1]["created_at"] if has_more else None
+    if has_more and entries[-1]["id"] < since.last_id:
+        # A whole batch of missed changes: same window, with these seen too
+        token = since._replace(seen=tuple(sorted({*since.seen, *(e["id"] for e in entries)})))
+    else:
+        last_id = max(since.last_id, entries[-1]["id"]) if entries else since.last_id
+        token = await _settled_token(owner_id, last_id)
+    return {
+        "token": encode_token(token, changes_from),
+        "has_more": has_more,
+        "full": False,
+        "upserts": {"pets": pets, "users": users, "scans": scans},
+        "deletes": {"pets": ids(PET, DELETE)},
+    }
+
+
+async def prune(retention_seconds: float = RETENTION_SECONDS) -> int:
+    """Delete entries older than the retention window; returns how many."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=retention_seconds)
+    removed = await ChangeLog.filter(created_at__lt=cutoff).delete()
+    if removed:
+        logger.info("Pruned %d change log entries", removed)
+    return removed
+
+
+async def run_pruner(interval_seconds: float = PRUNE_INTERVAL_SECONDS) -> None:
+    """Background task: prune the change log every ``interval_seconds``."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await prune()
+        except Exception:
+            logger.exception("Change log pruning failed")
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from config import settings
+from services.upload_storage import UPLOAD_DIR, upload_path
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# variant name -> longest edge in pixels
+VARIANTS: Dict[str, int] = {
+    "thumb": 240,
+    "card": 640,
+    "print": 1600,
+}
+VARIANT_EXT = ".webp"
+VARIANT_OPTIONS: Dict[str, Any] = {"quality": 80, "method": 4}
+MANIFEST_SUFFIX = ".variants.json"
+
+# Pictures without known variants have their manifest re-checked (off the
+# event loop) at most this often, for variants made by other workers
+MISSING_VARIANTS_TTL = 30
+
+
+def variant_path(source_path: str, variant: str) -> str:
+    stem, _ = os.path.splitext(source_path)
+    return f"{stem}.{variant}{VARIANT_EXT}"
+
+
+def manifest_path(source_path: str) -> str:
+    stem, _ = os.path.splitext(source_path)
+    return f"{stem}{MANIFEST_SUFFIX}"
+
+
+def generate_variants(source_path: str) -> Dict[str, Dict[str, Any]]:
+    """Write the resized, EXIF-free WebP variants of an image and its manifest.
+
+    Blocking (Pillow); runs in the pipeline's worker pool. The manifest maps
+    each variant name to its file name, dimensions and size in bytes.
+    """
+    manifest: Dict[str, Dict[str, Any]] = {}
+    with Image.open(source_path) as original:
+        # Apply the EXIF orientation before it is discarded with the metadata
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        for name, edge in sorted(VARIANTS.items(), key=lambda item: -item[1]):
+            variant = image.copy()
+            variant.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            target = variant_path(source_path, name)
+            temp = f"{target}.part"
+            variant.save(temp, "WEBP", **VARIANT_OPTIONS)
+            os.replace(temp, target)
+            manifest[name] = {
+                "file": os.path.basename(target),
+                "width": variant.width,
+                "height": variant.height,
+                "bytes": os.path.getsize(target),
+            }
+            # Downscale the next (smaller) variant from this one
+            image = variant
+    with open(manifest_path(source_path), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def _new_variants(source_path: str) -> Tuple[Dict[str, Dict[str, Any]], bool]:
+    return generate_variants(source_path), True
+
+
+def _existing_or_new_variants(source_path: str) -> Tuple[Dict[str, Dict[str, Any]], bool]:
+    try:
+        with open(manifest_path(source_path)) as f:
+            return json.load(f), False
+    except (OSError, ValueError):
+        return _new_variants(source_path)
+
+
+class ImagePipeline:
+    """Post-upload processing of pictures into responsive variants.
+
+    Work is queued on a small thread pool (Pillow releases the GIL while
+    decoding, resizing and encoding). Variant lookups never touch the disk:
+    they are served from an in-memory registry filled by ``load`` at startup
+    (a scan of the manifests written next to each upload) and by the
+    pipeline. A miss means "no variants" and schedules a check of that
+    picture's manifest in a thread, which picks up variants other workers
+    made.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="image-pipeline")
+        # Upload path without extension -> names of its variants
+        self._registry: Dict[str, Tuple[str, ...]] = {}
+        # One shared tuple per distinct set of variant names
+        self._names: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self._checked = LRUCache(maxsize=4096, ttl=MISSING_VARIANTS_TTL)
+        self._pending: set[asyncio.Future] = set()
+        self._listeners: List[Callable[[str], None]] = []
+
+    def add_listener(self, callback: Callable[[str], None]) -> None:
+        """Call ``callback(url)`` on the event loop whenever variants of a picture are ready."""
+        self._listeners.append(callback)
+
+    def submit(self, url: str, reuse_manifest: bool = False) -> Optional[asyncio.Future]:
+        """Schedule variant generation for an uploaded picture (fire and forget).
+
+        With ``reuse_manifest``, variants already on disk (made by another
+        worker) are registered instead of being generated again.
+        """
+        source = upload_path(url)
+        if source is None:
+            return None
+        loop = asyncio.get_running_loop()
+        make = _existing_or_new_variants if reuse_manifest else _new_variants
+        future = loop.run_in_executor(self._executor, make, source)
+        self._pending.add(future)
+
+        def _done(fut: asyncio.Future) -> None:
+            self._pending.discard(fut)
+            if fut.cancelled():
+                return
+            error = fut.exception()
+            if error is not None:
+                logger.warning("Variant generation failed for %s: %s", url, error)
+                return
+            manifest, generated = fut.result()
+            self._register(source, manifest)
+            if not generated:
+                return
+            for callback in self._listeners:
+                try:
+                    callback(url)
+                except Exception:
+                    logger.exception("Variant listener failed for %s", url)
+
+        future.add_done_callback(_done)
+        return future
+
+    def _register(self, source: str, manifest: Dict[str, Any]) -> None:
+        names = tuple(sorted(manifest))
+        self._registry[os.path.splitext(source)[0]] = self._names.setdefault(names, names)
+
+    def _read_manifest(self, source: str) -> None:
+        """Register the variants of an upload from its manifest (blocking)."""
+        try:
+            with open(manifest_path(source)) as f:
+                self._register(source, json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def _scan(self) -> int:
+        if not os.path.isdir(UPLOAD_DIR):
+            return 0
+        for user_dir in os.scandir(UPLOAD_DIR):
+            if not user_dir.is_dir() or user_dir.name.startswith("."):
+                continue
+            for entry in os.scandir(user_dir.path):
+                if entry.name.endswith(MANIFEST_SUFFIX):
+                    self._read_manifest(entry.path[:-len(MANIFEST_SUFFIX)])
+        return len(self._registry)
+
+    async def load(self) -> int:
+        """Register the variants of every stored upload; returns how many."""
+        loaded = await asyncio.get_running_loop().run_in_executor(None, self._scan)
+        logger.info("Loaded variants of %d pictures", loaded)
+        return loaded
+
+    def _check_later(self, source: str) -> None:
+        if self._checked.get(source, False):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._checked.set(source, True)
+        future = loop.run_in_executor(None, self._read_manifest, source)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+
+    def variants_for(self, url: Optional[str]) -> Optional[Dict[str, str]]:
+        """Variant URLs of a picture (``{"thumb": ..., "card": ..., "print": ...}``)."""
+        if not url:
+            return None
+        source = upload_path(url)
+        if source is None:
+            return None
+        names = self._registry.get(os.path.splitext(source)[0])
+        if names is None:
+            self._check_later(source)
+            return None
+        stem = os.path.splitext(url)[0]
+        return {name: f"{stem}.{name}{VARIANT_EXT}" for name in names}
+
+    def forget_paths(self, paths: Iterable[str]) -> None:
+        """Drop the variants of deleted upload files."""
+        for path in paths:
+            self._registry.pop(os.path.splitext(path)[0], None)
+
+    def best_url(self, url: str, variant: str) -> str:
+        """URL of the requested variant, falling back to the original picture."""
+        variants = self.variants_for(url)
+        return variants.get(variant, url) if variants else url
+
+    def backfill(self, url: str) -> Optional[asyncio.Future]:
+        """Generate variants for an existing picture that has none yet."""
+        if self.variants_for(url):
+            return None
+        return self.submit(url, reuse_manifest=True)
+
+    async def drain(self) -> None:
+        """Wait for queued work to finish."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+_image_pipeline: Optional[ImagePipeline] = None
+
+
+def get_image_pipeline() -> ImagePipeline:
+    """Get or create image pipeline singleton"""
+    global _image_pipeline
+
+    if not _image_pipeline:
+        _image_pipeline = ImagePipeline(max_workers=settings.image_workers)
+
+    return _image_pipeline
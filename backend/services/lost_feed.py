@@ -0,0 +1,333 @@
+import asyncio
+import base64
+import binascii
+import bisect
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import anyio
+import pydantic_core
+from fastapi import HTTPException
+
+from config import settings
+from models import ChangeLog, Pet, PetStatus
+from schemas.pets import PET_OUT_COLUMNS, lost_pet_out_adapter, pet_payload
+from services import change_log
+from services.pet_pictures import attach_pictures
+
+logger = logging.getLogger(__name__)
+
+# Change log entries applied per query while catching up
+CATCH_UP_BATCH_SIZE = 1000
+SNAPSHOT_FORMAT = 3
+# Longest sighting location published in the feed (scan_location is free text)
+MAX_SIGHTING_LOCATION_LENGTH = 100
+
+# (-active_at, -pet_id): ascending order is most recently active first
+FeedKey = Tuple[float, int]
+
+
+def encode_feed_cursor(key: FeedKey) -> str:
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_feed_cursor(cursor: str) -> FeedKey:
+    try:
+        active, pet_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(active), int(pet_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _timestamp(value: Any) -> float:
+    """Epoch seconds of a datetime or ISO string (0 when missing)."""
+    if not value:
+        return 0.0
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+def _clean_location(value: Any) -> Optional[str]:
+    """Scan location as published: printable text, whitespace collapsed, truncated."""
+    if not isinstance(value, str):
+        return None
+    text = " ".join("".join(ch if ch.isprintable() else " " for ch in value).split())
+    return text[:MAX_SIGHTING_LOCATION_LENGTH] or None
+
+
+def _sighting(data: Optional[Dict[str, Any]], recorded_at: datetime) -> Optional[Dict[str, Any]]:
+    """Public part of a scan event: where and when, never who.
+
+    ``scan_time`` comes from the client, so it is clamped to when the server
+    recorded the scan: a future time must not pin a pet to the top of the feed.
+    """
+    if not data:
+        return None
+    seen_at = recorded_at
+    try:
+        scan_time = datetime.fromisoformat(data["scan_time"])
+        if scan_time.tzinfo is None:
+            scan_time = scan_time.replace(tzinfo=timezone.utc)
+        seen_at = min(scan_time, recorded_at)
+    except (KeyError, TypeError, ValueError):
+        pass
+    return {"location": _clean_location(data.get("scan_location")),
+            "seen_at": seen_at.isoformat()}
+
+
+class LostPetFeed:
+    """Materialized projection of the pets currently lost, newest activity first.
+
+    Entries are the pet columns plus the latest sighting (scan event), kept
+    in a sorted key list with their JSON pre-encoded, so a feed page is
+    sliced and joined without touching the database. The projection follows
+    the change log: after local writes (``schedule_catch_up``) and on a
+    short interval for writes made by other workers. It is saved to disk
+    periodically together with the last change applied, so a restart only
+    replays the changes made since.
+    """
+
+    def __init__(self, snapshot_path: str):
+        self.snapshot_path = snapshot_path
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        self._sightings: Dict[int, Dict[str, Any]] = {}
+        self._keys: Dict[int, FeedKey] = {}
+        self._order: List[FeedKey] = []
+        self._encoded: Dict[int, bytes] = {}
+        self.version = 0
+        self.last_change_id = 0
+        self._saved_version = 0
+        self._lock = asyncio.Lock()
+        self._catch_up_task: Optional[asyncio.Task] = None
+        self._catch_up_requested = False
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    # Projection maintenance
+
+    def _put(self, pet_id: int, row: Dict[str, Any]) -> None:
+        self._remove_key(pet_id)
+        sighting = self._sightings.get(pet_id)
+        active_at = max(_timestamp(row.get("updated_at")),
+                        _timestamp(sighting["seen_at"]) if sighting else 0.0)
+        key = (-active_at, -pet_id)
+        self._rows[pet_id] = row
+        self._keys[pet_id] = key
+        bisect.insort(self._order, key)
+        self._encode(pet_id)
+        self.version += 1
+
+    def _encode(self, pet_id: int) -> None:
+        payload = {**pet_payload(self._rows[pet_id]), "last_sighting": self._sightings.get(pet_id)}
+        self._encoded[pet_id] = lost_pet_out_adapter.dump_json(
+            lost_pet_out_adapter.validate_python(payload))
+
+    def _remove_key(self, pet_id: int) -> None:
+        key = self._keys.pop(pet_id, None)
+        if key is not None:
+            del self._order[bisect.bisect_left(self._order, key)]
+
+    def _drop(self, pet_id: int) -> None:
+        if pet_id in self._rows:
+            self._remove_key(pet_id)
+            del self._rows[pet_id]
+            del self._encoded[pet_id]
+            self.version += 1
+        self._sightings.pop(pet_id, None)
+
+    def _remember_sighting(self, pet_id: int, data: Optional[Dict[str, Any]],
+                           recorded_at: datetime) -> bool:
+        sighting = _sighting(data, recorded_at)
+        if sighting is None:
+            return False
+        current = self._sightings.get(pet_id)
+        if current and _timestamp(current["seen_at"]) >= _timestamp(sighting["seen_at"]):
+            return False
+        self._sightings[pet_id] = sighting
+        return True
+
+    def _add_sighting(self, pet_id: int, data: Optional[Dict[str, Any]],
+                      recorded_at: datetime) -> None:
+        # Only pets in the feed keep their sightings
+        if pet_id in self._rows and self._remember_sighting(pet_id, data, recorded_at):
+            self._put(pet_id, self._rows[pet_id])
+
+    def refresh_pictures(self, url: str) -> None:
+        """Re-encode entries showing a picture whose variants just became available."""
+        url = url.lstrip("/")
+        for pet_id, row in self._rows.items():
+            if url in (picture.lstrip("/") for picture in row["pictures"]):
+                self._encode(pet_id)
+                self.version += 1
+
+    async def _lost_rows(self, pet_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        query = Pet.filter(status=PetStatus.LOST)
+        if pet_ids is not None:
+            query = query.filter(id__in=pet_ids)
+        return await attach_pictures(await query.values(*PET_OUT_COLUMNS, "updated_at"))
+
+    async def rebuild(self) -> None:
+        """Build the projection from the base tables."""
+        async with self._lock:
+            last = await ChangeLog.all().order_by("-id").first().values("id")
+            rows = await self._lost_rows()
+            lost_ids = {row["id"] for row in rows}
+            scans = await ChangeLog.filter(entity=change_log.SCAN).order_by("id").values(
+                "entity_id", "data", "created_at")
+            self._rows, self._sightings, self._keys, self._order, self._encoded = {}, {}, {}, [], {}
+            for scan in scans:
+                if scan["entity_id"] in lost_ids:
+                    self._remember_sighting(scan["entity_id"], scan["data"], scan["created_at"])
+            for row in rows:
+                self._put(row["id"], row)
+            self.last_change_id = last["id"] if last else 0
+        logger.info("Built lost pets feed: %d pets", len(self))
+
+    async def catch_up(self) -> int:
+        """Apply change log entries recorded since the last one applied."""
+        applied = 0
+        async with self._lock:
+            while True:
+                entries = await ChangeLog.filter(
+                    id__gt=self.last_change_id, entity__in=[change_log.PET, change_log.SCAN],
+                ).order_by("id").limit(CATCH_UP_BATCH_SIZE).values(
+                    "id", "entity", "entity_id", "data", "created_at")
+                if not entries:
+                    return applied
+                changed_pets = {entry["entity_id"] for entry in entries
+                                if entry["entity"] == change_log.PET}
+                if changed_pets:
+                    rows = {row["id"]: row for row in await self._lost_rows(list(changed_pets))}
+                    for pet_id in changed_pets:
+                        if pet_id in rows:
+                            self._put(pet_id, rows[pet_id])
+                        else:
+                            self._drop(pet_id)
+                for entry in entries:
+                    if entry["entity"] == change_log.SCAN:
+                        self._add_sighting(entry["entity_id"], entry["data"], entry["created_at"])
+                self.last_change_id = entries[-1]["id"]
+                applied += len(entries)
+                if len(entries) < CATCH_UP_BATCH_SIZE:
+                    return applied
+
+    def schedule_catch_up(self) -> None:
+        """Catch up in the background after a write (coalesces bursts of writes)."""
+        self._catch_up_requested = True
+        if self._catch_up_task is not None and not self._catch_up_task.done():
+            return
+        self._catch_up_task = asyncio.get_running_loop().create_task(self._safe_catch_up())
+
+    async def _safe_catch_up(self) -> None:
+        # Writes made while a catch-up runs may be past its query: go again
+        while self._catch_up_requested:
+            self._catch_up_requested = False
+            try:
+                await self.catch_up()
+            except Exception:
+                logger.exception("Lost pets feed catch-up failed")
+                return
+
+    # Reads
+
+    def page(self, limit: int, cursor: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+        """One page of the feed as a JSON array, and the cursor of the next one."""
+        start = bisect.bisect_right(self._order, decode_feed_cursor(cursor)) if cursor else 0
+        keys = self._order[start:start + limit]
+        body = b"[" + b",".join(self._encoded[-key[1]] for key in keys) + b"]"
+        more = start + limit < len(self._order)
+        return body, encode_feed_cursor(keys[-1]) if more and keys else None
+
+    # Persistence
+
+    def _snapshot(self) -> bytes:
+        return pydantic_core.to_json({
+            "format": SNAPSHOT_FORMAT,
+            "saved_at": time.time(),
+            "last_change_id": self.last_change_id,
+            "rows": list(self._rows.values()),
+            "sightings": self._sightings,
+        })
+
+    def _write(self, data: bytes) -> None:
+        temp = f"{self.snapshot_path}.part"
+        with open(temp, "wb") as f:
+            f.write(data)
+        os.replace(temp, self.snapshot_path)
+
+    async def save(self) -> bool:
+        """Persist the projection if it changed since the last save."""
+        if self.version == self._saved_version:
+            return False
+        version = self.version
+        await anyio.to_thread.run_sync(self._write, self._snapshot())
+        self._saved_version = version
+        return True
+
+    async def load(self) -> bool:
+        """Restore a saved projection; False when there is none or it predates
+        the retained change log (a rebuild is needed then)."""
+        try:
+            async with await anyio.open_file(self.snapshot_path, "rb") as f:
+                snapshot = json.loads(await f.read())
+        except (OSError, ValueError):
+            return False
+        retention = change_log.RETENTION_SECONDS
+        if snapshot.get("format") != SNAPSHOT_FORMAT or (
+                retention and snapshot["saved_at"] < time.time() - retention):
+            return False
+        # A change log behind the snapshot means another (or a reset) database
+        last = await ChangeLog.all().order_by("-id").first().values("id")
+        if (last["id"] if last else 0) < snapshot["last_change_id"]:
+            return False
+        async with self._lock:
+            self._rows, self._keys, self._order, self._encoded = {}, {}, [], {}
+            self._sightings = {int(pet_id): sighting
+                               for pet_id, sighting in snapshot["sightings"].items()}
+            for row in snapshot["rows"]:
+                self._put(row["id"], row)
+            self.last_change_id = snapshot["last_change_id"]
+            self._saved_version = self.version
+        return True
+
+    async def start(self) -> None:
+        """Restore the saved projection and catch up, or build it from scratch."""
+        if await self.load():
+            applied = await self.catch_up()
+            logger.info("Restored lost pets feed: %d pets, %d changes replayed", len(self), applied)
+        else:
+            await self.rebuild()
+
+    async def run(self, refresh_seconds: float, persist_seconds: float) -> None:
+        """Background task: follow the change log and save periodically."""
+        last_save = time.monotonic()
+        while True:
+            await asyncio.sleep(refresh_seconds)
+            try:
+                await self.catch_up()
+                if time.monotonic() - last_save >= persist_seconds:
+                    await self.save()
+                    last_save = time.monotonic()
+            except Exception:
+                logger.exception("Lost pets feed refresh failed")
+
+
+# Singleton instance
+_lost_feed: Optional[LostPetFeed] = None
+
+
+def get_lost_feed() -> LostPetFeed:
+    """Get or create lost pets feed singleton"""
+    global _lost_feed
+
+    if _lost_feed is None:
+        _lost_feed = LostPetFeed(settings.lost_feed_snapshot_path)
+
+    return _lost_feed
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds clients are asked to wait when the hashing queue is full
+BUSY_RETRY_AFTER_SECONDS = 1
+
+
+def build_password_context(rounds: int) -> CryptContext:
+    """bcrypt context whose hashes are flagged for rehash at any other cost.
+
+    Pinning both min and max rounds makes ``needs_update`` (and
+    ``verify_and_update``) report hashes created before the cost factor was
+    raised or lowered, so they are upgraded transparently on the next login.
+    """
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+class PasswordHasher:
+    """Run bcrypt off the event loop on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL, so ``max_workers`` hashes proceed in parallel
+    while the loop keeps serving other requests. At most ``max_pending``
+    operations may be queued or running; beyond that callers get a 503
+    instead of piling up behind a login burst. Queue wait and hashing time
+    are recorded for ``stats()``.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int = 2, max_pending: int = 64):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_seconds = 0.0
+        self._max_queue_seconds = 0.0
+        self._hash_seconds = 0.0
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server busy, please retry",
+                    headers={"Retry-After": str(BUSY_RETRY_AFTER_SECONDS)},
+                )
+            self._pending += 1
+        submitted = time.perf_counter()
+
+        def _timed() -> Tuple[Any, float, float]:
+            started = time.perf_counter()
+            result = func(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        try:
+            loop = asyncio.get_running_loop()
+            result, queued, elapsed = await loop.run_in_executor(self._executor, _timed)
+        finally:
+            with self._lock:
+                self._pending -= 1
+        with self._lock:
+            self._completed += 1
+            self._queue_seconds += queued
+            self._max_queue_seconds = max(self._max_queue_seconds, queued)
+            self._hash_seconds += elapsed
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Return ``(valid, new_hash)``; ``new_hash`` is set when the stored
+        hash uses an outdated cost factor and should be replaced."""
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.max_workers,
+                "pending": self._pending,
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_queue_ms": round(self._queue_seconds / completed * 1000, 2) if completed else 0.0,
+                "max_queue_ms": round(self._max_queue_seconds * 1000, 2),
+                "avg_hash_ms": round(self._hash_seconds / completed * 1000, 2) if completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+_password_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get or create password hasher singleton"""
+    global _password_hasher
+
+    if not _password_hasher:
+        _password_hasher = PasswordHasher(
+            build_password_context(settings.bcrypt_rounds),
+            max_workers=settings.password_hash_workers,
+            max_pending=settings.password_hash_max_pending,
+        )
+
+    return _password_hasher
@@ -5,6 +5,7 @@ from jinja2 import Environment, FileSystemLoader
 from fastapi import HTTPException
 import logging
 from io import BytesIO
+from services.static_assets import asset_url
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,7 @@ class PDFGenerator:
     def __init__(self, templates_dir: str):
         self.templates_dir = templates_dir
         self.jinja_env = Environment(loader=FileSystemLoader(templates_dir))
+        self.jinja_env.globals["asset_url"] = asset_url
 
     async def generate_pdf(
         self,
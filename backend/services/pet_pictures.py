@@ -0,0 +1,88 @@
+import logging
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import anyio
+from PIL import Image
+
+from models import PetPicture
+from services.upload_storage import upload_path
+
+logger = logging.getLogger(__name__)
+
+# Matches the maximum number of pictures accepted by PetCreate
+MAX_PICTURES = 5
+
+
+def _image_size(url: str) -> Tuple[Optional[int], Optional[int]]:
+    """Width and height of an uploaded picture (header only), or Nones."""
+    path = upload_path(url)
+    if path is None:
+        return None, None
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except (OSError, ValueError):
+        return None, None
+
+
+async def pictures_by_pet(pet_ids: Iterable[int]) -> Dict[int, List[str]]:
+    """Picture URLs of several pets, in order, with a single query."""
+    ids = list(set(pet_ids))
+    by_pet: Dict[int, List[str]] = {pet_id: [] for pet_id in ids}
+    if not ids:
+        return by_pet
+    rows = await PetPicture.filter(pet_id__in=ids).order_by("pet_id", "position", "id").values_list(
+        "pet_id", "url")
+    for pet_id, url in rows:
+        by_pet[pet_id].append(url)
+    return by_pet
+
+
+async def attach_pictures(rows: Sequence[Dict[str, Any]]) -> Sequence[Dict[str, Any]]:
+    """Add a ``pictures`` list to each ``values()`` pet row (one query for all rows)."""
+    by_pet = await pictures_by_pet(row["id"] for row in rows)
+    for row in rows:
+        row["pictures"] = by_pet[row["id"]]
+    return rows
+
+
+def picture_list(urls: Sequence[str]) -> List[str]:
+    """The URLs stored for ``urls``: empty ones dropped, at most MAX_PICTURES."""
+    return [url for url in urls if url][:MAX_PICTURES]
+
+
+async def set_pictures(pet_id: int, urls: Sequence[str]) -> List[str]:
+    """Replace a pet's pictures with ``urls`` in that order; returns the stored URLs.
+
+    Run it inside the transaction that creates or updates the pet.
+    """
+    await PetPicture.filter(pet_id=pet_id).delete()
+    await add_pictures({pet_id: urls})
+    return picture_list(urls)
+
+
+def _picture_rows(urls_by_pet: Mapping[int, Sequence[str]]) -> List[PetPicture]:
+    rows = []
+    for pet_id, urls in urls_by_pet.items():
+        for position, url in enumerate(picture_list(urls)):
+            width, height = _image_size(url)
+            rows.append(PetPicture(pet_id=pet_id, url=url, position=position,
+                                   width=width, height=height))
+    return rows
+
+
+async def add_pictures(urls_by_pet: Mapping[int, Sequence[str]]) -> None:
+    """Attach pictures to pets that have none yet, with a single insert.
+
+    Image sizes are read in one worker thread for all the pets.
+    """
+    rows = await anyio.to_thread.run_sync(_picture_rows, urls_by_pet)
+    if rows:
+        await PetPicture.bulk_create(rows)
+
+
+async def pets_with_picture(url: str) -> List[int]:
+    """Ids of the pets showing a picture (stored with or without a leading slash)."""
+    url = url.lstrip("/")
+    return await PetPicture.filter(url__in=[url, f"/{url}"]).distinct().values_list(
+        "pet_id", flat=True)
@@ -0,0 +1,130 @@
+import logging
+import re
+from typing import List, Optional
+
+from tortoise import Tortoise
+
+from database import read_connection
+
+logger = logging.getLogger(__name__)
+
+# Pet columns that are searchable, with their relative weight in the ranking
+SEARCH_COLUMNS = {
+    "name": 10.0,
+    "breed": 5.0,
+    "distinctive1": 3.0,
+    "distinctive2": 3.0,
+    "distinctive3": 3.0,
+    "distinctive4": 3.0,
+    "notes": 1.0,
+}
+# Words of a query beyond this are ignored
+MAX_QUERY_TERMS = 8
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def query_terms(text: str) -> List[str]:
+    """Lowercased words of a free-text query; punctuation and operators are dropped."""
+    return [word.lower() for word in _WORD.findall(text)][:MAX_QUERY_TERMS]
+
+
+class SQLiteSearchBackend:
+    """FTS5 index over the pet table.
+
+    ``pet_fts`` is an external-content table (the text lives only in ``pet``)
+    kept in sync by triggers, so inserts, updates and deletes through the ORM,
+    queryset updates and raw SQL are all indexed in the same transaction.
+    Both are created by migrations/0005_pet_search.py.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, connection_name: str = "default"):
+        self.connection_name = connection_name
+
+    def _connection(self):
+        return Tortoise.get_connection(self.connection_name)
+
+    async def rebuild(self) -> None:
+        await self._connection().execute_script("INSERT INTO pet_fts(pet_fts) VALUES ('rebuild')")
+        logger.info("Rebuilt pet search index")
+
+    async def search(self, text: str, status: str, pet_type: Optional[str],
+                     limit: int, offset: int) -> List[int]:
+        terms = query_terms(text)
+        if not terms:
+            return []
+        # Every word must match, the last one as a prefix (search as you type)
+        match = " ".join(f'"{term}"' for term in terms) + "*"
+        weights = ", ".join(str(weight) for weight in SEARCH_COLUMNS.values())
+        sql = (f"SELECT pet.id FROM pet_fts JOIN pet ON pet.id = pet_fts.rowid "
+               f"WHERE pet_fts MATCH ? AND pet.status = ?")
+        params: list = [match, status]
+        if pet_type:
+            sql += " AND pet.pet_type = ?"
+            params.append(pet_type)
+        sql += f" ORDER BY bm25(pet_fts, {weights}), pet.id LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        rows = await read_connection(self.connection_name).execute_query_dict(sql, params)
+        return [row["id"] for row in rows]
+
+
+class PostgresSearchBackend:
+    """Weighted ``tsvector`` generated column on the pet table with a GIN index.
+
+    Postgres maintains the generated column itself on every write. Both are
+    created by migrations/0005_pet_search.py.
+    """
+
+    dialect = "postgres"
+
+    def __init__(self, connection_name: str = "default"):
+        self.connection_name = connection_name
+
+    def _connection(self):
+        return Tortoise.get_connection(self.connection_name)
+
+    async def rebuild(self) -> None:
+        # Generated columns are always current; only the index can be rebuilt
+        await self._connection().execute_script("REINDEX INDEX pet_search_vector_idx")
+
+    async def search(self, text: str, status: str, pet_type: Optional[str],
+                     limit: int, offset: int) -> List[int]:
+        terms = query_terms(text)
+        if not terms:
+            return []
+        query = " & ".join(terms) + ":*"
+        sql = ("SELECT id FROM pet, to_tsquery('simple', $1) AS query "
+               "WHERE search_vector @@ query AND status = $2")
+        params: list = [query, status]
+        if pet_type:
+            params.append(pet_type)
+            sql += f" AND pet_type = ${len(params)}"
+        sql += (f" ORDER BY ts_rank(search_vector, query) DESC, id "
+                f"LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}")
+        params += [limit, offset]
+        rows = await self._connection().execute_query_dict(sql, params)
+        return [row["id"] for row in rows]
+
+
+SEARCH_BACKENDS = {
+    backend.dialect: backend for backend in (SQLiteSearchBackend, PostgresSearchBackend)
+}
+
+
+# Singleton instance
+_pet_search = None
+
+
+def get_pet_search():
+    """Get or create the pet search backend for the default connection's database"""
+    global _pet_search
+
+    if not _pet_search:
+        dialect = Tortoise.get_connection("default").capabilities.dialect
+        if dialect not in SEARCH_BACKENDS:
+            raise RuntimeError(f"Pet search is not supported on {dialect}")
+        _pet_search = SEARCH_BACKENDS[dialect]()
+
+    return _pet_search
@@ -0,0 +1,295 @@
+import asyncio
+import io
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import anyio
+from PIL import Image, ImageOps
+from tortoise.expressions import Q
+
+from models import Pet, PetPicture, PhotoHash
+from services.image_pipeline import variant_path
+from services.pet_pictures import attach_pictures
+from services.upload_storage import STATIC_ROOT, upload_path
+
+logger = logging.getLogger(__name__)
+
+# dHash grid: HASH_SIZE x HASH_SIZE bits comparing horizontally adjacent pixels
+HASH_SIZE = 8
+# Hamming distance (out of 64 bits) up to which two photos are considered similar
+DEFAULT_MAX_DISTANCE = 10
+# Search cost grows quickly with the radius (see MultiIndexHash)
+MAX_DISTANCE = 12
+# Substrings each hash is split into for the multi-index
+INDEX_CHUNKS = 4
+# Hashing reads the small variant when it exists instead of the full upload
+HASH_SOURCE_VARIANT = "thumb"
+# Stored hashes re-read below the highest id seen on each refresh: ids are
+# handed out at insert time, so a lower one can commit after a higher one
+REFRESH_OVERLAP_IDS = 100
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash: whether each pixel is brighter than its right neighbour
+    on a 9x8 grayscale thumbnail. Robust to rescaling, recompression and small edits."""
+    image = ImageOps.exif_transpose(image).convert("L")
+    small = image.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def dhash_file(path) -> int:
+    """dHash of an image file, path or file object (blocking)."""
+    with Image.open(path) as image:
+        image.draft("L", (64, 64))  # let JPEG decoding downscale on the fly
+        return dhash(image)
+
+
+def dhash_bytes(data: bytes) -> int:
+    return dhash_file(io.BytesIO(data))
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(bits: int, max_flips: int) -> Tuple[int, ...]:
+    """Every ``bits``-wide mask with at most ``max_flips`` bits set."""
+    masks = [0]
+    for flips in range(1, max_flips + 1):
+        for positions in combinations(range(bits), flips):
+            mask = 0
+            for position in positions:
+                mask |= 1 << position
+            masks.append(mask)
+    return tuple(masks)
+
+
+class MultiIndexHash:
+    """Multi-index hashing of 64-bit hashes for Hamming radius search.
+
+    Each hash is split into ``chunks`` substrings, each indexed in its own
+    table. Two hashes within distance ``r`` differ in at most ``r // chunks``
+    bits of at least one substring (pigeonhole), so a search only probes the
+    substring values within that distance and verifies those candidates
+    instead of comparing against every hash. Several members can share a hash.
+    """
+
+    def __init__(self, bits: int = HASH_SIZE * HASH_SIZE, chunks: int = INDEX_CHUNKS):
+        self._chunk_bits = bits // chunks
+        self._chunk_mask = (1 << self._chunk_bits) - 1
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in range(chunks)]
+        self._members: Dict[int, Set[Any]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(members) for members in self._members.values())
+
+    def _keys(self, value: int) -> Iterable[Tuple[Dict[int, Set[int]], int]]:
+        for position, table in enumerate(self._tables):
+            yield table, (value >> (position * self._chunk_bits)) & self._chunk_mask
+
+    def add(self, value: int, member: Any) -> None:
+        members = self._members.get(value)
+        if members is None:
+            members = self._members[value] = set()
+            for table, key in self._keys(value):
+                table.setdefault(key, set()).add(value)
+        members.add(member)
+
+    def discard(self, value: int, member: Any) -> None:
+        members = self._members.get(value)
+        if members is None:
+            return
+        members.discard(member)
+        if members:
+            return
+        del self._members[value]
+        for table, key in self._keys(value):
+            bucket = table[key]
+            bucket.discard(value)
+            if not bucket:
+                del table[key]
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, Any]]:
+        """``(distance, member)`` pairs within ``radius`` of ``value``, closest first."""
+        masks = _flip_masks(self._chunk_bits, radius // len(self._tables))
+        candidates: Set[int] = set()
+        for table, key in self._keys(value):
+            for mask in masks:
+                bucket = table.get(key ^ mask)
+                if bucket:
+                    candidates.update(bucket)
+        found: List[Tuple[int, Any]] = []
+        for candidate in candidates:
+            distance = hamming(value, candidate)
+            if distance <= radius:
+                found.extend((distance, member) for member in self._members[candidate])
+        found.sort(key=lambda item: item[0])
+        return found
+
+
+def _hash_source(url: str) -> Optional[str]:
+    source = upload_path(url)
+    if source is None:
+        return None
+    variant = variant_path(source, HASH_SOURCE_VARIANT)
+    return variant if os.path.exists(variant) else source
+
+
+def _url_for_path(path: str) -> str:
+    return "static/" + os.path.relpath(path, STATIC_ROOT).replace(os.sep, "/")
+
+
+class PhotoIndex:
+    """In-memory multi-index of the perceptual hashes of uploaded pictures.
+
+    Hashes are persisted in ``PhotoHash`` and loaded at startup; new uploads
+    are hashed in the background once the image pipeline has made their
+    variants. ``run`` follows the table for hashes stored by other workers.
+    """
+
+    def __init__(self):
+        self._index = MultiIndexHash()
+        self._hashes: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        # Highest PhotoHash id read so far
+        self._last_id = 0
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _add(self, url: str, value: int) -> None:
+        previous = self._hashes.get(url)
+        if previous is not None:
+            self._index.discard(previous, url)
+        self._hashes[url] = value
+        self._index.add(value, url)
+
+    async def refresh(self) -> int:
+        """Add the hashes stored since the last read, by this worker or
+        another one; returns how many rows were read."""
+        rows = await PhotoHash.filter(id__gt=self._last_id - REFRESH_OVERLAP_IDS).order_by(
+            "id").values_list("id", "picture", "dhash")
+        for row_id, url, value in rows:
+            self._add(url, int(value, 16))
+            self._last_id = max(self._last_id, row_id)
+        return len(rows)
+
+    async def load(self) -> int:
+        """Add every stored hash to the index; returns how many it holds."""
+        await self.refresh()
+        logger.info("Loaded %d photo hashes", len(self._hashes))
+        return len(self._hashes)
+
+    async def run(self, refresh_seconds: float) -> None:
+        """Background task: pick up hashes of pictures uploaded to other workers."""
+        while True:
+            await asyncio.sleep(refresh_seconds)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Photo index refresh failed")
+
+    async def index_picture(self, url: str) -> Optional[int]:
+        """Hash an uploaded picture and store it; None if it is not a readable upload."""
+        url = url.lstrip("/")
+        source = _hash_source(url)
+        if source is None:
+            return None
+        try:
+            value = await anyio.to_thread.run_sync(dhash_file, source)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not hash %s: %s", url, e)
+            return None
+        await PhotoHash.update_or_create(picture=url, defaults={"dhash": f"{value:016x}"})
+        self._add(url, value)
+        return value
+
+    def on_picture_ready(self, url: str) -> None:
+        """Image pipeline listener: hash a picture once its variants exist."""
+        task = asyncio.get_running_loop().create_task(self.index_picture(url))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def backfill(self) -> int:
+        """Hash pictures referenced by pets that have no stored hash yet."""
+        missing = {url.lstrip("/") for url in await PetPicture.all().values_list("url", flat=True)
+                   if url and upload_path(url)}
+        missing.difference_update(self._hashes)
+        indexed = 0
+        for url in sorted(missing):
+            if await self.index_picture(url) is not None:
+                indexed += 1
+        if indexed:
+            logger.info("Hashed %d existing pictures", indexed)
+        return indexed
+
+    async def forget_paths(self, paths: Iterable[str]) -> None:
+        """Drop the hashes of deleted upload files."""
+        urls = [url for url in map(_url_for_path, paths) if url in self._hashes]
+        if not urls:
+            return
+        await PhotoHash.filter(picture__in=urls).delete()
+        for url in urls:
+            self._index.discard(self._hashes.pop(url), url)
+
+    def similar_pictures(self, value: int, max_distance: int) -> Dict[str, int]:
+        """Picture URL -> Hamming distance for hashes within ``max_distance``."""
+        return {url: distance for distance, url in self._index.search(value, max_distance)}
+
+    async def similar_pets(self, value: int, max_distance: int = DEFAULT_MAX_DISTANCE,
+                           status: str = "lost", pet_type: Optional[str] = None,
+                           days: Optional[int] = None, limit: int = 20,
+                           columns: Iterable[str] = ("id",)) -> List[Tuple[int, Dict[str, Any]]]:
+        """``(distance, row)`` for pets with a picture close to ``value``, closest first.
+
+        ``days`` keeps pets last seen (or, without a last-seen date, updated)
+        within that many days.
+        """
+        pictures = self.similar_pictures(value, max_distance)
+        if not pictures:
+            return []
+        # Pictures may be stored with or without a leading slash
+        urls = [*pictures, *(f"/{url}" for url in pictures)]
+        distances: Dict[int, int] = {}
+        for pet_id, url in await PetPicture.filter(url__in=urls).values_list("pet_id", "url"):
+            distance = pictures[url.lstrip("/")]
+            distances[pet_id] = min(distance, distances.get(pet_id, distance))
+        if not distances:
+            return []
+        query = Pet.filter(id__in=list(distances), status=status)
+        if pet_type:
+            query = query.filter(pet_type=pet_type)
+        if days is not None:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+            query = query.filter(Q(last_seen_date__gte=cutoff.date())
+                                 | Q(last_seen_date=None, updated_at__gte=cutoff))
+        rows = await query.values(*dict.fromkeys(["id", *columns]))
+        matches = sorted(((distances[row["id"]], row) for row in rows),
+                         key=lambda match: (match[0], match[1]["id"]))[:limit]
+        await attach_pictures([row for _, row in matches])
+        return matches
+
+
+# Singleton instance
+_photo_index: Optional[PhotoIndex] = None
+
+
+def get_photo_index() -> PhotoIndex:
+    """Get or create photo index singleton"""
+    global _photo_index
+
+    if _photo_index is None:
+        _photo_index = PhotoIndex()
+
+    return _photo_index
@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import secrets
+import time
+from typing import AsyncIterator, Optional
+
+import anyio
+from fastapi import HTTPException
+
+from services.image_pipeline import get_image_pipeline
+from services.upload_storage import (
+    CHUNK_SIZE,
+    MAX_FILE_SIZE_BYTES,
+    SHA256_RE,
+    UPLOAD_DIR,
+    sniff_image_type,
+    upload_url,
+)
+
+logger = logging.getLogger(__name__)
+
+# Sessions live next to the uploads so completion is a same-filesystem rename
+SESSIONS_DIR = os.path.join(UPLOAD_DIR, ".resumable")
+SESSION_TTL_SECONDS = 24 * 60 * 60
+SESSION_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+# One lock per session so concurrent PATCHes of the same upload are serialized
+_session_locks: dict[str, asyncio.Lock] = {}
+
+
+def _meta_path(session_id: str) -> str:
+    return os.path.join(SESSIONS_DIR, f"{session_id}.json")
+
+
+def _data_path(session_id: str) -> str:
+    return os.path.join(SESSIONS_DIR, f"{session_id}.part")
+
+
+def _write_meta(session: dict) -> None:
+    temp = _meta_path(session["id"]) + ".tmp"
+    with open(temp, "w") as f:
+        json.dump(session, f)
+    os.replace(temp, _meta_path(session["id"]))
+
+
+def _remove_session_files(session_id: str) -> None:
+    for path in (_meta_path(session_id), _data_path(session_id)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    _session_locks.pop(session_id, None)
+
+
+def _current_offset(session_id: str) -> int:
+    try:
+        return os.path.getsize(_data_path(session_id))
+    except FileNotFoundError:
+        return 0
+
+
+async def create_session(user_id: int, length: int, sha256: Optional[str] = None) -> dict:
+    """Start a resumable upload of ``length`` bytes for the user."""
+    if length <= 0:
+        raise HTTPException(status_code=400, detail="Upload length must be positive")
+    if length > MAX_FILE_SIZE_BYTES:
+        raise HTTPException(status_code=400, detail="File too large (max 5MB)")
+    if sha256 is not None and not SHA256_RE.fullmatch(sha256):
+        raise HTTPException(status_code=400, detail="Invalid sha256 checksum")
+    now = time.time()
+    session = {
+        "id": secrets.token_hex(16),
+        "user_id": user_id,
+        "length": length,
+        "sha256": sha256,
+        "created_at": now,
+        "expires_at": now + SESSION_TTL_SECONDS,
+    }
+
+    def _create() -> None:
+        os.makedirs(SESSIONS_DIR, exist_ok=True)
+        open(_data_path(session["id"]), "wb").close()
+        _write_meta(session)
+
+    await anyio.to_thread.run_sync(_create)
+    return {**session, "offset": 0}
+
+
+async def get_session(session_id: str, user_id: int) -> dict:
+    """Load a session owned by the user, with its current ``offset``."""
+    if not SESSION_ID_RE.fullmatch(session_id):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    try:
+        async with await anyio.open_file(_meta_path(session_id)) as f:
+            session = json.loads(await f.read())
+    except (FileNotFoundError, ValueError):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if session["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if session["expires_at"] <= time.time():
+        await anyio.to_thread.run_sync(_remove_session_files, session_id)
+        raise HTTPException(status_code=410, detail="Upload session expired")
+    if session.get("url"):
+        # Completed: kept until expiry so a client that missed the final
+        # response can still learn the URL
+        session["offset"] = session["length"]
+    else:
+        session["offset"] = await anyio.to_thread.run_sync(_current_offset, session_id)
+    return session
+
+
+async def write_chunk(session: dict, offset: int, body: AsyncIterator[bytes]) -> dict:
+    """Write a chunk received at ``offset``; returns the updated session.
+
+    Chunks must start at or before the current offset. Re-sending a chunk
+    that was already (partly) stored rewrites the same bytes, so retries of
+    an interrupted request are idempotent. When the last byte arrives the
+    upload is verified and moved into content-addressed storage, and the
+    returned session carries its ``url``. Once complete, any further chunk
+    (a retry of the final one) just returns the completed session.
+    """
+    session_id = session["id"]
+    if session.get("url"):
+        return session
+    lock = _session_locks.setdefault(session_id, asyncio.Lock())
+    async with lock:
+        # Another PATCH may have completed (or failed) the upload meanwhile
+        session = await get_session(session_id, session["user_id"])
+        if session.get("url"):
+            return session
+        current = session["offset"]
+        if offset > current:
+            raise HTTPException(
+                status_code=409, detail=f"Upload offset mismatch (expected <= {current})")
+        position = offset
+        async with await anyio.open_file(_data_path(session_id), "r+b") as out:
+            await out.seek(offset)
+            async for chunk in body:
+                if position + len(chunk) > session["length"]:
+                    raise HTTPException(
+                        status_code=400, detail="Chunk exceeds declared upload length")
+                await out.write(chunk)
+                position += len(chunk)
+        session["offset"] = max(current, position)
+        if session["offset"] == session["length"]:
+            session["url"] = await _complete(session)
+    return session
+
+
+def _finalize(session: dict) -> str:
+    """Verify a fully received upload and move it into the user's storage.
+
+    The session's metadata is kept, with the ``url``, until it expires.
+    """
+    data_path = _data_path(session["id"])
+    digest = hashlib.sha256()
+    with open(data_path, "rb") as f:
+        head = f.read(CHUNK_SIZE)
+        ext = sniff_image_type(head)
+        chunk = head
+        while chunk:
+            digest.update(chunk)
+            chunk = f.read(CHUNK_SIZE)
+    sha256 = digest.hexdigest()
+    if ext is None:
+        _remove_session_files(session["id"])
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    if session.get("sha256") and session["sha256"] != sha256:
+        _remove_session_files(session["id"])
+        raise HTTPException(status_code=400, detail="Checksum mismatch")
+    user_dir = os.path.join(UPLOAD_DIR, str(session["user_id"]))
+    os.makedirs(user_dir, exist_ok=True)
+    filename = f"{sha256}{ext}"
+    os.replace(data_path, os.path.join(user_dir, filename))
+    url = upload_url(session["user_id"], filename)
+    _write_meta({key: value for key, value in session.items() if key != "offset"} | {"url": url})
+    return url
+
+
+async def _complete(session: dict) -> str:
+    url = await anyio.to_thread.run_sync(_finalize, session)
+    get_image_pipeline().backfill(url)
+    return url
+
+
+async def abort_session(session: dict) -> None:
+    await anyio.to_thread.run_sync(_remove_session_files, session["id"])
+
+
+def _sweep_expired() -> int:
+    if not os.path.isdir(SESSIONS_DIR):
+        return 0
+    now = time.time()
+    removed = 0
+    for entry in os.scandir(SESSIONS_DIR):
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            with open(entry.path) as f:
+                expires_at = json.load(f)["expires_at"]
+        except (OSError, ValueError, KeyError):
+            expires_at = 0
+        if expires_at <= now:
+            _remove_session_files(entry.name[:-len(".json")])
+            removed += 1
+    return removed
+
+
+async def expire_sessions() -> int:
+    """Delete abandoned and completed sessions past their expiry; returns how
+    many were removed."""
+    removed = await anyio.to_thread.run_sync(_sweep_expired)
+    if removed:
+        logger.info("Expired %d abandoned resumable uploads", removed)
+    return removed
@@ -0,0 +1,254 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "static"))
+# Precompressed variants are named after the content hash, so they never go stale
+PRECOMPRESSED_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", ".static_cache"))
+
+# User content is served by the uploads handler, not fingerprinted here
+EXCLUDED_DIRS = {"uploads"}
+COMPRESSIBLE_EXTENSIONS = {".css", ".html", ".js", ".json", ".svg", ".txt", ".ttf", ".otf", ".xml"}
+# Only keep a compressed variant when it saves at least this fraction
+MIN_COMPRESSION_SAVING = 0.1
+FINGERPRINT_LENGTH = 16
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+
+class AssetEntry:
+    __slots__ = ("path", "fingerprint", "mtime", "size", "encodings", "media_type")
+
+    def __init__(self, path: str, fingerprint: str, mtime: float, size: int,
+                 encodings: Dict[str, str]):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.mtime = mtime
+        self.size = size
+        # content-coding ("br", "gzip") -> precompressed file path
+        self.encodings = encodings
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        return f'"{self.fingerprint}-{encoding}"' if encoding else f'"{self.fingerprint}"'
+
+
+class StaticAssetManifest:
+    """Content-hash fingerprints and precompressed variants of static assets.
+
+    Entries are keyed by path relative to the static root (``flyers_templates/a4.css``).
+    Each lookup compares the file's mtime/size with the entry, so assets edited
+    while the server runs are re-fingerprinted instead of served stale.
+    """
+
+    def __init__(self, root: str = STATIC_ROOT, cache_dir: str = PRECOMPRESSED_DIR):
+        self.root = root
+        self.cache_dir = cache_dir
+        self._entries: Dict[str, AssetEntry] = {}
+        self._lock = threading.Lock()
+        self._built = False
+
+    def build(self) -> None:
+        """Fingerprint every asset and write its gzip/brotli variants."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        count = 0
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root:
+                dirnames[:] = [d for d in dirnames if d not in EXCLUDED_DIRS]
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                rel_path = os.path.relpath(os.path.join(dirpath, filename), self.root)
+                if self.refresh(rel_path.replace(os.sep, "/")):
+                    count += 1
+        self._built = True
+        logger.info("Static asset manifest built (%d assets, brotli=%s)",
+                    count, brotli is not None)
+
+    def _is_excluded(self, rel_path: str) -> bool:
+        parts = rel_path.split("/")
+        return parts[0] in EXCLUDED_DIRS or any(part.startswith(".") for part in parts)
+
+    def refresh(self, rel_path: str) -> Optional[AssetEntry]:
+        """(Re)build the entry of one asset; blocking, reads the whole file."""
+        if self._is_excluded(rel_path):
+            return None
+        path = os.path.join(self.root, *rel_path.split("/"))
+        try:
+            stat = os.stat(path)
+            with open(path, "rb") as f:
+                content = f.read()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            with self._lock:
+                self._entries.pop(rel_path, None)
+            return None
+        fingerprint = hashlib.sha256(content).hexdigest()[:FINGERPRINT_LENGTH]
+        encodings: Dict[str, str] = {}
+        ext = os.path.splitext(path)[1].lower()
+        if ext in COMPRESSIBLE_EXTENSIONS:
+            encodings = self._precompress(content, f"{fingerprint}{ext}")
+        entry = AssetEntry(path, fingerprint, stat.st_mtime, stat.st_size, encodings)
+        with self._lock:
+            self._entries[rel_path] = entry
+        return entry
+
+    def _precompress(self, content: bytes, name: str) -> Dict[str, str]:
+        encoders = {"gzip": (".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))}
+        if brotli is not None:
+            encoders["br"] = (".br", lambda data: brotli.compress(data, quality=11))
+        encodings: Dict[str, str] = {}
+        for encoding, (suffix, compress) in encoders.items():
+            target = os.path.join(self.cache_dir, name + suffix)
+            if not os.path.exists(target):
+                compressed = compress(content)
+                if len(compressed) > len(content) * (1 - MIN_COMPRESSION_SAVING):
+                    continue
+                os.makedirs(self.cache_dir, exist_ok=True)
+                temp = f"{target}.{os.getpid()}.tmp"
+                with open(temp, "wb") as f:
+                    f.write(compressed)
+                os.replace(temp, target)
+            encodings[encoding] = target
+        return encodings
+
+    def lookup(self, rel_path: str) -> tuple[Optional[AssetEntry], bool]:
+        """Return ``(entry, fresh)``; ``fresh`` is False when it must be refreshed."""
+        entry = self._entries.get(rel_path)
+        if entry is None:
+            # Once built, unknown paths are not assets (e.g. uploads)
+            return None, self._built
+        try:
+            stat = os.stat(entry.path)
+        except FileNotFoundError:
+            return None, False
+        fresh = stat.st_mtime == entry.mtime and stat.st_size == entry.size
+        return entry, fresh
+
+    def get(self, rel_path: str) -> Optional[AssetEntry]:
+        """Current entry of an asset, refreshing it if the file changed."""
+        entry, fresh = self.lookup(rel_path)
+        if not fresh:
+            entry = self.refresh(rel_path)
+        return entry
+
+    def asset_url(self, rel_path: str) -> str:
+        """Fingerprinted URL of an asset, for use in templates.
+
+        ``asset_url("flyers_templates/a4.css")`` -> ``/static/flyers_templates/a4.css?v=<hash>``
+        """
+        rel_path = rel_path.lstrip("/")
+        if rel_path.startswith("static/"):
+            rel_path = rel_path[len("static/"):]
+        entry = self.get(rel_path)
+        if entry is None:
+            return f"/static/{rel_path}"
+        return f"/static/{rel_path}?v={entry.fingerprint}"
+
+
+def negotiate_encoding(accept_encoding: str, available: Dict[str, str]) -> Optional[str]:
+    """Pick the best precompressed encoding the client accepts (br over gzip)."""
+    if not available or not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for token in accept_encoding.split(","):
+        name, _, params = token.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """StaticFiles that serves precompressed variants with strong caching.
+
+    Requests carrying the current fingerprint (``?v=<hash>``, see
+    ``asset_url``) are marked immutable; other requests must revalidate
+    against the content-hash ETag. Paths outside the manifest (uploads) fall
+    back to plain StaticFiles behaviour.
+    """
+
+    def __init__(self, *args, manifest: StaticAssetManifest, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+        rel_path = path.replace(os.sep, "/")
+        entry, fresh = self.manifest.lookup(rel_path)
+        if not fresh:
+            entry = await run_in_threadpool(self.manifest.refresh, rel_path)
+        if entry is None:
+            return await super().get_response(path, scope)
+
+        request_headers = Headers(scope=scope)
+        version = parse_qs(scope.get("query_string", b"").decode()).get("v", [None])[0]
+        encoding = negotiate_encoding(
+            request_headers.get("accept-encoding", ""), entry.encodings)
+        headers = {
+            "ETag": entry.etag(encoding),
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if version == entry.fingerprint
+            else REVALIDATE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request_headers.get("if-none-match", "")
+        if if_none_match and (if_none_match.strip() == "*" or headers["ETag"] in
+                              [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return FileResponse(entry.encodings[encoding], headers=headers, media_type=entry.media_type)
+        return FileResponse(entry.path, headers=headers, media_type=entry.media_type)
+
+
+# Singleton instance
+_static_assets: Optional[StaticAssetManifest] = None
+
+
+def get_static_assets() -> StaticAssetManifest:
+    """Get or create static asset manifest singleton"""
+    global _static_assets
+
+    if not _static_assets:
+        _static_assets = StaticAssetManifest()
+
+    return _static_assets
+
+
+def asset_url(path: str) -> str:
+    """Jinja helper: fingerprinted URL of a static asset."""
+    return get_static_assets().asset_url(path)
+
+
+if __name__ == "__main__":
+    # Build step: python -m services.static_assets
+    logging.basicConfig(level=logging.INFO)
+    get_static_assets().build()
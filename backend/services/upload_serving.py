@@ -0,0 +1,229 @@
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from config import settings
+from services.upload_storage import CHUNK_SIZE, SHA256_RE, UPLOAD_DIR
+from utils.cache import LRUCache
+
+# Files larger than this are always streamed from disk instead of cached
+HOT_FILE_MAX_BYTES = 1024 * 1024
+CONTENT_ADDRESSED_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=86400"
+RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class FileMeta:
+    __slots__ = ("path", "etag", "size", "media_type", "cache_control")
+
+    def __init__(self, path: str, etag: str, size: int, media_type: str, cache_control: str):
+        self.path = path
+        self.etag = etag
+        self.size = size
+        self.media_type = media_type
+        self.cache_control = cache_control
+
+
+def _load_meta(path: str) -> Optional[FileMeta]:
+    """Stat a file and derive its strong ETag (blocking).
+
+    Content-addressed uploads are named after their SHA-256, which is used as
+    the ETag directly; other files (variants, older uploads) are hashed once.
+    """
+    try:
+        size = os.stat(path).st_size
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    stem = os.path.basename(path).split(".", 1)[0]
+    is_original = os.path.basename(path).count(".") == 1
+    if SHA256_RE.fullmatch(stem) and is_original:
+        digest = stem
+        cache_control = CONTENT_ADDRESSED_CACHE_CONTROL
+    else:
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        cache_control = DEFAULT_CACHE_CONTROL
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return FileMeta(path, f'"{digest}"', size, media_type, cache_control)
+
+
+def parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """Parse a single ``bytes=start-end`` range into inclusive offsets.
+
+    Returns None when the header should be ignored (multi-range or
+    malformed; the full file is served) and raises 416 when unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start_s, end_s = match.groups()
+    if not start_s and not end_s:
+        return None
+    if not start_s:
+        # Suffix range: the last N bytes
+        length = int(end_s)
+        if length == 0:
+            raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        return max(size - length, 0), size - 1
+    start = int(start_s)
+    end = min(int(end_s), size - 1) if end_s else size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+class ColdFileResponse(Response):
+    """Stream a byte range of a file, using zero-copy sendfile when the
+    server advertises the ``http.response.zerocopysend`` extension."""
+
+    def __init__(self, path: str, start: int, length: int, status_code: int, headers: dict, media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.length = length
+        self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopysend", "file": f.fileno(),
+                            "offset": self.start, "count": self.length, "more_body": False})
+            return
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class UploadCache:
+    """Metadata and hot-content caches for uploaded images.
+
+    Uploads never change in place (they are content-addressed, and variants
+    are derived from them), so cached ETags and bytes are served without
+    touching the disk: a revalidation costs a dict lookup and a 304.
+    """
+
+    def __init__(self, max_bytes: int, max_file_bytes: int = HOT_FILE_MAX_BYTES):
+        self.max_file_bytes = max_file_bytes
+        self.meta = LRUCache(maxsize=16384)
+        self.content = LRUCache(maxsize=4096, max_weight=max_bytes, weigher=len)
+
+    async def get_meta(self, path: str) -> Optional[FileMeta]:
+        meta = self.meta.get(path)
+        if meta is None:
+            meta = await anyio.to_thread.run_sync(_load_meta, path)
+            if meta is not None:
+                self.meta.set(path, meta)
+        return meta
+
+    async def get_content(self, meta: FileMeta) -> Optional[bytes]:
+        """Bytes of a small file, reading it into the cache on a miss."""
+        if meta.size > self.max_file_bytes:
+            return None
+        content = self.content.get(meta.path)
+        if content is None:
+            async with await anyio.open_file(meta.path, "rb") as f:
+                content = await f.read()
+            self.content.set(meta.path, content)
+        return content
+
+    def invalidate(self, path: str) -> None:
+        self.meta.pop(path)
+        self.content.pop(path)
+
+
+async def upload_response(path: str, request_headers: Headers, cache: "UploadCache") -> Response:
+    """Build the response for an uploaded file with ETag, 304 and Range support."""
+    meta = await cache.get_meta(path)
+    if meta is None:
+        raise HTTPException(status_code=404)
+    headers = {
+        "ETag": meta.etag,
+        "Cache-Control": meta.cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or meta.etag in
+                          [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == meta.etag):
+        byte_range = parse_range(range_header, meta.size)
+    start, end = byte_range if byte_range else (0, meta.size - 1)
+    status_code = 206 if byte_range else 200
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{meta.size}"
+
+    content = await cache.get_content(meta)
+    if content is not None:
+        return Response(content[start:end + 1], status_code=status_code,
+                        headers=headers, media_type=meta.media_type)
+    return ColdFileResponse(meta.path, start, end - start + 1, status_code, headers, meta.media_type)
+
+
+def resolve_upload_path(relative: str) -> Optional[str]:
+    """Absolute path of an upload from its path below static/uploads, or None
+    when it escapes the uploads directory or points at internal files."""
+    parts = [part for part in relative.replace(os.sep, "/").split("/") if part]
+    if not parts or any(part.startswith(".") for part in parts):
+        return None
+    path = os.path.realpath(os.path.join(UPLOAD_DIR, *parts))
+    if not path.startswith(os.path.realpath(UPLOAD_DIR) + os.sep):
+        return None
+    return path
+
+
+class UploadStaticFiles(StaticFiles):
+    """Mount for /static/uploads serving through the upload caches."""
+
+    def __init__(self, *args, cache: UploadCache, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        full_path = resolve_upload_path(path)
+        if full_path is None:
+            raise HTTPException(status_code=404)
+        return await upload_response(full_path, Headers(scope=scope), self.cache)
+
+
+# Singleton instance
+_upload_cache: Optional[UploadCache] = None
+
+
+def get_upload_cache() -> UploadCache:
+    """Get or create upload cache singleton"""
+    global _upload_cache
+
+    if not _upload_cache:
+        _upload_cache = UploadCache(max_bytes=settings.upload_cache_bytes)
+
+    return _upload_cache
@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+import uuid
+import logging
+from collections import Counter
+from typing import Optional
+
+import anyio
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger(__name__)
+
+BASE_STATIC_SUBDIR = "uploads"
+
+# Resolve absolute path relative to this file: ../static/uploads
+STATIC_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "static"))
+UPLOAD_DIR = os.path.join(STATIC_ROOT, BASE_STATIC_SUBDIR)
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+MAX_FILE_SIZE_BYTES = 5 * 1024 * 1024  # 5MB
+CHUNK_SIZE = 64 * 1024
+TEMP_SUFFIX = ".part"
+SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+# Unreferenced uploads younger than this are kept (the pet may not be saved yet)
+UPLOAD_GC_GRACE_SECONDS = 24 * 60 * 60
+
+# Leading bytes -> canonical extension. WebP is RIFF....WEBP and checked separately.
+IMAGE_SIGNATURES: dict[bytes, str] = {
+    b"\xff\xd8\xff": ".jpg",
+    b"\x89PNG\r\n\x1a\n": ".png",
+    b"GIF87a": ".gif",
+    b"GIF89a": ".gif",
+}
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Return the canonical extension for an image's leading bytes, or None."""
+    for signature, ext in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def upload_url(user_id: int, filename: str) -> str:
+    """Public URL (relative to the static mount) of a stored upload."""
+    return f"static/{BASE_STATIC_SUBDIR}/{user_id}/{filename}"
+
+
+def upload_path(url: str) -> Optional[str]:
+    """Absolute path of an uploaded file given its URL, or None if it is not one."""
+    relative = (url or "").lstrip("/")
+    prefix = f"static/{BASE_STATIC_SUBDIR}/"
+    if not relative.startswith(prefix):
+        return None
+    path = os.path.normpath(os.path.join(UPLOAD_DIR, relative[len(prefix):]))
+    if not path.startswith(UPLOAD_DIR + os.sep):
+        return None
+    return path
+
+
+async def _remove_quietly(path: str) -> None:
+    try:
+        await anyio.Path(path).unlink()
+    except FileNotFoundError:
+        pass
+
+
+async def stream_to_temp(upload: UploadFile, dest_dir: str,
+                         max_bytes: int = MAX_FILE_SIZE_BYTES) -> tuple[str, str, int, str]:
+    """Copy an upload into a temp file in ``dest_dir`` chunk by chunk.
+
+    The image type is sniffed from the first chunk, the SHA-256 of the content
+    is computed on the way and the copy stops as soon as ``max_bytes`` is
+    crossed. Returns ``(temp_path, extension, size, sha256)``; the caller is
+    responsible for renaming or removing the temp file.
+    """
+    await anyio.Path(dest_dir).mkdir(parents=True, exist_ok=True)
+    temp_path = os.path.join(dest_dir, f".{uuid.uuid4().hex}{TEMP_SUFFIX}")
+    digest = hashlib.sha256()
+    size = 0
+    ext: Optional[str] = None
+    try:
+        async with await anyio.open_file(temp_path, "wb") as out:
+            while chunk := await upload.read(CHUNK_SIZE):
+                if ext is None:
+                    ext = sniff_image_type(chunk)
+                    if ext is None:
+                        raise HTTPException(status_code=400, detail="Unsupported image type")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=400, detail="File too large (max 5MB)")
+                digest.update(chunk)
+                await out.write(chunk)
+        if ext is None:
+            raise HTTPException(status_code=400, detail="Empty file")
+    except BaseException:
+        await _remove_quietly(temp_path)
+        raise
+    return temp_path, ext, size, digest.hexdigest()
+
+
+def _touch(path: str) -> bool:
+    """Reset a stored upload's mtime; False if it is gone.
+
+    Handing out the URL of an existing file restarts its garbage collection
+    grace period, so the sweep cannot delete it before the client saves the
+    pet that uses it.
+    """
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _find_upload(user_id: int, sha256: str) -> Optional[str]:
+    user_dir = os.path.join(UPLOAD_DIR, str(user_id))
+    for ext in set(IMAGE_SIGNATURES.values()) | {".webp"}:
+        if _touch(os.path.join(user_dir, f"{sha256}{ext}")):
+            return upload_url(user_id, f"{sha256}{ext}")
+    return None
+
+
+async def find_upload(user_id: int, sha256: str) -> Optional[str]:
+    """URL of the user's upload with this content hash, if it is stored."""
+    if not SHA256_RE.fullmatch(sha256 or ""):
+        return None
+    return await anyio.to_thread.run_sync(_find_upload, user_id, sha256)
+
+
+async def save_upload(upload: UploadFile, user_id: int) -> tuple[str, bool]:
+    """Stream an upload into the user's directory; returns ``(url, created)``.
+
+    Files are content-addressed (``<sha256><ext>``) so re-uploading the same
+    photo reuses the stored copy and ``created`` is False. New files only
+    appear under their final name once fully written (atomic rename), so
+    readers never observe partial images.
+    """
+    dest_dir = os.path.join(UPLOAD_DIR, str(user_id))
+    temp_path, ext, size, sha256 = await stream_to_temp(upload, dest_dir)
+    filename = f"{sha256}{ext}"
+    dest_file = os.path.join(dest_dir, filename)
+    if await anyio.to_thread.run_sync(_touch, dest_file):
+        await _remove_quietly(temp_path)
+        return upload_url(user_id, filename), False
+    await anyio.to_thread.run_sync(os.replace, temp_path, dest_file)
+    logger.debug("Stored upload %s (%d bytes) for user %s", filename, size, user_id)
+    return upload_url(user_id, filename), True
+
+
+async def reference_counts() -> Counter:
+    """Number of pet pictures pointing at each uploaded file."""
+    from models import PetPicture
+
+    counts: Counter = Counter()
+    for url in await PetPicture.all().values_list("url", flat=True):
+        if url and upload_path(url):
+            counts[url.lstrip("/")] += 1
+    return counts
+
+
+def _sweep(referenced: dict[str, set[str]], grace_seconds: float) -> list[str]:
+    """Delete unreferenced uploads (with their variants) older than the grace period."""
+    cutoff = time.time() - grace_seconds
+    removed: list[str] = []
+    for user_entry in os.scandir(UPLOAD_DIR):
+        # Dot directories (e.g. resumable upload sessions) manage their own expiry
+        if not user_entry.is_dir() or user_entry.name.startswith("."):
+            continue
+        for entry in os.scandir(user_entry.path):
+            if not entry.is_file():
+                continue
+            # Temp files are ".<id>.part"; originals, variants and manifests share
+            # the "<stem>." prefix of the original upload.
+            stem = entry.name.split(".", 1)[0] if not entry.name.startswith(".") else None
+            if stem and stem in referenced.get(user_entry.name, ()):
+                continue
+            try:
+                if entry.stat().st_mtime > cutoff:
+                    continue
+                os.remove(entry.path)
+                removed.append(entry.path)
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+async def collect_garbage(grace_seconds: float = UPLOAD_GC_GRACE_SECONDS) -> int:
+    """Remove uploads no pet references anymore; returns the number of files removed.
+
+    The grace period keeps fresh uploads whose pet has not been saved yet.
+    """
+    referenced: dict[str, set[str]] = {}
+    for url in await reference_counts():
+        user_id, filename = url.split("/")[-2:]
+        referenced.setdefault(user_id, set()).add(filename.split(".", 1)[0])
+    removed = await anyio.to_thread.run_sync(_sweep, referenced, grace_seconds)
+    if removed:
+        # Imported here: upload_serving and photo_match build on this module
+        from services.upload_serving import get_upload_cache
+        cache = get_upload_cache()
+        for path in removed:
+            cache.invalidate(path)
+        from services.image_pipeline import get_image_pipeline
+        from services.photo_match import get_photo_index
+        get_image_pipeline().forget_paths(removed)
+        await get_photo_index().forget_paths(removed)
+        logger.info("Upload garbage collection removed %d files", len(removed))
+    return len(removed)
+
+
+async def run_garbage_collector(interval_seconds: float) -> None:
+    """Background task: collect unreferenced uploads and abandoned resumable
+    sessions every ``interval_seconds``."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        # Separate steps: a failed collection must not keep sessions from expiring
+        try:
+            await collect_garbage()
+        except Exception:
+            logger.exception("Upload garbage collection failed")
+        try:
+            # Imported here: resumable_uploads builds on this module
+            from services.resumable_uploads import expire_sessions
+            await expire_sessions()
+        except Exception:
+            logger.exception("Resumable upload session expiry failed")
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from utils import auth
+
+
+def test_verified_tokens_are_cached(monkeypatch):
+    token = auth.create_access_token({"sub": '{"id": 42}'}, expires_delta=timedelta(minutes=5))
+    assert auth._token_user_id(token) == 42
+
+    def fail_decode(*args, **kwargs):
+        raise AssertionError("token should come from the cache")
+
+    monkeypatch.setattr(auth.jwt, "decode", fail_decode)
+    assert auth._token_user_id(token) == 42
+
+
+def test_invalidate_user_drops_cached_user():
+    auth._user_cache.set(7, object())
+    auth.invalidate_user(7)
+    assert auth._user_cache.get(7) is None
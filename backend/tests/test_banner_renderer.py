@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+from services.banner_renderer import BannerRenderer
+
+
+def _pet(name="Rex"):
+    owner = SimpleNamespace(id=7, first_name="Ana", last_name="Diaz",
+                            phone="555-0100", email="ana@example.com")
+    return SimpleNamespace(id=1, name=name, cover_picture="", owner=owner)
+
+
+def test_banner_formats_and_cache():
+    renderer = BannerRenderer()
+    png, media_type = renderer.render(_pet(), "small", "png")
+    assert media_type == "image/png" and png.startswith(b"\x89PNG")
+    webp, media_type = renderer.render(_pet(), "small", "webp")
+    assert media_type == "image/webp" and webp[8:12] == b"WEBP"
+    # Same content is served from cache; an edit produces a fresh render
+    assert renderer.render(_pet(), "small", "png")[0] is png
+    assert renderer.render(_pet("Max"), "small", "png")[0] is not png
+
+
+def test_banner_invalidation():
+    renderer = BannerRenderer()
+    png, _ = renderer.render(_pet(), "small", "jpeg")
+    renderer.invalidate_pet(1)
+    assert renderer.render(_pet(), "small", "jpeg")[0] is not png
@@ -0,0 +1,162 @@
+import asyncio
+import csv
+import io
+import json
+
+from tortoise import Tortoise
+
+from models import ChangeLog, Pet, PetPicture, User
+from services import bulk_io
+
+PETS_CSV = (
+    "name,pet_type,notes,pictures,status,breed\n"
+    'Rex,Dog,"Brown,\nfriendly",a.jpg|b.jpg,lost,\n'
+    "Mia,Cat,,,,Siamese\n"
+    "Bad,Dragon,n,,,\n"
+    ",Dog,n,,,\n"
+    "Ñandú,Bird,n,c.jpg,found,\n"
+).encode()
+
+
+async def _chunks(data: bytes, size: int = 7):
+    # Small chunks split rows, quoted fields and UTF-8 sequences
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def _run(scenario, monkeypatch):
+    monkeypatch.setattr(bulk_io, "IMPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(bulk_io, "get_lost_feed", lambda: type("Feed", (), {
+        "schedule_catch_up": lambda self: None})())
+
+    async def wrapper():
+        await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+        await Tortoise.generate_schemas()
+        try:
+            owner = await User.create(first_name="A", last_name="B", email="a@x.com",
+                                      phone="1", full_address="x", password="x")
+            return await scenario(owner)
+        finally:
+            await Tortoise.close_connections()
+
+    return asyncio.run(wrapper())
+
+
+def test_csv_import_validates_rows_and_inserts_in_batches(monkeypatch):
+    async def scenario(owner):
+        report = await bulk_io.import_pets(owner.id, _chunks(PETS_CSV), bulk_io.CSV)
+        pets = await Pet.filter(owner_id=owner.id).order_by("id").values(
+            "id", "name", "notes", "status", "breed")
+        pictures = await PetPicture.all().order_by("pet_id", "position").values_list("url", flat=True)
+        changes = await ChangeLog.filter(owner_id=owner.id).count()
+        return report, pets, pictures, changes
+
+    report, pets, pictures, changes = _run(scenario, monkeypatch)
+    assert report["created"] == 3 and report["failed"] == 2 and not report["truncated"]
+    assert [error["row"] for error in report["errors"]] == [3, 4]
+    assert report["errors"][0]["errors"][0].startswith("pet_type:")
+    assert report["errors"][1]["errors"] == ["name: Field required"]
+    assert [(p["name"], p["notes"], p["status"], p["breed"]) for p in pets] == [
+        ("Rex", "Brown,\nfriendly", "lost", None),
+        ("Mia", "", "at_home", "Siamese"),
+        ("Ñandú", "n", "found", None),
+    ]
+    # No picture column: Mia has no picture
+    assert pictures == ["a.jpg", "b.jpg", "c.jpg"]
+    assert changes == 3
+
+
+def test_export_round_trips_through_import(monkeypatch):
+    async def scenario(owner):
+        await bulk_io.import_pets(owner.id, _chunks(PETS_CSV), bulk_io.CSV)
+        exports = {}
+        for format in bulk_io.FORMATS:
+            exports[format] = b"".join([chunk async for chunk in bulk_io.export_pets(owner.id, format)])
+        copy = await User.create(first_name="C", last_name="D", email="c@x.com",
+                                 phone="1", full_address="x", password="x")
+        reports = [await bulk_io.import_pets(copy.id, _chunks(exports[format], 64), format)
+                   for format in bulk_io.FORMATS]
+        names = await Pet.filter(owner_id=copy.id).order_by("id").values_list("name", flat=True)
+        return exports, reports, names
+
+    exports, reports, names = _run(scenario, monkeypatch)
+    header, first = list(csv.reader(io.StringIO(exports[bulk_io.CSV].decode())))[:2]
+    assert header == bulk_io.PET_CSV_COLUMNS
+    assert first[header.index("picture")] == "a.jpg"
+    assert first[header.index("pictures")] == "a.jpg|b.jpg"
+    lines = exports[bulk_io.NDJSON].decode().splitlines()
+    assert json.loads(lines[0])["pictures"] == ["a.jpg", "b.jpg"] and len(lines) == 3
+    assert [report["created"] for report in reports] == [3, 3]
+    assert names == ["Rex", "Mia", "Ñandú"] * 2
+
+
+def test_ndjson_import_reports_unparseable_rows(monkeypatch):
+    data = (
+        b'{"name": "Rex", "pet_type": "Dog", "picture": "a.jpg", "notes": "n"}\n'
+        b"\n"
+        b"{not json\n"
+        b"[1, 2]\n"
+        b'{"name": "Mia", "pet_type": "Cat", "picture": "", "notes": "n", "pictures": '
+        + json.dumps([f"{i}.jpg" for i in range(6)]).encode() + b"}"
+    )
+
+    async def scenario(owner):
+        return await bulk_io.import_pets(owner.id, _chunks(data), bulk_io.NDJSON)
+
+    report = _run(scenario, monkeypatch)
+    assert report["created"] == 1 and report["failed"] == 3
+    assert [error["row"] for error in report["errors"]] == [2, 3, 4]
+    assert report["errors"][1]["errors"] == ["Expected a JSON object"]
+    assert "Maximum 5 pictures allowed" in report["errors"][2]["errors"][0]
+
+
+def test_user_import_rejects_taken_emails(monkeypatch):
+    data = (b"first_name,last_name,email,phone,full_address,password\n"
+            b"Ana,B,ana@x.com,1,x,secret\n"
+            b"Dup,B,a@x.com,1,x,secret\n"
+            b"Ana,C,ana@x.com,1,x,secret\n")
+
+    async def hash(password):
+        return f"hashed:{password}"
+
+    monkeypatch.setattr(bulk_io, "get_password_hasher", lambda: type("Hasher", (), {
+        "max_workers": 2, "hash": staticmethod(hash)})())
+
+    async def scenario(owner):
+        report = await bulk_io.import_users(_chunks(data), bulk_io.CSV)
+        return report, await User.filter(email="ana@x.com").values_list("password", flat=True)
+
+    report, passwords = _run(scenario, monkeypatch)
+    assert report["created"] == 1 and [error["row"] for error in report["errors"]] == [2, 3]
+    assert passwords == ["hashed:secret"]
+
+
+def test_user_import_falls_back_to_row_inserts_on_concurrent_email(monkeypatch):
+    data = (b"first_name,last_name,email,phone,full_address,password\n"
+            b"Ana,B,ana@x.com,1,x,one\n"
+            b"Bo,B,bo@x.com,1,x,two\n")
+    running, peak = 0, 0
+
+    async def hash(password):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if password == "two":
+            # Another request registers the email between the check and the insert
+            await User.create(first_name="C", last_name="D", email="bo@x.com",
+                              phone="1", full_address="x", password="x")
+        return f"hashed:{password}"
+
+    monkeypatch.setattr(bulk_io, "get_password_hasher", lambda: type("Hasher", (), {
+        "max_workers": 2, "hash": staticmethod(hash)})())
+
+    async def scenario(owner):
+        report = await bulk_io.import_users(_chunks(data), bulk_io.CSV)
+        return report, await User.filter(email="ana@x.com").values_list("password", flat=True)
+
+    report, passwords = _run(scenario, monkeypatch)
+    assert peak == 2
+    assert report["created"] == 1 and report["errors"][0]["row"] == 2
+    assert passwords == ["hashed:one"]
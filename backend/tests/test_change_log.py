@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from tortoise import Tortoise
+
+from models import ChangeLog, Pet, User
+from services import change_log
+
+
+def _run(scenario):
+    async def wrapper():
+        await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+        await Tortoise.generate_schemas()
+        try:
+            owner = await User.create(first_name="A", last_name="B", email="a@x.com",
+                                      phone="1", full_address="x", password="x")
+            return await scenario(owner)
+        finally:
+            await Tortoise.close_connections()
+
+    return asyncio.run(wrapper())
+
+
+async def _pet(owner, name):
+    pet = await Pet.create(owner=owner, name=name, pet_type="Dog", notes="n")
+    await change_log.record_change(owner.id, change_log.PET, pet.id)
+    return pet
+
+
+def test_changes_are_compacted_into_upserts_and_tombstones():
+    async def scenario(owner):
+        kept = await _pet(owner, "Rex")
+        token = (await change_log.snapshot(owner.id))["token"]
+        gone = await _pet(owner, "Tmp")
+        kept.name = "Rexy"
+        await kept.save()
+        await change_log.record_change(owner.id, change_log.PET, kept.id)
+        await gone.delete()
+        await change_log.record_change(owner.id, change_log.PET, gone.id, change_log.DELETE)
+        await change_log.record_change(owner.id, change_log.SCAN, kept.id, data={"pet_id": kept.id})
+        return kept.id, gone.id, await change_log.changes_since(
+            owner.id, change_log.decode_token(token))
+
+    kept_id, gone_id, result = _run(scenario)
+    assert [pet["name"] for pet in result["upserts"]["pets"]] == ["Rexy"]
+    assert result["deletes"]["pets"] == [gone_id]
+    assert result["upserts"]["scans"] == [{"pet_id": kept_id}]
+    assert result["has_more"] is False
+
+
+def test_batches_continue_with_has_more():
+    async def scenario(owner):
+        for name in ("a", "b", "c"):
+            await _pet(owner, name)
+        first = await change_log.changes_since(owner.id, change_log.SyncToken(0), limit=2)
+        second = await change_log.changes_since(
+            owner.id, change_log.decode_token(first["token"]), limit=2)
+        return first, second
+
+    first, second = _run(scenario)
+    assert first["has_more"] and len(first["upserts"]["pets"]) == 2
+    assert not second["has_more"] and [p["name"] for p in second["upserts"]["pets"]] == ["c"]
+
+
+def test_expired_and_invalid_tokens():
+    stale = base64.urlsafe_b64encode(json.dumps({"id": 1, "ts": 0}).encode()).decode()
+    with pytest.raises(HTTPException) as exc:
+        change_log.decode_token(stale)
+    assert exc.value.status_code == 410
+    with pytest.raises(HTTPException) as exc:
+        change_log.decode_token("???")
+    assert exc.value.status_code == 400
+
+
+def test_mid_sync_token_expires_with_its_pending_changes(monkeypatch):
+    async def scenario(owner):
+        for name in ("a", "b", "c"):
+            await _pet(owner, name)
+        # The first two changes are about to leave the retention window
+        old = datetime.now(timezone.utc) - timedelta(seconds=change_log.RETENTION_SECONDS - 60)
+        await ChangeLog.filter(id__lte=2).update(created_at=old)
+        partial = await change_log.changes_since(owner.id, change_log.SyncToken(0), limit=2)
+        caught_up = await change_log.changes_since(owner.id, change_log.SyncToken(0), limit=10)
+        return partial, caught_up
+
+    partial, caught_up = _run(scenario)
+    assert partial["has_more"]
+    # The client resumes after the pending changes could have been pruned
+    now = time.time() + 120
+    monkeypatch.setattr(change_log.time, "time", lambda: now)
+    with pytest.raises(HTTPException) as exc:
+        change_log.decode_token(partial["token"])
+    assert exc.value.status_code == 410
+    assert change_log.decode_token(caught_up["token"]).last_id == 3
+
+
+def test_change_committed_after_a_later_one_is_not_skipped():
+    async def scenario(owner):
+        await _pet(owner, "a")
+        token = (await change_log.snapshot(owner.id))["token"]
+        # Transactions A and B insert changes 2 and 3; B commits first and
+        # is synced before A commits (explicit ids stand in for the race)
+        b = await Pet.create(owner=owner, name="b", pet_type="Dog", notes="n")
+        await ChangeLog.create(id=3, owner_id=owner.id, entity=change_log.PET, entity_id=b.id,
+                               op=change_log.UPSERT)
+        first = await change_log.changes_since(owner.id, change_log.decode_token(token))
+        c = await Pet.create(owner=owner, name="c", pet_type="Dog", notes="n")
+        await ChangeLog.create(id=2, owner_id=owner.id, entity=change_log.PET, entity_id=c.id,
+                               op=change_log.UPSERT)
+        second = await change_log.changes_since(owner.id, change_log.decode_token(first["token"]))
+        third = await change_log.changes_since(owner.id, change_log.decode_token(second["token"]))
+        return first, second, third
+
+    first, second, third = _run(scenario)
+    assert [pet["name"] for pet in first["upserts"]["pets"]] == ["b"]
+    assert [pet["name"] for pet in second["upserts"]["pets"]] == ["c"]
+    assert third["upserts"]["pets"] == [] and not third["has_more"]
+    assert change_log.decode_token(third["token"]).seen == (1, 2, 3)
+
+
+def test_settle_window_is_capped(monkeypatch):
+    monkeypatch.setattr(change_log, "MAX_SETTLE_CHANGES", 2)
+
+    async def scenario(owner):
+        for name in ("a", "b", "c"):
+            await _pet(owner, name)
+        await ChangeLog.filter(id=1).update(
+            created_at=datetime.now(timezone.utc) - timedelta(seconds=10))
+        return change_log.decode_token((await change_log.snapshot(owner.id))["token"])
+
+    token = _run(scenario)
+    assert token.last_id == 3 and token.seen == (2, 3)
@@ -0,0 +1,120 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from tortoise import Tortoise
+from tortoise.exceptions import OperationalError
+from tortoise.transactions import in_transaction
+
+import database
+import migrations
+from database import read_connection, tortoise_config
+from middleware.read_your_writes import ReadYourWritesMiddleware
+from models import Pet, User
+
+
+def test_memory_database_gets_no_read_connections():
+    config = tortoise_config("sqlite://:memory:", read_connections=4)
+    assert list(config["connections"]) == ["default"] and config["routers"] == []
+    assert config["connections"]["default"]["credentials"]["synchronous"] == "NORMAL"
+    # Pragmas given in the URL win
+    config = tortoise_config("sqlite:///tmp/x.db?synchronous=FULL", read_connections=2)
+    assert list(config["connections"]) == ["default", "read0", "read1"]
+    assert config["connections"]["read1"]["credentials"]["synchronous"] == "FULL"
+    # Replicas replace the read pool
+    config = tortoise_config("sqlite:///tmp/x.db", 2, ["sqlite:///tmp/r.db"])
+    assert list(config["connections"]) == ["default", "replica0"]
+    assert config["connections"]["replica0"]["credentials"]["query_only"] == "ON"
+
+
+async def pick_reader():
+    return Pet.all()._choose_db().connection_name
+
+
+def test_reads_use_read_only_connections_outside_transactions(tmp_path):
+    async def scenario():
+        await Tortoise.init(config=tortoise_config(f"sqlite://{tmp_path}/petto.db", 2))
+        try:
+            await migrations.upgrade()
+            writer = Tortoise.get_connection("default")
+            pragmas = {name: (await writer.execute_query(f"PRAGMA {name}"))[1][0][0]
+                       for name in ("journal_mode", "synchronous", "busy_timeout")}
+            owner = await User.create(first_name="A", last_name="B", email="a@example.com",
+                                      phone="1", full_address="x", password="x")
+            # Requests (tasks) take readers round-robin and keep theirs
+            readers = set(await asyncio.gather(*(pick_reader() for _ in range(4))))
+            pinned = {Pet.all()._choose_db().connection_name for _ in range(2)}
+            raw = read_connection()
+            with pytest.raises(OperationalError):
+                await raw.execute_query('DELETE FROM "pet"')
+            async with in_transaction("default"):
+                pet = await Pet.create(owner=owner, name="Rex", pet_type="Dog", notes="n")
+                in_transaction_db = Pet.all()._choose_db().connection_name
+                seen_inside = await Pet.filter(id=pet.id).exists()
+            seen_after = await Pet.filter(id=pet.id).exists()
+            return pragmas, (readers, len(pinned)), raw.connection_name, in_transaction_db, seen_inside, seen_after
+        finally:
+            await Tortoise.close_connections()
+
+    pragmas, readers, raw, in_transaction_db, seen_inside, seen_after = asyncio.run(scenario())
+    assert pragmas == {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000}
+    assert readers == ({"read0", "read1"}, 1) and raw.startswith("read")
+    assert in_transaction_db == "default" and seen_inside and seen_after
+
+
+def test_replica_reads_with_read_your_writes(tmp_path):
+    # Two SQLite files stand in for a primary and a (never replicated) replica
+    primary, replica = f"sqlite://{tmp_path}/primary.db", f"sqlite://{tmp_path}/replica.db"
+
+    async def add_pet(request):
+        await Pet.create(owner_id=1, name=request.path_params["name"], pet_type="Dog", notes="n")
+        return JSONResponse(True)
+
+    async def has_pet(request):
+        return JSONResponse(await Pet.filter(name=request.path_params["name"]).exists())
+
+    def worker():
+        # Each app stands in for a separate worker process
+        app = Starlette(routes=[Route("/pets/{name}", add_pet, methods=["POST"]),
+                                Route("/pets/{name}", has_pet)])
+        return ReadYourWritesMiddleware(app, seconds=0.2)
+
+    async def scenario():
+        for url in (replica, primary):
+            await Tortoise.init(config=tortoise_config(url))
+            await migrations.upgrade()
+            await Tortoise.close_connections()
+        await Tortoise.init(config=tortoise_config(primary, 4, [replica]))
+        try:
+            owner = await User.create(first_name="A", last_name="B", email="a@example.com",
+                                      phone="1", full_address="x", password="x")
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(worker()),
+                                         base_url="http://test") as writer, \
+                    httpx.AsyncClient(transport=httpx.ASGITransport(worker()),
+                                      base_url="http://test") as other_worker, \
+                    httpx.AsyncClient(transport=httpx.ASGITransport(worker()),
+                                      base_url="http://test") as other_client:
+                wrote = await writer.post("/pets/Rex")
+                # The writer's next request, served by another worker
+                cookie = {"cookie": wrote.headers["set-cookie"].split(";")[0]}
+                results = {
+                    "cookie": cookie["cookie"].startswith(database.READ_PRIMARY_COOKIE),
+                    "writer": (await writer.get("/pets/Rex")).json(),
+                    "writer_other_worker": (
+                        await other_worker.get("/pets/Rex", headers=cookie)).json(),
+                    "other_client": (await other_client.get("/pets/Rex")).json(),
+                    "users_from_primary": await User.filter(id=owner.id).exists(),
+                }
+                await asyncio.sleep(0.3)
+                results["writer_after_window"] = (await writer.get("/pets/Rex")).json()
+            return results
+        finally:
+            await Tortoise.close_connections()
+
+    results = asyncio.run(scenario())
+    assert results == {"cookie": True, "writer": True, "writer_other_worker": True,
+                       "other_client": False, "users_from_primary": True,
+                       "writer_after_window": False}
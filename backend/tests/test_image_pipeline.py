@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from PIL import Image
+
+from services import image_pipeline, upload_storage
+from services.image_pipeline import ImagePipeline, VARIANTS, generate_variants, manifest_path
+
+
+def test_generate_variants_resizes_and_strips_exif(tmp_path):
+    source = tmp_path / "photo.jpg"
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"
+    Image.new("RGB", (3000, 2000), "red").save(source, "JPEG", exif=exif)
+
+    manifest = generate_variants(str(source))
+
+    assert set(manifest) == set(VARIANTS)
+    for name, entry in manifest.items():
+        assert max(entry["width"], entry["height"]) == VARIANTS[name]
+        with Image.open(tmp_path / entry["file"]) as variant:
+            assert variant.format == "WEBP"
+            assert not variant.getexif()
+    with open(manifest_path(str(source))) as f:
+        assert json.load(f) == manifest
+
+
+def test_variants_are_served_from_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_storage, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(image_pipeline, "UPLOAD_DIR", str(tmp_path))
+    (tmp_path / "1").mkdir()
+    for name in ("old", "new"):
+        Image.new("RGB", (400, 300), "blue").save(tmp_path / "1" / f"{name}.jpg", "JPEG")
+    generate_variants(str(tmp_path / "1" / "old.jpg"))
+
+    async def scenario():
+        pipeline = ImagePipeline()
+        assert await pipeline.load() == 1
+        assert pipeline.variants_for("static/uploads/1/old.jpg")["thumb"] == \
+            "static/uploads/1/old.thumb.webp"
+
+        # Another worker writes the variants: a miss answers without reading
+        # the manifest and picks them up off the event loop
+        generate_variants(str(tmp_path / "1" / "new.jpg"))
+        assert pipeline.variants_for("static/uploads/1/new.jpg") is None
+        await pipeline.drain()
+        assert set(pipeline.variants_for("static/uploads/1/new.jpg")) == set(VARIANTS)
+
+        pipeline.forget_paths([str(tmp_path / "1" / "old.jpg")])
+        assert list(pipeline._registry) == [str(tmp_path / "1" / "new")]
+        pipeline.shutdown()
+
+    asyncio.run(scenario())
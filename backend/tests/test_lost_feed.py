@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import httpx
+from fastapi import FastAPI
+
+from tortoise import Tortoise
+
+from models import Pet, PetStatus, User
+from routers import feed as feed_router
+from services import change_log
+from services.lost_feed import LostPetFeed
+
+
+def _run(scenario):
+    async def wrapper():
+        await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+        await Tortoise.generate_schemas()
+        try:
+            owner = await User.create(first_name="A", last_name="B", email="a@x.com",
+                                      phone="1", full_address="x", password="x")
+            return await scenario(owner)
+        finally:
+            await Tortoise.close_connections()
+
+    return asyncio.run(wrapper())
+
+
+async def _pet(owner, name, status=PetStatus.LOST):
+    pet = await Pet.create(owner=owner, name=name, pet_type="Dog", notes="n",
+                           status=status)
+    await change_log.record_change(owner.id, change_log.PET, pet.id)
+    return pet
+
+
+def _names(feed, limit=10, cursor=None):
+    body, next_cursor = feed.page(limit, cursor)
+    return [pet["name"] for pet in json.loads(body)], next_cursor
+
+
+def test_feed_follows_status_changes_sightings_and_deletes(tmp_path):
+    async def scenario(owner):
+        feed = LostPetFeed(str(tmp_path / "feed.json"))
+        first = await _pet(owner, "First")
+        await _pet(owner, "Home", PetStatus.AT_HOME)
+        await feed.rebuild()
+        steps = {"built": _names(feed)}
+
+        second = await _pet(owner, "Second")
+        third = await _pet(owner, "Third")
+        await feed.catch_up()
+        steps["created"] = _names(feed)
+        steps["page1"] = _names(feed, 2)
+        steps["page2"] = _names(feed, 2, steps["page1"][1])
+
+        # A sighting makes a pet the most recently active; its client-sent
+        # time is clamped to when it was recorded and its location cleaned up
+        await change_log.record_change(owner.id, change_log.SCAN, first.id, data={
+            "pet_id": first.id, "user_id": 9, "scan_location": " Park\n\x00gate " + "x" * 200,
+            "scan_time": "2999-01-01T00:00:00+00:00"})
+        await Pet.filter(id=second.id).update(status=PetStatus.FOUND)
+        await change_log.record_change(owner.id, change_log.PET, second.id)
+        await third.delete()
+        await change_log.record_change(owner.id, change_log.PET, third.id, change_log.DELETE)
+        await feed.catch_up()
+        steps["changed"] = _names(feed)
+        steps["sighting"] = json.loads(feed.page(1)[0])[0]["last_sighting"]
+
+        # Restart: the snapshot plus the changes recorded after it
+        assert await feed.save()
+        await _pet(owner, "Fourth")
+        restored = LostPetFeed(feed.snapshot_path)
+        await restored.start()
+        steps["restored"] = _names(restored)
+        return steps
+
+    steps = _run(scenario)
+    assert steps["built"] == (["First"], None)
+    assert steps["created"][0] == ["Third", "Second", "First"]
+    assert steps["page1"][0] == ["Third", "Second"] and steps["page1"][1]
+    assert steps["page2"] == (["First"], None)
+    assert steps["changed"] == (["First"], None)
+    assert steps["sighting"]["location"] == ("Park gate " + "x" * 200)[:100]
+    assert steps["sighting"]["seen_at"] < "2999"
+    # A later change outranks the (clamped) sighting
+    assert steps["restored"][0] == ["Fourth", "First"]
+
+
+def test_snapshot_from_another_database_is_rebuilt(tmp_path):
+    path = tmp_path / "feed.json"
+    path.write_text(json.dumps({"format": 1, "saved_at": 4102444800, "last_change_id": 50,
+                                "rows": [], "sightings": {}}))
+
+    async def scenario(owner):
+        feed = LostPetFeed(str(path))
+        assert not await feed.load()
+        await _pet(owner, "Only")
+        await feed.start()
+        return _names(feed)
+
+    assert _run(scenario) == (["Only"], None)
+
+
+def test_workers_with_the_same_page_send_the_same_etag(tmp_path, monkeypatch):
+    async def etag(feed):
+        monkeypatch.setattr(feed_router, "get_lost_feed", lambda: feed)
+        app = FastAPI()
+        app.include_router(feed_router.router)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app),
+                                     base_url="http://test") as client:
+            return (await client.get("/api/feed/lost")).headers["etag"]
+
+    async def scenario(owner):
+        await _pet(owner, "Rex")
+        first = LostPetFeed(str(tmp_path / "first.json"))
+        await first.start()
+        # A change that does not touch the feed, seen by the second worker only
+        await _pet(owner, "Home", status=PetStatus.AT_HOME)
+        second = LostPetFeed(str(tmp_path / "second.json"))
+        await second.start()
+        assert first.last_change_id != second.last_change_id
+        return await etag(first), await etag(second)
+
+    first, second = _run(scenario)
+    assert first == second
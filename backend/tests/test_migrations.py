@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from tortoise import Tortoise
+
+import migrations
+from models import Pet, User
+from services.pet_search import SQLiteSearchBackend
+
+
+def _run(scenario):
+    async def wrapper():
+        await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+        try:
+            return await scenario(Tortoise.get_connection("default"))
+        finally:
+            await Tortoise.close_connections()
+
+    return asyncio.run(wrapper())
+
+
+async def _schema(connection):
+    rows = await connection.execute_query_dict(
+        "SELECT type, name, tbl_name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'")
+    tables = {row["name"] for row in rows if row["type"] == "table"}
+    columns = {table: await migrations.table_columns(connection, table) for table in tables}
+    indexes = {row["name"] for row in rows if row["type"] == "index"}
+    return columns, indexes
+
+
+def test_fresh_database_matches_models_and_check_passes():
+    async def from_models(connection):
+        await Tortoise.generate_schemas()
+        return await _schema(connection)
+
+    async def scenario(connection):
+        with pytest.raises(migrations.SchemaVersionError):
+            await migrations.check_schema_version()
+        applied = await migrations.upgrade()
+        assert await migrations.upgrade() == []
+        version = await migrations.check_schema_version()
+        return [m.version for m in applied], version, await _schema(connection)
+
+    applied, version, (columns, indexes) = _run(scenario)
+    assert applied == [m.version for m in migrations.discover()] and version == applied[-1]
+    assert columns.pop(migrations.VERSION_TABLE) >= {"version", "name"}
+    # The search index (FTS5 table and its shadow tables) is not a model
+    search_tables = {table for table in columns if table.startswith("pet_fts")}
+    assert "pet_fts" in search_tables
+    columns = {table: names for table, names in columns.items() if table not in search_tables}
+    model_columns, model_indexes = _run(from_models)
+    assert columns == model_columns and model_indexes <= indexes
+    assert {"idx_pet_owner_status", "idx_location_pet_timestamp"} <= indexes
+
+
+def test_upgrade_to_target_then_rest():
+    async def scenario(connection):
+        baseline = await migrations.upgrade(target=1)
+        pet_columns = await migrations.table_columns(connection, "pet")
+        second = await migrations.upgrade(target=2)
+        left = await migrations.pending()
+        rest = await migrations.upgrade()
+        return (pet_columns, [m.version for m in baseline + second],
+                [m.version for m in left], [m.version for m in rest])
+
+    pet_columns, first, left, rest = _run(scenario)
+    # 0001 is the frozen baseline: pictures still in pet columns, no updated_at
+    assert "picture5" in pet_columns and "updated_at" not in pet_columns
+    assert first == [1, 2] and left == rest and rest[0] == 3
+
+
+def test_database_from_before_migrations_is_upgraded():
+    async def scenario(connection):
+        # Shape of a database created by generate_schemas before PetPicture and updated_at
+        await Tortoise.generate_schemas()
+        await connection.execute_script('DROP TABLE "petpicture"; '
+                                        'ALTER TABLE "pet" DROP COLUMN "updated_at"')
+        for column in ("picture", "picture2", "picture3", "picture4", "picture5"):
+            await connection.execute_script(
+                f'ALTER TABLE "pet" ADD COLUMN "{column}" VARCHAR(1024) NULL')
+        owner = await User.create(first_name="A", last_name="B", email="a@example.com",
+                                  phone="1", full_address="x", password="x")
+        await connection.execute_query(
+            'INSERT INTO "pet" ("owner_id", "name", "pet_type", "notes", "status", '
+            '"picture", "picture2", "picture4") VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [owner.id, "Rex", "Dog", "brown", "lost", "a.jpg", "", "b.jpg"])
+        await migrations.upgrade()
+        await migrations.check_schema_version()
+        pet = await Pet.get(name="Rex").prefetch_related("pictures")
+        found = await SQLiteSearchBackend().search("brown", "lost", None, 10, 0)
+        return (await _schema(connection))[0]["pet"], pet.picture_urls(), found == [pet.id]
+
+    columns, urls, searchable = _run(scenario)
+    assert "updated_at" in columns and "picture" not in columns
+    assert urls == ["a.jpg", "b.jpg"]
+    assert searchable
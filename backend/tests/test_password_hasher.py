@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from services.password_hasher import PasswordHasher, build_password_context
+
+
+def test_hash_and_verify_run_off_loop():
+    hasher = PasswordHasher(build_password_context(4), max_workers=1)
+
+    async def scenario():
+        hashed = await hasher.hash("secret")
+        assert await hasher.verify_and_update("secret", hashed) == (True, None)
+        assert (await hasher.verify_and_update("wrong", hashed))[0] is False
+
+    asyncio.run(scenario())
+    stats = hasher.stats()
+    assert stats["completed"] == 3
+    assert stats["pending"] == 0
+    hasher.shutdown()
+
+
+def test_changed_cost_is_rehashed_on_verify():
+    old_hash = build_password_context(4).hash("secret")
+    hasher = PasswordHasher(build_password_context(5), max_workers=1)
+
+    valid, new_hash = asyncio.run(hasher.verify_and_update("secret", old_hash))
+    assert valid
+    assert new_hash is not None and new_hash.startswith("$2b$05$")
+    hasher.shutdown()
+
+
+def test_full_queue_is_rejected():
+    hasher = PasswordHasher(build_password_context(4), max_workers=1, max_pending=1)
+
+    async def scenario():
+        first = asyncio.ensure_future(hasher.hash("one"))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as exc:
+            await hasher.hash("two")
+        assert exc.value.status_code == 503
+        await first
+
+    asyncio.run(scenario())
+    assert hasher.stats()["rejected"] == 1
+    hasher.shutdown()
+
+
+def test_hashing_stats_are_not_public(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    client = TestClient(main.app)
+    assert client.get("/_health").json() == {"status": "ok"}
+    assert client.get("/_metrics").status_code == 404
+    monkeypatch.setattr(main.settings, "metrics_token", "secret")
+    assert client.get("/_metrics", headers={"Authorization": "Bearer wrong"}).status_code == 404
+    response = client.get("/_metrics", headers={"Authorization": "Bearer secret"})
+    assert {"workers", "pending", "rejected"} <= set(response.json()["password_hashing"])
@@ -0,0 +1,46 @@
+import asyncio
+
+from PIL import Image
+from tortoise import Tortoise
+
+from models import Pet, PetPicture, User
+from services import pet_pictures
+from services.pet_pictures import attach_pictures, pets_with_picture, set_pictures
+
+
+def _run(scenario):
+    async def wrapper():
+        await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+        await Tortoise.generate_schemas()
+        try:
+            owner = await User.create(first_name="A", last_name="B", email="a@example.com",
+                                      phone="1", full_address="x", password="x")
+            return await scenario(owner)
+        finally:
+            await Tortoise.close_connections()
+
+    return asyncio.run(wrapper())
+
+
+def test_set_and_attach_pictures_keep_order_and_sizes(tmp_path, monkeypatch):
+    url = "static/uploads/1/a.png"
+    Image.new("RGB", (40, 30)).save(tmp_path / "a.png")
+    monkeypatch.setattr(pet_pictures, "upload_path",
+                        lambda value: str(tmp_path / "a.png") if value == url else None)
+
+    async def scenario(owner):
+        first = await Pet.create(owner=owner, name="Rex", pet_type="Dog", notes="n")
+        second = await Pet.create(owner=owner, name="Max", pet_type="Dog", notes="n")
+        await set_pictures(first.id, [url, "https://example.com/b.jpg", ""])
+        await set_pictures(second.id, ["https://example.com/c.jpg"])
+        await set_pictures(second.id, ["https://example.com/d.jpg", url])
+        rows = await attach_pictures([{"id": first.id}, {"id": second.id}, {"id": 999}])
+        upload = await PetPicture.get(pet_id=first.id, position=0)
+        return rows, (upload.width, upload.height), sorted(await pets_with_picture(f"/{url}"))
+
+    rows, size, sharing = _run(scenario)
+    assert [row["pictures"] for row in rows] == [
+        [url, "https://example.com/b.jpg"], ["https://example.com/d.jpg", url], []]
+    assert size == (40, 30)
+    assert sharing == [rows[0]["id"], rows[1]["id"]]
+
@@ -0,0 +1,67 @@
+import asyncio
+
+from tortoise import Tortoise
+
+import migrations
+from models import Pet, PetStatus, PetType, User
+from services.pet_search import SQLiteSearchBackend, query_terms
+
+
+def _run(scenario):
+    async def wrapper():
+        await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+        await Tortoise.generate_schemas()
+        try:
+            owner = await User.create(first_name="A", last_name="B", email="a@x.com",
+                                      phone="1", full_address="x", password="x")
+            return await scenario(owner)
+        finally:
+            await Tortoise.close_connections()
+
+    return asyncio.run(wrapper())
+
+
+async def _pet(owner, name, notes, pet_type=PetType.DOG, status=PetStatus.LOST, **extra):
+    return await Pet.create(owner=owner, name=name, pet_type=pet_type,
+                            notes=notes, status=status, **extra)
+
+
+def test_query_terms_drop_operators():
+    assert query_terms('Brown "collar" OR -NEAR(x)*') == ["brown", "collar", "or", "near", "x"]
+
+
+def test_search_ranks_filters_and_follows_writes():
+    async def scenario(owner):
+        # Pets created before the index exists are picked up by its migration
+        early = await _pet(owner, "Rex", "brown dog", breed="Labrador")
+        await migrations.upgrade()
+        pet_search = next(m for m in migrations.discover() if m.name == "pet_search")
+        await pet_search.upgrade(Tortoise.get_connection("default"))  # idempotent
+        backend = SQLiteSearchBackend()
+        named = await _pet(owner, "Brownie", "friendly")
+        noted = await _pet(owner, "Max", "small brown spot", distinctive1="Red collar")
+        await _pet(owner, "Tom", "brown cat", pet_type=PetType.CAT)
+        await _pet(owner, "Home", "brown", status=PetStatus.AT_HOME)
+
+        results = {}
+        results["labrador"] = await backend.search("labr", "lost", None, 10, 0)
+        results["brown_dogs"] = await backend.search("brown", "lost", "Dog", 10, 0)
+        results["collar"] = await backend.search("brown collar", "lost", None, 10, 0)
+        results["page"] = await backend.search("brown", "lost", "Dog", 1, 1)
+
+        noted.notes = "white"
+        noted.distinctive1 = None
+        await noted.save()
+        await early.delete()
+        results["after_writes"] = await backend.search("brown", "lost", None, 10, 0)
+        return early.id, named.id, noted.id, results
+
+    early, named, noted, results = _run(scenario)
+    assert results["labrador"] == [early]
+    # Matches on the name outrank matches in the notes
+    assert results["brown_dogs"][0] == named
+    assert set(results["brown_dogs"]) == {early, named, noted}
+    assert results["collar"] == [noted]
+    assert results["page"] == results["brown_dogs"][1:2]
+    assert named in results["after_writes"]
+    assert early not in results["after_writes"] and noted not in results["after_writes"]
@@ -0,0 +1,34 @@
+import json
+from types import SimpleNamespace
+
+from models import PetStatus, PetType
+from schemas.pets import PET_OUT_COLUMNS, serialize_pet, serialize_pet_rows_json
+from utils.responses import FastJSONResponse
+
+
+def _row(**overrides):
+    row = {col: None for col in PET_OUT_COLUMNS}
+    row.update(id=1, owner_id=2, name="Rex", pet_type=PetType.DOG, notes="brown",
+               status=PetStatus.LOST,
+               pictures=["https://example.com/a.jpg", "https://example.com/b.jpg"])
+    row.update(overrides)
+    return row
+
+
+def _pet(row):
+    return SimpleNamespace(**row, picture_urls=lambda: row["pictures"])
+
+
+def test_rows_json_matches_instance_serializer():
+    row = _row()
+    expected = serialize_pet(_pet(row)).model_dump(mode="json")
+    encoded = json.loads(serialize_pet_rows_json([row]))
+    assert encoded == [expected]
+    assert encoded[0]["pictures"] == ["https://example.com/a.jpg", "https://example.com/b.jpg"]
+    assert encoded[0]["picture"] == "https://example.com/a.jpg"
+
+
+def test_fast_json_response_encodes_models():
+    pet = serialize_pet(_pet(_row()))
+    body = json.loads(FastJSONResponse({"pet": pet}).body)
+    assert body["pet"]["pet_type"] == "Dog"
@@ -0,0 +1,13 @@
+from starlette.datastructures import Headers
+
+from utils.http_cache import etag_matches, weak_etag
+
+
+def test_weak_etag_comparison():
+    etag = weak_etag("pet", 1, "2025-01-01T00:00:00")
+    assert etag.startswith('W/"')
+    assert etag_matches(Headers({"if-none-match": etag}), etag)
+    assert etag_matches(Headers({"if-none-match": f'"x", {etag.removeprefix("W/")}'}), etag)
+    assert not etag_matches(Headers({"if-none-match": weak_etag("pet", 2)}), etag)
+    assert not etag_matches(Headers({}), etag)
+
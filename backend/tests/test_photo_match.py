@@ -0,0 +1,79 @@
+import asyncio
+import io
+import random
+
+from PIL import Image
+from tortoise import Tortoise
+
+from models import PhotoHash
+from services.photo_match import MultiIndexHash, PhotoIndex, dhash, dhash_bytes, hamming
+
+
+def _pattern(seed: int, size=(640, 480)) -> Image.Image:
+    rng = random.Random(seed)
+    image = Image.new("L", (16, 12))
+    image.putdata([rng.randrange(256) for _ in range(16 * 12)])
+    return image.resize(size, Image.Resampling.BICUBIC).convert("RGB")
+
+
+def _jpeg(image: Image.Image, quality: int) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def test_dhash_survives_resizing_and_recompression():
+    original = dhash(_pattern(1))
+    assert hamming(original, dhash_bytes(_jpeg(_pattern(1, (200, 150)), 40))) <= 4
+    assert hamming(original, dhash(_pattern(2))) > 12
+
+
+def test_search_matches_brute_force():
+    rng = random.Random(7)
+    hashes = [rng.getrandbits(64) for _ in range(2000)]
+    # Near duplicates so every radius has hits
+    hashes += [value ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for value in hashes[:200]]
+    index = MultiIndexHash()
+    for member, value in enumerate(hashes):
+        index.add(value, member)
+    for query in hashes[:50]:
+        for radius in (0, 3, 7, 12):
+            expected = sorted((hamming(query, value), member) for member, value in enumerate(hashes)
+                              if hamming(query, value) <= radius)
+            assert sorted(index.search(query, radius)) == expected
+
+
+def test_shared_hashes_and_discard():
+    index = MultiIndexHash()
+    index.add(0xFF, "a")
+    index.add(0xFF, "b")
+    index.add(0xFE, "c")
+    assert sorted(index.search(0xFF, 1)) == [(0, "a"), (0, "b"), (1, "c")]
+    index.discard(0xFF, "a")
+    index.discard(0xFE, "c")
+    index.discard(0x01, "missing")
+    assert index.search(0xFF, 1) == [(0, "b")]
+    assert len(index) == 1
+
+
+def test_refresh_picks_up_hashes_stored_by_other_workers():
+    async def scenario():
+        await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+        await Tortoise.generate_schemas()
+        try:
+            await PhotoHash.create(id=1, picture="static/uploads/1/a.jpg", dhash=f"{0xFF:016x}")
+            worker = PhotoIndex()
+            loaded = await worker.load()
+            # Stored by another worker; id 2 commits after id 3
+            await PhotoHash.create(id=3, picture="static/uploads/1/c.jpg", dhash=f"{0xF0:016x}")
+            await worker.refresh()
+            await PhotoHash.create(id=2, picture="static/uploads/1/b.jpg", dhash=f"{0xFE:016x}")
+            await worker.refresh()
+            return loaded, worker.similar_pictures(0xFF, 4)
+        finally:
+            await Tortoise.close_connections()
+
+    loaded, similar = asyncio.run(scenario())
+    assert loaded == 1
+    assert similar == {"static/uploads/1/a.jpg": 0, "static/uploads/1/b.jpg": 1,
+                       "static/uploads/1/c.jpg": 4}
@@ -0,0 +1,106 @@
+"""Maximum number of database queries per endpoint.
+
+Every statement Tortoise sends is logged on ``tortoise.db_client``; each
+request below runs with a cold user cache, so the budgets include the
+authentication lookup. Lower a budget when an endpoint gets cheaper; a
+change that needs more queries has to raise it deliberately.
+"""
+import asyncio
+import logging
+from contextlib import contextmanager
+from datetime import timedelta
+
+import httpx
+from fastapi import FastAPI
+from tortoise import Tortoise
+
+from models import User
+from routers import flyers, pet_location, pets, qrcode, sync, users
+from utils import auth
+from utils.responses import FastJSONResponse
+
+PET = {"name": "Rex", "pet_type": "Dog", "notes": "Brown", "status": "lost", "picture": "",
+       "pictures": ["https://example.com/rex1.jpg", "https://example.com/rex2.jpg"]}
+
+# (method, path, json body) -> maximum queries; {pet_id} is the seeded pet
+QUERY_BUDGETS = [
+    (("POST", "/api/pets/", PET), 4),
+    (("GET", "/api/pets/", None), 4),
+    (("GET", "/api/pets/{pet_id}", None), 3),
+    (("PUT", "/api/pets/{pet_id}", {"notes": "Still brown"}), 5),
+    (("PUT", "/api/pets/{pet_id}", {"picture": "https://example.com/rex3.jpg"}), 7),
+    (("GET", "/api/pet-location/pet/{pet_id}/qr-link", None), 2),
+    (("GET", "/api/qrcode/{pet_id}", None), 2),
+    (("GET", "/api/flyers/{pet_id}", None), 3),
+    (("GET", "/api/users/me", None), 1),
+    # One more for the token's settle window (late-committing changes)
+    (("GET", "/api/sync", None), 6),
+    (("DELETE", "/api/pets/{pet_id}", None), 3),
+]
+
+
+class _QueryCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.queries = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = record.getMessage()
+        if not message.startswith(("Created connection", "Closed connection")):
+            self.queries.append(message)
+
+
+@contextmanager
+def count_queries():
+    """Collect the statements sent to the database inside the block."""
+    logger = logging.getLogger("tortoise.db_client")
+    counter, level = _QueryCounter(), logger.level
+    logger.addHandler(counter)
+    logger.setLevel(logging.DEBUG)
+    try:
+        yield counter.queries
+    finally:
+        logger.removeHandler(counter)
+        logger.setLevel(level)
+
+
+def _app() -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    for module in (users, pets, qrcode, pet_location, flyers, sync):
+        app.include_router(module.router)
+    return app
+
+
+def test_endpoints_stay_within_query_budget(monkeypatch):
+    # Background catch-ups would run their own queries during the requests
+    monkeypatch.setattr(pets, "get_lost_feed", lambda: type("Feed", (), {
+        "schedule_catch_up": lambda self: None})())
+    monkeypatch.setattr(qrcode, "get_lost_feed", pets.get_lost_feed)
+
+    async def scenario():
+        await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+        await Tortoise.generate_schemas()
+        try:
+            owner = await User.create(first_name="A", last_name="B", email="a@x.com", phone="1",
+                                      full_address="x", password="x", recovery_bounty=50)
+            token = auth.create_access_token({"sub": str(owner.id)}, timedelta(minutes=5))
+            transport = httpx.ASGITransport(app=_app())
+            async with httpx.AsyncClient(transport=transport, base_url="http://test",
+                                         headers={"Authorization": f"Bearer {token}"}) as client:
+                pet_id = (await client.post("/api/pets/", json=PET)).json()["id"]
+                results = []
+                for (method, path, body), budget in QUERY_BUDGETS:
+                    auth.invalidate_user(owner.id)
+                    with count_queries() as queries:
+                        response = await client.request(
+                            method, path.format(pet_id=pet_id), json=body)
+                    assert response.status_code == 200, (path, response.text)
+                    results.append((f"{method} {path}", len(queries), budget, queries))
+                return results
+        finally:
+            await Tortoise.close_connections()
+
+    over = [(endpoint, count, budget, queries)
+            for endpoint, count, budget, queries in asyncio.run(scenario()) if count > budget]
+    assert not over, "\n".join(f"{endpoint}: {count} queries (budget {budget})\n  " + "\n  ".join(q)
+                               for endpoint, count, budget, q in over)
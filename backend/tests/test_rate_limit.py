@@ -0,0 +1,111 @@
+import asyncio
+
+from middleware.rate_limit import (
+    MemoryRateLimitStore,
+    RateLimiter,
+    RedisRateLimitStore,
+    parse_rate,
+    rule_for,
+)
+
+
+class RespStandIn:
+    """Minimal Redis-compatible server: enough RESP for the shared store."""
+
+    def __init__(self):
+        self.data = {}
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"redis://{host}:{port}/0"
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                args = []
+                for _ in range(int(line[1:])):
+                    size = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(size + 2))[:-2].decode())
+                writer.write(self._execute(args[0].upper(), args[1:]))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _execute(self, command, args):
+        if command in ("INCRBY", "DECRBY"):
+            amount = int(args[1]) if command == "INCRBY" else -int(args[1])
+            value = int(self.data.get(args[0], 0)) + amount
+            self.data[args[0]] = str(value)
+            return f":{value}\r\n".encode()
+        if command == "GET":
+            value = self.data.get(args[0])
+            return b"$-1\r\n" if value is None else f"${len(value)}\r\n{value}\r\n".encode()
+        if command == "EXPIRE":
+            return b":1\r\n"
+        return b"+OK\r\n"
+
+
+def test_parse_rate_and_route_table():
+    assert parse_rate("5/minute") == (5, 60)
+    assert rule_for("POST", "/api/login") == ("auth.login", "5/minute")
+    assert rule_for("POST", "/api/login/OAuth2") == ("auth.login", "5/minute")
+    assert rule_for("GET", "/api/qrcode/7") == ("api.qrcode", "30/minute")
+    assert rule_for("GET", "/api/pets/") == ("api.default", "100/minute")
+    assert rule_for("GET", "/static/app.css") is None
+
+
+def test_memory_store_gcra():
+    store = MemoryRateLimitStore(shards=2)
+    for _ in range(3):
+        assert store.hit("k", 3, 60, now=100.0).allowed
+    blocked = store.hit("k", 3, 60, now=100.0)
+    assert not blocked.allowed
+    assert blocked.retry_after == 20.0
+    # One request is replenished every period / limit seconds
+    assert store.hit("k", 3, 60, now=120.0).allowed
+    assert not store.hit("k", 3, 60, now=120.0).allowed
+
+
+def test_memory_store_is_bounded():
+    store = MemoryRateLimitStore(shards=1, max_keys=10)
+    for i in range(50):
+        store.hit(f"client-{i}", 5, 60, now=0.0)
+    assert len(store) == 10
+
+
+def test_shared_store_against_stand_in():
+    async def scenario():
+        stand_in = RespStandIn()
+        url = await stand_in.start()
+        store = RedisRateLimitStore(url, timeout=1)
+        try:
+            results = [await store.hit("login:1.2.3.4", 2, 60) for _ in range(3)]
+            assert [r.allowed for r in results] == [True, True, False]
+            assert results[-1].retry_after > 0
+            # Rejected requests are given back
+            assert sorted(stand_in.data.values()) == ["2"]
+        finally:
+            await store.close()
+            await stand_in.stop()
+
+    asyncio.run(scenario())
+
+
+def test_unreachable_backend_falls_back_to_memory():
+    async def scenario():
+        shared = RedisRateLimitStore("redis://127.0.0.1:1/0", timeout=0.2)
+        limiter = RateLimiter(shared=shared)
+        assert (await limiter.hit("k", "1/minute")).allowed
+        assert not (await limiter.hit("k", "1/minute")).allowed
+        await shared.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import os
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import upload
+from services import resumable_uploads
+from services.upload_storage import upload_url
+from utils.auth import get_current_user
+
+PAYLOAD = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+SHA256 = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(resumable_uploads, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(resumable_uploads, "SESSIONS_DIR", str(tmp_path / ".resumable"))
+    backfilled = []
+    monkeypatch.setattr(resumable_uploads, "get_image_pipeline",
+                        lambda: SimpleNamespace(backfill=backfilled.append))
+    app = FastAPI()
+    app.include_router(upload.router)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+    client = TestClient(app)
+    client.backfilled = backfilled
+    return client
+
+
+def _start(client, **body):
+    response = client.post("/api/upload/resumable", json={"length": len(PAYLOAD), **body})
+    assert response.status_code == 201
+    return response.headers["Location"]
+
+
+def _patch(client, location, offset, chunk):
+    return client.patch(location, content=chunk, headers={"Upload-Offset": str(offset)})
+
+
+def test_offset_can_be_queried_with_head_and_get(client):
+    location = _start(client)
+    assert _patch(client, location, 0, PAYLOAD[:100]).json()["offset"] == 100
+
+    head = client.head(location)
+    got = client.get(location)
+    assert head.status_code == 200 and head.headers["Upload-Offset"] == "100"
+    assert head.headers["Upload-Length"] == str(len(PAYLOAD))
+    assert got.json()["offset"] == 100 and got.json()["url"] is None
+
+
+def test_offset_past_stored_data_is_a_conflict(client):
+    location = _start(client)
+    _patch(client, location, 0, PAYLOAD[:100])
+
+    response = _patch(client, location, 150, PAYLOAD[150:200])
+    assert response.status_code == 409
+    assert client.head(location).headers["Upload-Offset"] == "100"
+
+
+def test_resent_chunk_does_not_duplicate_bytes(client, tmp_path):
+    location = _start(client)
+    _patch(client, location, 0, PAYLOAD[:100])
+    # The response to this chunk was lost; the client resends an overlapping range
+    _patch(client, location, 50, PAYLOAD[50:200])
+    resent = _patch(client, location, 50, PAYLOAD[50:200])
+
+    assert resent.status_code == 200 and resent.json()["offset"] == 200
+    session_id = location.rsplit("/", 1)[1]
+    with open(tmp_path / ".resumable" / f"{session_id}.part", "rb") as f:
+        assert f.read() == PAYLOAD[:200]
+
+
+def test_chunk_past_declared_length_is_rejected(client):
+    location = _start(client)
+    response = _patch(client, location, 0, PAYLOAD + b"extra")
+    assert response.status_code == 400
+    assert "exceeds declared upload length" in response.json()["detail"]
+
+
+def test_checksum_mismatch_discards_the_upload(client):
+    location = _start(client, sha256="0" * 64)
+    response = _patch(client, location, 0, PAYLOAD)
+    assert response.status_code == 400 and response.json()["detail"] == "Checksum mismatch"
+    assert client.head(location).status_code == 404
+    assert client.backfilled == []
+
+
+def test_completion_returns_content_addressed_url_until_expiry(client, tmp_path, monkeypatch):
+    location = _start(client, sha256=SHA256)
+    _patch(client, location, 0, PAYLOAD[:500])
+    done = _patch(client, location, 500, PAYLOAD[500:])
+
+    url = upload_url(1, f"{SHA256}.png")
+    assert done.status_code == 200 and done.json()["url"] == url
+    assert done.json()["offset"] == len(PAYLOAD)
+    with open(tmp_path / "1" / f"{SHA256}.png", "rb") as f:
+        assert f.read() == PAYLOAD
+    assert client.backfilled == [url]
+
+    # The final response was lost: a HEAD, GET or resent PATCH still gets the URL
+    head = client.head(location)
+    assert head.status_code == 200 and head.headers["Upload-Offset"] == str(len(PAYLOAD))
+    assert client.get(location).json()["url"] == url
+    assert _patch(client, location, 500, PAYLOAD[500:]).json()["url"] == url
+    assert client.backfilled == [url]
+
+    # Completed sessions are removed at expiry like abandoned ones
+    session_id = location.rsplit("/", 1)[1]
+    assert os.listdir(tmp_path / ".resumable") == [f"{session_id}.json"]
+    later = resumable_uploads.time.time() + resumable_uploads.SESSION_TTL_SECONDS + 1
+    monkeypatch.setattr(resumable_uploads.time, "time", lambda: later)
+    assert asyncio.run(resumable_uploads.expire_sessions()) == 1
+    assert client.head(location).status_code == 404
+
+
+def test_cross_origin_clients_can_send_and_read_upload_headers():
+    from main import app
+
+    preflight = TestClient(app).options("/api/upload/resumable/x", headers={
+        "Origin": "http://localhost:5173",
+        "Access-Control-Request-Method": "PATCH",
+        "Access-Control-Request-Headers": "upload-offset",
+    })
+    assert preflight.status_code == 200
+    assert "Upload-Offset" in preflight.headers["access-control-allow-headers"]
+    created = TestClient(app).post("/api/upload/resumable",
+                                   headers={"Origin": "http://localhost:5173"})
+    exposed = created.headers["access-control-expose-headers"]
+    assert all(name in exposed for name in ("Upload-Offset", "Upload-Length", "Location"))
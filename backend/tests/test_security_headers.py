@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from middleware.security import SecurityHeadersMiddleware, build_security_headers
+
+
+def _app(environment: str) -> Starlette:
+    async def plain(request):
+        return PlainTextResponse("ok")
+
+    async def stream(request):
+        async def chunks():
+            for part in (b"a", b"b", b"c"):
+                yield part
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app = Starlette(routes=[Route("/", plain), Route("/stream", stream)])
+    app.add_middleware(SecurityHeadersMiddleware, environment=environment)
+    return app
+
+
+def test_headers_added_to_plain_and_streaming_responses():
+    client = TestClient(_app("development"))
+    for path, body in (("/", "ok"), ("/stream", "abc")):
+        response = client.get(path)
+        assert response.text == body
+        assert response.headers["x-frame-options"] == "DENY"
+        assert "frame-ancestors 'self'" in response.headers["content-security-policy"]
+        assert "strict-transport-security" not in response.headers
+        assert "access-control-allow-origin" not in response.headers
+
+
+def test_production_headers():
+    names = dict(build_security_headers("production"))
+    assert b"strict-transport-security" in names
+    assert b"frame-ancestors 'none'" in names[b"content-security-policy"]
@@ -0,0 +1,29 @@
+import os
+
+from services.static_assets import StaticAssetManifest, negotiate_encoding
+
+
+def test_negotiate_encoding_prefers_brotli():
+    available = {"gzip": "a.gz", "br": "a.br"}
+    assert negotiate_encoding("gzip, deflate, br", available) == "br"
+    assert negotiate_encoding("gzip, br;q=0", available) == "gzip"
+    assert negotiate_encoding("identity", available) is None
+    assert negotiate_encoding("gzip", {}) is None
+
+
+def test_manifest_fingerprints_and_refreshes(tmp_path):
+    root = tmp_path / "static"
+    (root / "uploads").mkdir(parents=True)
+    (root / "uploads" / "photo.jpg").write_bytes(b"user content")
+    css = root / "site.css"
+    css.write_text("body { color: red; }\n" * 200)
+    manifest = StaticAssetManifest(root=str(root), cache_dir=str(tmp_path / "cache"))
+    manifest.build()
+
+    entry = manifest.get("site.css")
+    assert "gzip" in entry.encodings and os.path.exists(entry.encodings["gzip"])
+    assert manifest.asset_url("site.css") == f"/static/site.css?v={entry.fingerprint}"
+    assert manifest.get("uploads/photo.jpg") is None
+
+    css.write_text("body { color: blue; }\n" * 300)
+    assert manifest.get("site.css").fingerprint != entry.fingerprint
@@ -0,0 +1,22 @@
+import pytest
+from starlette.exceptions import HTTPException
+
+from services.upload_serving import parse_range, resolve_upload_path
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    # Multi-range and malformed headers fall back to the full file
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-1", 100) is None
+    with pytest.raises(HTTPException):
+        parse_range("bytes=100-", 100)
+
+
+def test_resolve_upload_path_rejects_internal_and_escaping_paths():
+    assert resolve_upload_path("1/abc.jpg").endswith("uploads/1/abc.jpg")
+    assert resolve_upload_path(".resumable/abc.part") is None
+    assert resolve_upload_path("1/../../main.py") is None
@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from services import upload_storage
+from services.upload_storage import sniff_image_type, stream_to_temp
+
+PNG_HEAD = b"\x89PNG\r\n\x1a\n"
+
+
+def test_sniff_image_type():
+    assert sniff_image_type(PNG_HEAD + b"rest") == ".png"
+    assert sniff_image_type(b"\xff\xd8\xff\xe0") == ".jpg"
+    assert sniff_image_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == ".webp"
+    assert sniff_image_type(b"<svg></svg>") is None
+
+
+def test_stream_to_temp_aborts_past_cap(tmp_path):
+    upload = UploadFile(io.BytesIO(PNG_HEAD + b"x" * 200_000), filename="a.png")
+    with pytest.raises(HTTPException):
+        asyncio.run(stream_to_temp(upload, str(tmp_path), max_bytes=100_000))
+    assert os.listdir(tmp_path) == []
+
+
+def test_stream_to_temp_writes_file(tmp_path):
+    payload = PNG_HEAD + b"x" * 150_000
+    upload = UploadFile(io.BytesIO(payload), filename="a.png")
+    temp_path, ext, size, sha256 = asyncio.run(stream_to_temp(upload, str(tmp_path)))
+    assert ext == ".png" and size == len(payload)
+    assert sha256 == hashlib.sha256(payload).hexdigest()
+    with open(temp_path, "rb") as f:
+        assert f.read() == payload
+
+
+def test_sweep_keeps_referenced_and_fresh_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_storage, "UPLOAD_DIR", str(tmp_path))
+    user_dir = tmp_path / "1"
+    user_dir.mkdir()
+    names = ["aaa.jpg", "aaa.card.webp", "bbb.png", "bbb.variants.json", ".tmp.part"]
+    for name in names:
+        (user_dir / name).write_bytes(b"x")
+        os.utime(user_dir / name, (0, 0))
+    (user_dir / "ccc.jpg").write_bytes(b"fresh")
+
+    removed = upload_storage._sweep({"1": {"aaa"}}, grace_seconds=3600)
+
+    assert len(removed) == 3
+    assert sorted(os.listdir(user_dir)) == ["aaa.card.webp", "aaa.jpg", "ccc.jpg"]
+
+
+def test_reupload_restarts_the_grace_period(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_storage, "UPLOAD_DIR", str(tmp_path))
+    payload = PNG_HEAD + b"x" * 100
+
+    async def save():
+        return await upload_storage.save_upload(UploadFile(io.BytesIO(payload), filename="a.png"), 1)
+
+    url, created = asyncio.run(save())
+    stored = tmp_path / "1" / url.rsplit("/", 1)[1]
+    os.utime(stored, (0, 0))
+    assert asyncio.run(save()) == (url, False)
+    # The deduplicated upload is fresh again: the sweep keeps it
+    assert upload_storage._sweep({}, grace_seconds=3600) == []
+    assert created and stored.exists()
+
+
+
+def test_find_upload_touches_the_file_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_storage, "UPLOAD_DIR", str(tmp_path))
+    sha256 = "a" * 64
+    (tmp_path / "1").mkdir()
+    stored = tmp_path / "1" / f"{sha256}.jpg"
+    stored.write_bytes(b"x")
+    os.utime(stored, (0, 0))
+    touch = upload_storage._touch
+    threads = set()
+
+    def recording_touch(path):
+        threads.add(threading.get_ident())
+        return touch(path)
+
+    monkeypatch.setattr(upload_storage, "_touch", recording_touch)
+
+    assert asyncio.run(upload_storage.find_upload(1, sha256)) == \
+        upload_storage.upload_url(1, f"{sha256}.jpg")
+    assert stored.stat().st_mtime > 0
+    assert threads and threading.get_ident() not in threads
+    assert asyncio.run(upload_storage.find_upload(1, "not-a-hash")) is None
+
+
+def test_session_expiry_runs_when_collection_fails(monkeypatch):
+    from services import resumable_uploads
+
+    calls = []
+
+    async def failing_collect():
+        calls.append("collect")
+        raise OSError("disk error")
+
+    async def expire():
+        calls.append("expire")
+        raise asyncio.CancelledError  # stop the loop after one round
+
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(upload_storage, "collect_garbage", failing_collect)
+    monkeypatch.setattr(resumable_uploads, "expire_sessions", expire)
+    monkeypatch.setattr(upload_storage.asyncio, "sleep", no_sleep)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(upload_storage.run_garbage_collector(60))
+    assert calls == ["collect", "expire"]
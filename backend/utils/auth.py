@@ -3,13 +3,17 @@ from fastapi import Body
 from typing import Union, Annotated
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from schemas.users import LoginRequest, UserOut
 from typing_extensions import Annotated, Doc
 from config import settings
+from services.password_hasher import get_password_hasher
+from utils.cache import LRUCache
+import hashlib
+import json
 import logging
+import time
 
 # Get security logger for authentication events
 security_logger = logging.getLogger("security")
@@ -20,6 +24,13 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
 
+# Auth caches: authenticated users by id (short TTL, invalidated on
+# update/delete) and verified access tokens by digest
+USER_CACHE_TTL_SECONDS = settings.auth_user_cache_ttl_seconds
+TOKEN_CACHE_TTL_SECONDS = 5 * 60
+_user_cache = LRUCache(maxsize=4096, ttl=USER_CACHE_TTL_SECONDS)
+_token_cache = LRUCache(maxsize=8192)
+
 # Cookie settings shared across login/refresh flows
 ACCESS_TOKEN_COOKIE_NAME = "access_token"
 REFRESH_TOKEN_COOKIE_NAME = "refresh_token"
@@ -65,12 +76,16 @@ def clear_auth_cookies(response: Response) -> None:
     response.delete_cookie(REFRESH_TOKEN_COOKIE_NAME, path=COOKIE_PATH)
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login/OAuth2")
 oauth2_scheme_optional = OAuth2PasswordBearer(
     tokenUrl="/api/login/OAuth2", auto_error=False)
 
 
+# bcrypt costs 100-300ms of CPU per call, so it runs on the hasher's own
+# thread pool instead of the event loop (see services/password_hasher.py)
+pwd_context = get_password_hasher().context
+
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -79,6 +94,19 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+async def hash_password(password: str) -> str:
+    return await get_password_hasher().hash(password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Check a password off the event loop.
+
+    Returns ``(valid, new_hash)``; ``new_hash`` is not None when the stored
+    hash was made with a different bcrypt cost and should be saved instead.
+    """
+    return await get_password_hasher().verify_and_update(plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=15)):
     to_encode = data.copy()
     if expires_delta:
@@ -101,9 +129,65 @@ def create_refresh_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
+def _extract_user_id(raw):
+    # 'sub' can be:
+    # - a JSON string containing a dict with 'id' (e.g. login path)
+    # - a string with a numeric id (e.g. create_access_token with user id)
+    # - an int (if token was created with a numeric sub)
+    # Be defensive when parsing.
+    if isinstance(raw, dict):
+        return raw.get("id")
+    if isinstance(raw, int):
+        return raw
+    if isinstance(raw, str):
+        # try JSON decode
+        try:
+            parsed = json.loads(raw)
+            if isinstance(parsed, dict):
+                return parsed.get("id")
+            if isinstance(parsed, (int, str)) and str(parsed).isdigit():
+                return int(parsed)
+            return parsed
+        except Exception:
+            # not JSON, maybe numeric string
+            if raw.isdigit():
+                return int(raw)
+            return raw
+
+
+def _token_user_id(token: str):
+    """Verify an access token and return its user id.
+
+    Verified tokens are cached by digest until they expire (capped at
+    TOKEN_CACHE_TTL_SECONDS), so repeat requests skip the JWT decode.
+    """
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    user_id = _token_cache.get(digest)
+    if user_id is not None:
+        return user_id
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    user_id = _extract_user_id(payload.get("sub"))
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    ttl = TOKEN_CACHE_TTL_SECONDS
+    if isinstance(payload.get("exp"), (int, float)):
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        _token_cache.set(digest, user_id, ttl=ttl)
+    return user_id
+
+
+def invalidate_user(user_id) -> None:
+    """Drop a user from the auth cache after it was updated or deleted."""
+    _user_cache.pop(user_id)
+
+
 async def get_current_user(request: Request, token: str | None = Depends(oauth2_scheme_optional)):
     from models import User
-    import json
     try:
         if not token:
             token = request.cookies.get(ACCESS_TOKEN_COOKIE_NAME)
@@ -113,42 +197,7 @@ async def get_current_user(request: Request, token: str | None = Depends(oauth2_
                     detail="Could not validate credentials",
                     headers={"WWW-Authenticate": "Bearer"},
                 )
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_data_raw = payload.get("sub")
-        # 'sub' can be:
-        # - a JSON string containing a dict with 'id' (e.g. login path)
-        # - a string with a numeric id (e.g. create_access_token with user id)
-        # - an int (if token was created with a numeric sub)
-        # Be defensive when parsing.
-
-        def _extract_user_id(raw):
-            # raw may be dict, int, or string
-            if isinstance(raw, dict):
-                return raw.get("id")
-            if isinstance(raw, int):
-                return raw
-            if isinstance(raw, str):
-                # try JSON decode
-                try:
-                    parsed = json.loads(raw)
-                    if isinstance(parsed, dict):
-                        return parsed.get("id")
-                    if isinstance(parsed, (int, str)) and str(parsed).isdigit():
-                        return int(parsed)
-                    return parsed
-                except Exception:
-                    # not JSON, maybe numeric string
-                    if raw.isdigit():
-                        return int(raw)
-                    return raw
-
-        user_id = _extract_user_id(user_data_raw)
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        user_id = _token_user_id(token)
     except JWTError as e:
         security_logger.warning("JWT validation failed", exc_info=True)
         raise HTTPException(
@@ -156,41 +205,23 @@ async def get_current_user(request: Request, token: str | None = Depends(oauth2_
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = await User.get_or_none(id=user_id)
+    user = _user_cache.get(user_id)
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        user = await User.get_or_none(id=user_id)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        _user_cache.set(user_id, user)
     return user
 
 
 def verify_refresh_token(refresh_token: str):
-    import json
     try:
         payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
         user_data_raw = payload.get("sub")
-        # reuse same extraction logic as above
-
-        def _extract_user_id(raw):
-            if isinstance(raw, dict):
-                return raw.get("id")
-            if isinstance(raw, int):
-                return raw
-            if isinstance(raw, str):
-                try:
-                    parsed = json.loads(raw)
-                    if isinstance(parsed, dict):
-                        return parsed.get("id")
-                    if isinstance(parsed, (int, str)) and str(parsed).isdigit():
-                        return int(parsed)
-                    return parsed
-                except Exception:
-                    if raw.isdigit():
-                        return int(raw)
-                    return raw
-
         user_id = _extract_user_id(user_data_raw)
         if not user_id:
             raise HTTPException(
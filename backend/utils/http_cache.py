@@ -0,0 +1,34 @@
+import hashlib
+from typing import Any, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+# API representations may change at any time: clients cache but always revalidate
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*parts: Any) -> str:
+    """Weak ETag from the values that identify a representation's version."""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def etag_matches(headers: Headers, etag: str) -> bool:
+    """Weak comparison of ``etag`` against If-None-Match."""
+    if_none_match = headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return opaque in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+def cache_headers(etag: str, headers: Optional[dict] = None,
+                  cache_control: str = REVALIDATE_CACHE_CONTROL) -> dict:
+    return {**(headers or {}), "ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(etag: str, cache_control: str = REVALIDATE_CACHE_CONTROL) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, cache_control=cache_control))
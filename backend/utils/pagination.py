@@ -0,0 +1,91 @@
+import base64
+import binascii
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from starlette.responses import StreamingResponse
+from tortoise.queryset import QuerySet
+
+# Page size bounds for ?limit=
+MAX_PAGE_LIMIT = 500
+# Rows fetched per query while streaming NDJSON
+STREAM_CHUNK_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def encode_cursor(last_id: int) -> str:
+    """Opaque cursor pointing after the row with primary key ``last_id``."""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_id = json.loads(raw)["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
+
+
+def _after(queryset: QuerySet, cursor: Optional[str]) -> QuerySet:
+    if cursor:
+        queryset = queryset.filter(id__gt=decode_cursor(cursor))
+    return queryset.order_by("id")
+
+
+async def fetch_page(queryset: QuerySet, columns: Sequence[str], limit: Optional[int],
+                     cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One keyset page of ``values(*columns)`` rows ordered by primary key.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last
+    page. With no ``limit`` every remaining row is returned.
+    """
+    queryset = _after(queryset, cursor)
+    if limit is None:
+        return await queryset.values(*columns), None
+    rows = await queryset.limit(limit + 1).values(*columns)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]["id"])
+
+
+async def iter_chunks(queryset: QuerySet, columns: Sequence[str], cursor: Optional[str] = None,
+                      chunk_size: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield successive keyset pages so only one chunk is held at a time."""
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    while True:
+        rows, cursor = await fetch_page(queryset, columns, chunk_size, cursor)
+        if rows:
+            yield rows
+        if cursor is None:
+            return
+
+
+def ndjson_response(queryset: QuerySet, columns: Sequence[str],
+                    encode: Callable[[Iterable[Dict[str, Any]]], bytes],
+                    cursor: Optional[str] = None,
+                    load: Optional[Callable[[List[Dict[str, Any]]], Awaitable[Any]]] = None,
+                    ) -> StreamingResponse:
+    """Stream a query as newline-delimited JSON, one encoded chunk at a time.
+
+    ``encode`` turns a chunk of rows into NDJSON lines (bytes ending in a
+    newline); ``load``, when given, is awaited on each chunk first to add
+    related data in one query per chunk. Memory stays flat regardless of
+    the result size.
+    """
+    if cursor:
+        decode_cursor(cursor)  # reject a bad cursor before the response starts
+
+    async def body() -> AsyncIterator[bytes]:
+        async for rows in iter_chunks(queryset, columns, cursor):
+            if load is not None:
+                await load(rows)
+            yield encode(rows)
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
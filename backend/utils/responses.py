@@ -0,0 +1,21 @@
+from typing import Any
+
+import pydantic_core
+from starlette.responses import JSONResponse, Response
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded by pydantic-core instead of the stdlib json module.
+
+    Used as the app's default response class. Handles pydantic models,
+    dates, enums and decimals natively; NaN/Infinity become ``null``.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return pydantic_core.to_json(content)
+
+
+class RawJSONResponse(Response):
+    """Response for a body that is already encoded JSON (e.g. from a TypeAdapter)."""
+
+    media_type = "application/json"